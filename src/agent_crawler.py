@@ -2,39 +2,79 @@
 
 import logging
 import asyncio
+import heapq
 import json
-from typing import Dict, List
+import os
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
-import pytz
 
 from src.config import Config
-from src.models import Message, GroupMessages
+from src.models import MessageBatch
+from src.utils.attachment_fetcher import AttachmentFetcher
+from src.utils.group_metadata import (
+    GroupMetadataResolver,
+    default_group_metadata,
+)
 from src.utils.line_handler import LineHandler
+from src.utils.lpt_scheduler import (
+    load_group_volumes,
+    load_seconds_per_unit,
+    run_lpt,
+)
+from src.utils.partitions import partition_path, refresh_manifest
+from src.utils.message_store import MessageStore
+from src.utils.profile_cache import ProfileCache
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.raw_io import (
+    RAW_FILE_SUFFIXES,
+    iter_raw_messages,
+    read_raw_header,
+    write_jsonl,
+)
+from src.utils.time_utils import ensure_timestamp_ms, local_day_bounds_ms
 
 logger = logging.getLogger(__name__)
 
 
 async def crawl_messages(
     group_ids: List[str],
-    date: str
-) -> Dict[str, List[dict]]:
+    date: str,
+    schedule_report: Optional[Dict] = None,
+    attachment_downloads: Optional[List[asyncio.Task]] = None,
+    max_concurrent_groups: Optional[int] = None
+) -> Dict[str, MessageBatch]:
     """爬蟲 LINE 群組訊息
 
-    根據指定日期爬取前一天的所有訊息。支持多個群組並發爬取。
+    根據指定日期爬取前一天的所有訊息 (來源為 webhook 伺服器寫入的訊息儲存)。
+    支持多個群組並發爬取 (最多 CRAWL_MAX_CONCURRENT_GROUPS 個)，依
+    stats_{date}.json 歷史訊息量由大到小啟動 (LPT 排程)。
+    支持增量爬取：若該日期的輸出檔案已存在，會從檔案檢查點中記錄的訊息
+    儲存讀取位置繼續抓取 (依到達順序，晚到的舊時間戳訊息也不會遺漏)，
+    並以 message_id 合併新訊息。
+    檔案寫入該日期的分區 (data/raw_messages/YYYY/MM/DD/)，完成後更新
+    分區的 manifest。
 
     Args:
         group_ids: 群組 ID 列表 (格式: ["C1234...", "C0987..."])
         date: 日期字符串 (格式: "YYYY-MM-DD", 例如 "2026-02-17")
               將爬取此日期前一天的訊息
+        schedule_report: 若提供，寫入排程統計 (預估/實際 makespan)
+        attachment_downloads: 若提供，返回前不等待附件下載完成，改為加入
+            一個 task (完成時返回下載統計)，由調用者在之後的階段等待；
+            未提供時返回前等待下載完成
+        max_concurrent_groups: 同時爬取的群組數上限 (預設
+            Config.CRAWL_MAX_CONCURRENT_GROUPS)
 
     Returns:
-        字典結構:
+        字典結構 (每個群組為 MessageBatch，索引得到支持 dict 風格存取的
+        Message，欄位如下):
         {
             "group_id_1": [
                 {
                     "message_id": "100001",
                     "timestamp": "2026-02-17T09:15:30+08:00",
+                    "timestamp_ms": 1771291530000,
                     "sender_id": "U1234...",
                     "sender_name": "Alice",
                     "message_type": "text",
@@ -62,58 +102,143 @@ async def crawl_messages(
     try:
         # 解析日期並計算時間範圍
         target_date = datetime.strptime(date, "%Y-%m-%d").date()
-        tz = pytz.timezone(Config.TIMEZONE)
 
-        # 計算前一天的時間範圍 (00:00:00 - 23:59:59)
+        # 計算前一天的時間範圍 (00:00:00.000 - 23:59:59.999，毫秒級 Unix time)
         crawl_date = target_date - timedelta(days=1)
-        start_datetime = datetime.combine(
+        start_time_ms, end_time_ms = local_day_bounds_ms(
             crawl_date,
-            datetime.min.time()
-        ).replace(tzinfo=tz)
-        end_datetime = datetime.combine(
-            crawl_date,
-            datetime.max.time()
-        ).replace(tzinfo=tz)
-
-        # 轉換為毫秒級 Unix time
-        start_time_ms = int(start_datetime.timestamp() * 1000)
-        end_time_ms = int(end_datetime.timestamp() * 1000)
+            Config.TIMEZONE
+        )
 
         logger.info(
             f"Crawling date range: {crawl_date} "
             f"({start_time_ms} - {end_time_ms})"
         )
 
-        # 初始化 LINE Handler
-        handler = LineHandler(Config.LINE_CHANNEL_ACCESS_TOKEN)
-
-        # 並發爬取所有群組
-        tasks = [
-            _crawl_single_group(
-                handler,
-                group_id,
-                crawl_date,
-                start_time_ms,
-                end_time_ms
+        # 初始化 LINE Handler（所有群組共用同一個連線池和成員快取）
+        profile_cache = ProfileCache(
+            Config.PROFILE_CACHE_PATH,
+            ttl_seconds=Config.PROFILE_CACHE_TTL_HOURS * 3600,
+            max_entries=Config.PROFILE_CACHE_MAX_ENTRIES
+        )
+        handler = LineHandler(
+            Config.LINE_CHANNEL_ACCESS_TOKEN,
+            max_connections=Config.LINE_API_MAX_CONNECTIONS,
+            max_concurrent_profiles=Config.PROFILE_FETCH_CONCURRENCY,
+            profile_cache=profile_cache,
+            message_store=MessageStore(
+                Config.WEBHOOK_STORE_DIR,
+                timezone=Config.TIMEZONE
             )
-            for group_id in group_ids
-        ]
+        )
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # 群組名稱/圖片：已知群組直接使用快取 (過期時背景刷新)
+        group_metadata = GroupMetadataResolver(
+            handler,
+            profile_cache,
+            refresh_seconds=Config.GROUP_METADATA_REFRESH_HOURS * 3600
+        )
 
-        # 構建結果字典
+        # 附件在背景下載，不阻塞文字訊息的爬取和保存
+        # (第一次遇到附件時才建立下載器)
+        fetcher = None
+
+        def _schedule_attachments(messages: List[dict]) -> None:
+            nonlocal fetcher
+            if not Config.DOWNLOAD_ATTACHMENTS:
+                return
+            if not any(msg.get("attachments") for msg in messages):
+                return
+            if fetcher is None:
+                fetcher = AttachmentFetcher(
+                    Config.LINE_CHANNEL_ACCESS_TOKEN,
+                    Config.ATTACHMENTS_DIR,
+                    max_concurrency=Config.ATTACHMENT_DOWNLOAD_CONCURRENCY
+                )
+            fetcher.schedule(messages)
+
+        # 並發爬取所有群組（從各群組的檢查點繼續），每個群組完成後立即保存
+        async def _crawl_and_save(group_id: str) -> MessageBatch:
+            checkpoint = _load_checkpoint(group_id, date) or {}
+            store_offsets = dict(checkpoint.get("store_offsets") or {})
+            messages, metadata = await asyncio.gather(
+                _crawl_single_group(
+                    handler,
+                    group_id,
+                    crawl_date,
+                    start_time_ms,
+                    end_time_ms,
+                    store_offsets
+                ),
+                group_metadata.get(group_id)
+            )
+            _schedule_attachments(messages)
+            await _save_messages_to_files(
+                {group_id: messages},
+                date,
+                {group_id: metadata},
+                {group_id: store_offsets}
+            )
+            # 保存後改以欄位式批次保留，釋放逐則訊息的字典
+            return MessageBatch.from_dicts(messages, Config.TIMEZONE)
+
+        volumes = load_group_volumes(
+            Config.PROCESSED_MESSAGES_DIR,
+            before_date=date,
+            history_days=Config.VOLUME_HISTORY_DAYS
+        )
+        try:
+            results, report = await run_lpt(
+                {
+                    group_id: (lambda g=group_id: _crawl_and_save(g))
+                    for group_id in group_ids
+                },
+                volumes,
+                max_concurrent_groups or Config.CRAWL_MAX_CONCURRENT_GROUPS,
+                seconds_per_unit=load_seconds_per_unit(
+                    Config.EXECUTION_STATS_FILE,
+                    "crawler_schedule"
+                )
+            )
+        finally:
+            if fetcher is not None:
+                if attachment_downloads is not None:
+                    attachment_downloads.append(
+                        asyncio.ensure_future(_finish_downloads(fetcher))
+                    )
+                else:
+                    await _finish_downloads(fetcher)
+            await group_metadata.close()
+            await handler.close()
+            profile_cache.close()
+
+        # 構建結果字典（_crawl_single_group 不拋出異常，失敗只可能來自保存）
         crawled_data = {}
-        for group_id, result in zip(group_ids, results):
+        save_errors = []
+        for group_id in group_ids:
+            result = results[group_id]
             if isinstance(result, Exception):
                 logger.error(
-                    f"Failed to crawl group {group_id}: {result}"
+                    f"Failed to save messages for group {group_id}: {result}"
                 )
-                crawled_data[group_id] = []
+                crawled_data[group_id] = MessageBatch(Config.TIMEZONE)
+                save_errors.append(result)
             else:
                 crawled_data[group_id] = result
 
-        # 保存結果到 JSON 檔案
-        await _save_messages_to_files(crawled_data, date)
+        if schedule_report is not None:
+            schedule_report.update(report)
+
+        # 記錄本次寫入的檔案大小和雜湊 (Agent 2 依此略過未變更的群組)
+        await asyncio.to_thread(
+            refresh_manifest,
+            partition_path(Config.RAW_MESSAGES_DIR, date)
+        )
+
+        if save_errors:
+            raise save_errors[0]
+
+        logger.info(f"LINE API rate limiter stats: {get_rate_limiter().stats()}")
 
         logger.info("Message crawler completed successfully")
         return crawled_data
@@ -126,33 +251,92 @@ async def crawl_messages(
         raise
 
 
+async def _finish_downloads(fetcher: AttachmentFetcher) -> Dict[str, int]:
+    """等待附件下載完成並關閉下載器 (內部函數)
+
+    Returns:
+        下載統計 {"downloaded", "deduplicated", "failed", "bytes_written"}
+    """
+    await fetcher.close()
+    stats = fetcher.stats()
+    logger.info(f"Attachment download stats: {stats}")
+    return stats
+
+
+async def refresh_group_metadata(group_ids: List[str]) -> Dict[str, dict]:
+    """刷新群組名稱、圖片網址和成員數的快取
+
+    供排程器在每日爬蟲之間定期執行，讓爬蟲時不需等待群組摘要請求；
+    同時更新成員數記錄，供成員列表的變動檢查使用。
+
+    Args:
+        group_ids: 群組 ID 列表
+
+    Returns:
+        {group_id: {"group_name", "picture_url", "member_count"}}，
+        只包含刷新成功的群組
+    """
+    profile_cache = ProfileCache(
+        Config.PROFILE_CACHE_PATH,
+        ttl_seconds=Config.PROFILE_CACHE_TTL_HOURS * 3600,
+        max_entries=Config.PROFILE_CACHE_MAX_ENTRIES
+    )
+    handler = LineHandler(
+        Config.LINE_CHANNEL_ACCESS_TOKEN,
+        max_connections=Config.LINE_API_MAX_CONNECTIONS
+    )
+    try:
+        resolver = GroupMetadataResolver(
+            handler,
+            profile_cache,
+            refresh_seconds=Config.GROUP_METADATA_REFRESH_HOURS * 3600
+        )
+        return await resolver.refresh(group_ids)
+    finally:
+        await handler.close()
+        profile_cache.close()
+
+
 async def _crawl_single_group(
     handler: LineHandler,
     group_id: str,
     crawl_date,
     start_time_ms: int,
-    end_time_ms: int
+    end_time_ms: int,
+    store_offsets: Optional[Dict[str, int]] = None
 ) -> List[dict]:
     """爬取單個群組的訊息 (內部函數)
 
+    高水位是訊息儲存中的讀取位置 (到達順序) 而不是訊息時間戳：重送或
+    晚寫入的事件時間戳可能早於上次讀到的最後一則訊息，以時間戳為高水位
+    會永久略過它們。
+
     Args:
         handler: LineHandler 實例
         group_id: 群組 ID
         crawl_date: 要爬取的日期
         start_time_ms: 開始時間 (毫秒)
         end_time_ms: 結束時間 (毫秒)
+        store_offsets: 上次爬取的訊息儲存讀取位置 {日期: bytes}，成功時
+            就地更新 (失敗時保持不變，下次重新讀取)
 
     Returns:
         訊息列表
     """
     logger.info(f"Crawling messages for group: {group_id}")
 
+    # 從上次的讀取位置繼續（重複的訊息在保存時以 message_id 合併）
+    if store_offsets:
+        logger.info(f"Resuming {group_id} from store offsets {store_offsets}")
+
     try:
         # 從 LINE API 獲取訊息
         messages = await handler.get_group_messages(
             group_id,
             start_time_ms,
-            end_time_ms
+            end_time_ms,
+            lazy_senders=Config.LAZY_SENDER_RESOLUTION,
+            store_offsets=store_offsets
         )
 
         logger.info(
@@ -167,40 +351,288 @@ async def _crawl_single_group(
 
 async def _save_messages_to_files(
     crawled_data: Dict[str, List[dict]],
-    date: str
+    date: str,
+    group_metadata: Optional[Dict[str, dict]] = None,
+    store_offsets: Optional[Dict[str, Dict[str, int]]] = None
 ) -> None:
-    """將爬取的訊息保存到 JSON 檔案 (內部函數)
+    """將爬取的訊息保存到檔案 (內部函數)
+
+    檔案位置: data/raw_messages/YYYY/MM/DD/{group_id}_{date}.json
+    (RAW_OUTPUT_FORMAT=jsonl 時為 {group_id}_{date}.jsonl，第一行為群組
+    header，之後每行一則訊息)
 
-    檔案位置: data/raw_messages/{group_id}_{date}.json
+    若檔案已存在，新訊息會以 message_id 合併 (upsert) 到既有訊息中，並更新
+    檔案中的檢查點。寫入在背景執行緒進行，先輸出到暫存檔再改名，避免阻塞
+    event loop 或在中斷時留下不完整的檔案。
 
     Args:
         crawled_data: 爬取的訊息數據
         date: 日期字符串 (YYYY-MM-DD)
+        group_metadata: {group_id: 群組摘要}，缺少時使用佔位名稱
+        store_offsets: {group_id: 訊息儲存讀取位置}，記錄在檢查點中
     """
-    output_dir = Path(Config.RAW_MESSAGES_DIR)
-    output_dir.mkdir(parents=True, exist_ok=True)
-
     for group_id, messages in crawled_data.items():
-        filename = output_dir / f"{group_id}_{date}.json"
-
-        # 構建輸出數據
-        output_data = {
-            "group_id": group_id,
-            "group_name": f"Group_{group_id[:8]}",
-            "date": date,
-            "total_messages": len(messages),
-            "messages": messages
-        }
+        metadata = (group_metadata or {}).get(group_id)
 
         try:
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(
-                    output_data,
-                    f,
-                    ensure_ascii=False,
-                    indent=2
-                )
-            logger.info(f"Saved messages to {filename}")
+            filename, total = await asyncio.to_thread(
+                write_group_messages,
+                group_id,
+                date,
+                messages,
+                metadata,
+                store_offsets=(store_offsets or {}).get(group_id)
+            )
+            logger.info(
+                f"Saved messages to {filename} "
+                f"({len(messages)} new, {total} total)"
+            )
         except Exception as e:
-            logger.error(f"Error saving messages to {filename}: {e}")
+            logger.error(
+                f"Error saving messages for {group_id} ({date}): {e}"
+            )
             raise
+
+
+def write_group_messages(
+    group_id: str,
+    date: str,
+    messages: List[dict],
+    metadata: Optional[Dict] = None,
+    output_dir: Optional[str] = None,
+    store_offsets: Optional[Dict[str, int]] = None
+) -> Tuple[Path, int]:
+    """合併並寫入單個群組某一天的原始訊息檔案 (同步，可在執行緒或子程序中調用)
+
+    檔案格式與合併規則同 _save_messages_to_files。
+
+    Args:
+        group_id: 群組 ID
+        date: 檔案日期 (YYYY-MM-DD，訊息為前一天)
+        messages: 訊息列表
+        metadata: 群組摘要 {"group_name", "picture_url", "member_count"}，
+            預設使用佔位名稱
+        output_dir: 輸出資料目錄 (預設 Config.RAW_MESSAGES_DIR)，檔案寫入
+            其中 date 的分區 (YYYY/MM/DD/)
+        store_offsets: 訊息儲存讀取位置，記錄在檢查點中；未提供時檢查點
+            不含讀取位置 (下次爬取重新讀取整天，以 message_id 合併)
+
+    Returns:
+        (檔案路徑, 檔案中的訊息總數)
+    """
+    output_path = partition_path(output_dir or Config.RAW_MESSAGES_DIR, date)
+    output_path.mkdir(parents=True, exist_ok=True)
+    use_jsonl = Config.RAW_OUTPUT_FORMAT == "jsonl"
+
+    suffix = ".jsonl" if use_jsonl else ".json"
+    filename = output_path / f"{group_id}_{date}{suffix}"
+    writer = _write_group_jsonl if use_jsonl else _write_group_json
+    total = writer(
+        filename,
+        group_id,
+        date,
+        messages,
+        metadata or default_group_metadata(group_id),
+        store_offsets
+    )
+    return filename, total
+
+
+def _write_group_json(
+    filename: Path,
+    group_id: str,
+    date: str,
+    messages: List[dict],
+    metadata: Dict,
+    store_offsets: Optional[Dict[str, int]] = None
+) -> int:
+    """合併並寫入單個群組的 JSON 檔案 (內部函數)
+
+    Returns:
+        檔案中的訊息總數
+    """
+    # 以 message_id 合併既有訊息與新訊息
+    existing = _load_existing_messages(filename)
+    ensure_timestamp_ms(existing)
+    ensure_timestamp_ms(messages)
+    merged = {msg["message_id"]: msg for msg in existing}
+    merged.update((msg["message_id"], msg) for msg in messages)
+    all_messages = sorted(merged.values(), key=lambda m: m["timestamp_ms"])
+
+    # 構建輸出數據
+    output_data = {
+        "group_id": group_id,
+        "group_name": metadata["group_name"],
+        "picture_url": metadata.get("picture_url"),
+        "member_count": metadata.get("member_count"),
+        "date": date,
+        "total_messages": len(all_messages),
+        "checkpoint": _with_store_offsets(
+            _build_checkpoint(all_messages),
+            store_offsets
+        ),
+        "messages": all_messages
+    }
+
+    tmp_filename = filename.with_suffix(".json.tmp")
+    with open(tmp_filename, "w", encoding="utf-8") as f:
+        json.dump(
+            output_data,
+            f,
+            ensure_ascii=False,
+            indent=2
+        )
+    os.replace(tmp_filename, filename)
+    return len(all_messages)
+
+
+def _write_group_jsonl(
+    filename: Path,
+    group_id: str,
+    date: str,
+    messages: List[dict],
+    metadata: Dict,
+    store_offsets: Optional[Dict[str, int]] = None
+) -> int:
+    """合併並逐筆寫入單個群組的 JSON Lines 檔案 (內部函數)
+
+    既有訊息從舊檔逐行串流讀出 (略過被新訊息取代的 message_id)，與排序後
+    的新訊息依 timestamp_ms 合併，檔案與 .json 格式一樣保持時間順序 (Agent 2
+    的串流模式依賴此順序)。串流只限於與既有檔案的合併：舊檔不需載入記憶
+    體，但本次爬取的新訊息 (messages) 本身已是完整的列表 (訊息儲存的檔案
+    依到達順序寫入，需要排序和去除重送後才能輸出)。已依時間排序時直接
+    使用，不另外複製。時間相同時既有訊息在前，檢查點也以同樣的順序取
+    最後一則。
+
+    Returns:
+        檔案中的訊息總數
+    """
+    ensure_timestamp_ms(messages)
+    new_messages = messages
+    if any(
+        a["timestamp_ms"] > b["timestamp_ms"]
+        for a, b in zip(messages, messages[1:])
+    ):
+        new_messages = sorted(messages, key=lambda m: m["timestamp_ms"])
+    new_ids = {msg["message_id"] for msg in new_messages}
+
+    # 舊檢查點指向的訊息被新訊息取代時不再使用 (新版本的時間可能不同)
+    checkpoints = [_build_checkpoint(new_messages)]
+    if filename.exists():
+        old_checkpoint = read_raw_header(filename).get("checkpoint")
+        if (
+            old_checkpoint
+            and old_checkpoint.get("last_message_id") not in new_ids
+        ):
+            checkpoints.append(old_checkpoint)
+    checkpoints = [c for c in checkpoints if c and "last_timestamp_ms" in c]
+    # 時間相同時 max 取第一個 (新訊息的檢查點)，與合併後的最後一則一致
+    checkpoint = _with_store_offsets(
+        max(checkpoints, key=lambda c: c["last_timestamp_ms"], default=None),
+        store_offsets
+    )
+
+    def _existing():
+        if filename.exists():
+            for msg in iter_raw_messages(filename):
+                if msg["message_id"] not in new_ids:
+                    if msg.get("timestamp_ms") is None:
+                        ensure_timestamp_ms([msg])
+                    yield msg
+
+    header = {
+        "group_id": group_id,
+        "group_name": metadata["group_name"],
+        "picture_url": metadata.get("picture_url"),
+        "member_count": metadata.get("member_count"),
+        "date": date,
+        "checkpoint": checkpoint,
+    }
+    records = heapq.merge(
+        _existing(),
+        new_messages,
+        key=lambda m: m["timestamp_ms"]
+    )
+    return write_jsonl(filename, header, records)
+
+
+def _load_checkpoint(group_id: str, date: str) -> Optional[dict]:
+    """讀取群組在該日期輸出檔案中的檢查點 (內部函數)
+
+    Args:
+        group_id: 群組 ID
+        date: 日期字符串 (YYYY-MM-DD)
+
+    Returns:
+        {"last_timestamp_ms": int, "last_message_id": str,
+         "store_offsets": {日期: bytes}}，沒有時為 None
+    """
+    output_dir = partition_path(Config.RAW_MESSAGES_DIR, date)
+    for suffix in RAW_FILE_SUFFIXES:
+        filename = output_dir / f"{group_id}_{date}{suffix}"
+        if not filename.exists():
+            continue
+
+        try:
+            return read_raw_header(filename).get("checkpoint")
+        except Exception as e:
+            logger.warning(
+                f"Ignoring unreadable checkpoint in {filename}: {e}"
+            )
+
+    return None
+
+
+def _load_existing_messages(filename: Path) -> List[dict]:
+    """讀取已保存的訊息，檔案不存在或損壞時返回空列表 (內部函數)"""
+    if not filename.exists():
+        return []
+
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            return json.load(f).get("messages", [])
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable raw file {filename}: {e}")
+        return []
+
+
+def _build_checkpoint(messages: List[dict]) -> Optional[dict]:
+    """由訊息列表計算高水位檢查點 (內部函數)
+
+    Args:
+        messages: 依時間排序、包含 timestamp_ms 的訊息列表
+
+    Returns:
+        {"last_timestamp_ms": int, "last_message_id": str}，無訊息時為 None
+    """
+    if not messages:
+        return None
+
+    last = messages[-1]
+    return {
+        "last_timestamp_ms": last["timestamp_ms"],
+        "last_message_id": last["message_id"],
+    }
+
+
+def _with_store_offsets(
+    checkpoint: Optional[dict],
+    store_offsets: Optional[Dict[str, int]]
+) -> Optional[dict]:
+    """以本次的訊息儲存讀取位置取代檢查點中的讀取位置 (內部函數)
+
+    Args:
+        checkpoint: 訊息時間戳檢查點 (可能為 None)
+        store_offsets: 訊息儲存讀取位置，None 時檢查點不含讀取位置
+
+    Returns:
+        檢查點，兩者皆無時為 None
+    """
+    checkpoint = {
+        key: value
+        for key, value in (checkpoint or {}).items()
+        if key != "store_offsets"
+    }
+    if store_offsets is not None:
+        checkpoint["store_offsets"] = dict(store_offsets)
+    return checkpoint or None
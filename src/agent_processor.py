@@ -2,53 +2,95 @@
 
 import logging
 import json
-from typing import Dict, List
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 from collections import Counter
 
 from src.config import Config
 from src.utils.message_parser import (
-    remove_duplicates,
-    filter_noise,
-    classify_messages,
-    extract_keywords,
-    calculate_importance,
+    remove_duplicates_with_count,
+    filter_noise_with_stats,
+    classify_and_score_messages,
+    extract_message_and_group_keywords,
+    get_noise_filter,
+    iter_remove_duplicates,
+    iter_filter_noise,
+    iter_classify_and_score,
+    iter_message_keywords,
 )
+from src.models import Message, MessageBatch
+from src.utils.near_duplicates import (
+    collapse_near_duplicates,
+    iter_collapse_near_duplicates,
+)
+from src.utils.noise_filter import merge_rule_stats
+from src.utils.partitions import outputs_by_source, refresh_manifest
+from src.utils.raw_io import (
+    list_raw_files,
+    load_raw_batch,
+    open_raw_stream,
+    read_raw_header,
+)
+from src.utils.tokenizer import initialize_tokenizer
 
 logger = logging.getLogger(__name__)
 
+# 串流模式中等待近似重複群集過期的訊息上限 (超過時提前輸出最早的訊息)
+STREAM_MAX_PENDING = 10000
+
 
 def process_messages(
     raw_messages_dir: str,
-    output_dir: str
+    output_dir: str,
+    date: Optional[str] = None,
+    workers: Optional[int] = None,
+    streaming: Optional[bool] = None,
+    force: bool = False
 ) -> Dict[str, dict]:
     """處理訊息的主函數
 
     流程：
-    1. 讀取 Agent 1 輸出的 JSON 檔案 (data/raw_messages/)
+    1. 讀取 Agent 1 輸出的 JSON / JSON Lines 檔案 (data/raw_messages/
+       的日期分區)，略過內容與上次處理時相同的檔案
     2. 對每個群組的訊息執行：
        - 去除重複訊息
        - 過濾垃圾訊息
+       - 合併近似重複訊息 (代表訊息加上 repeat_count)
        - 分類訊息
        - 提取關鍵詞
        - 計算重要性分數
     3. 輸出處理後的訊息到 data/processed_messages/{group_id}_{date}.json
     4. 輸出統計信息到 data/processed_messages/stats_{date}.json
-    5. 返回結果
+    5. 更新兩個目錄的 manifest，返回結果
+
+    是否略過以 manifest 判斷：輸出檔案的記錄包含來源檔名和來源的
+    SHA-256，來源雜湊相同且輸出檔案未被修改時沿用上次的輸出和統計。
 
     Args:
-        raw_messages_dir: 原始訊息目錄路徑 (預設: data/raw_messages)
-        output_dir: 輸出目錄路徑 (預設: data/processed_messages)
+        raw_messages_dir: 原始訊息目錄路徑 (data/raw_messages/YYYY/MM/DD)
+        output_dir: 輸出目錄路徑 (data/processed_messages/YYYY/MM/DD)
+        date: 只處理該日期 (YYYY-MM-DD) 的檔案，預設處理目錄中所有檔案
+        workers: 並行處理檔案的程序數 (預設 Config.PROCESSOR_WORKERS，
+            0 = CPU 核心數，1 = 在目前程序中依序處理)
+        streaming: 以串流模式處理 (預設 Config.PROCESSOR_STREAMING)：各步驟
+            串接為 generator，逐筆讀取原始訊息 (.jsonl) 並逐筆寫出結果，
+            記憶體用量與群組訊息數無關；結果不包含 messages
+        force: 忽略 manifest，重新處理所有檔案 (例如修改了雜訊規則或
+            關鍵詞設定後)
 
     Returns:
         字典結構:
         {
             "group_id_1": {
-                "messages": [...],
+                "messages": MessageBatch([...]),
                 "stats": {...}
             },
             "group_id_2": {...}
         }
+        每個群組另有 "output_file" (輸出檔案路徑)；串流模式和略過的群組
+        不包含 messages，略過的群組另有 "skipped": True
 
     Raises:
         Exception: 處理或寫入失敗時
@@ -66,102 +108,70 @@ def process_messages(
     if not raw_path.exists():
         raise FileNotFoundError(f"Raw messages directory not found: {raw_messages_dir}")
 
-    raw_files = list(raw_path.glob('*.json'))
+    raw_files = list_raw_files(raw_path)
+    if date:
+        raw_files = [f for f in raw_files if f.stem.endswith(f"_{date}")]
     if not raw_files:
-        logger.warning(f"No JSON files found in {raw_messages_dir}")
+        logger.warning(f"No raw message files found in {raw_messages_dir}")
         return {}
 
     logger.info(f"Found {len(raw_files)} raw message files to process")
 
+    # 未指定日期時，所有檔案使用第一個檔案的日期
+    if not date:
+        date = read_raw_header(raw_files[0]).get('date', '')
+
+    # 來源未變更的群組沿用上次的結果
+    raw_manifest = refresh_manifest(raw_path)
+    results_by_file = {} if force else _reusable_results(
+        raw_files,
+        raw_manifest,
+        refresh_manifest(output_path),
+        output_path,
+        date
+    )
+    pending = [f for f in raw_files if f.name not in results_by_file]
+    if results_by_file:
+        logger.info(
+            f"Skipping {len(results_by_file)} unchanged raw files, "
+            f"{len(pending)} to process"
+        )
+
+    if workers is None:
+        workers = Config.PROCESSOR_WORKERS
+    workers = min(workers or os.cpu_count() or 1, max(len(pending), 1))
+    if streaming is None:
+        streaming = Config.PROCESSOR_STREAMING
+
+    # 處理需要處理的檔案 (結果依檔案順序產生，與並行與否無關)
+    annotations = {}
+    if pending:
+        for raw_file, (group_id, result) in zip(
+            pending,
+            _map_raw_files(pending, output_path, date, workers, streaming)
+        ):
+            results_by_file[raw_file.name] = (group_id, result)
+            annotations[Path(result["output_file"]).name] = {
+                "source": raw_file.name,
+                "source_sha256": raw_manifest["files"][raw_file.name]["sha256"],
+                "group_id": group_id,
+            }
+
     # 收集所有結果和統計信息
     all_results = {}
-    date = None
     all_stats = {}
-
-    # 處理每個原始檔案
     for raw_file in raw_files:
-        try:
-            logger.info(f"Processing: {raw_file.name}")
-
-            # 讀取原始訊息
-            with open(raw_file, 'r', encoding='utf-8') as f:
-                raw_data = json.load(f)
-
-            group_id = raw_data.get('group_id', '')
-            group_name = raw_data.get('group_name', '')
-            if not date:
-                date = raw_data.get('date', '')
-
-            raw_messages = raw_data.get('messages', [])
-            original_count = len(raw_messages)
+        group_id, result = results_by_file[raw_file.name]
+        all_results[group_id] = result
+        all_stats[group_id] = result["stats"]
 
-            logger.info(f"Group {group_id}: {original_count} raw messages")
-
-            # 執行訊息處理流程
-            processed_messages = remove_duplicates(raw_messages)
-            processed_messages = filter_noise(processed_messages)
-            processed_messages = classify_messages(processed_messages)
-
-            # 為每個訊息計算重要性分數
-            for msg in processed_messages:
-                msg['importance'] = calculate_importance(msg)
-
-                # 提取該訊息的關鍵詞（如果有重要詞匯）
-                keywords = extract_keywords([msg], top_n=3)
-                msg['keywords'] = keywords.get('keywords', [])
-
-            # 提取群組級別的關鍵詞
-            group_keywords = extract_keywords(processed_messages, top_n=10)
-
-            # 計算統計信息
-            stats = _calculate_statistics(
-                raw_messages,
-                processed_messages,
-                group_name,
-                group_keywords
-            )
-
-            # 保存處理後的訊息
-            output_file = output_path / f"{group_id}_{date}.json"
-            processed_data = {
-                "group_id": group_id,
-                "group_name": group_name,
-                "date": date,
-                "total_original": original_count,
-                "total_processed": len(processed_messages),
-                "messages": processed_messages,
-            }
-
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(
-                    processed_data,
-                    f,
-                    ensure_ascii=False,
-                    indent=2
-                )
-
-            logger.info(
-                f"Saved processed messages to {output_file.name}: "
-                f"{len(processed_messages)} messages"
-            )
-
-            # 保存結果
-            all_results[group_id] = {
-                "messages": processed_messages,
-                "stats": stats
-            }
-            all_stats[group_id] = stats
-
-        except Exception as e:
-            logger.error(f"Error processing {raw_file.name}: {e}")
-            raise
-
-    # 保存統計信息
-    if date and all_stats:
+    # 保存統計信息 (全部略過時沿用既有的統計檔案)
+    if date and all_stats and pending:
         stats_file = output_path / f"stats_{date}.json"
         stats_data = {
             "date": date,
             "total_groups": len(all_stats),
+            "noise_filter": _sum_noise_rules(all_stats.values()),
             "stats_by_group": all_stats,
         }
 
@@ -175,15 +185,387 @@ def process_messages(
 
         logger.info(f"Saved statistics to {stats_file.name}")
 
+    # 記錄輸出檔案的來源雜湊，下次執行時略過未變更的檔案
+    refresh_manifest(output_path, annotations)
+
     logger.info(f"Message processor completed successfully")
     return all_results
 
 
+def _reusable_results(
+    raw_files: List[Path],
+    raw_manifest: Dict,
+    processed_manifest: Dict,
+    output_path: Path,
+    date: str
+) -> Dict[str, Tuple[str, Dict]]:
+    """找出來源未變更、可沿用上次結果的原始檔案 (內部函數)
+
+    輸出檔案被修改或刪除時 manifest 的記錄會失去來源欄位，統計檔案中
+    沒有該群組時也重新處理。
+
+    Returns:
+        {原始檔名: (group_id, {"output_file", "stats", "skipped": True})}
+    """
+    outputs = outputs_by_source(processed_manifest)
+    previous_stats = None
+    reused = {}
+
+    for raw_file in raw_files:
+        output = outputs.get(raw_file.name)
+        raw_entry = raw_manifest["files"].get(raw_file.name)
+        if not output or not raw_entry:
+            continue
+        output_name, entry = output
+        if entry.get("source_sha256") != raw_entry["sha256"]:
+            continue
+
+        if previous_stats is None:
+            previous_stats = _load_group_stats(output_path / f"stats_{date}.json")
+        group_id = entry.get("group_id")
+        if group_id not in previous_stats:
+            continue
+
+        reused[raw_file.name] = (group_id, {
+            "output_file": str(output_path / output_name),
+            "stats": previous_stats[group_id],
+            "skipped": True,
+        })
+
+    return reused
+
+
+def _load_group_stats(stats_file: Path) -> Dict[str, dict]:
+    """讀取統計檔案的 stats_by_group，不存在或損壞時返回空字典 (內部函數)"""
+    try:
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get("stats_by_group", {})
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable stats file {stats_file}: {e}")
+        return {}
+
+
+def _map_raw_files(
+    raw_files: List[Path],
+    output_path: Path,
+    date: str,
+    workers: int,
+    streaming: bool = False
+) -> Iterator[Tuple[str, Dict]]:
+    """依檔案順序產生每個檔案的處理結果 (內部函數)
+
+    workers > 1 時在子程序中處理；子程序以 _init_worker 初始化一次
+    (jieba 詞典、關鍵詞自動機)，之後處理多個檔案。任一檔案失敗時取消
+    尚未開始的檔案並拋出異常。
+    """
+    if workers <= 1:
+        for raw_file in raw_files:
+            yield _process_raw_file_logged(raw_file, output_path, date, streaming)
+        return
+
+    logger.info(f"Processing {len(raw_files)} files with {workers} worker processes")
+    # 以 fork 啟動的子程序直接繼承已載入的詞典、關鍵詞自動機和雜訊規則
+    initialize_tokenizer()
+    get_noise_filter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker
+    ) as pool:
+        futures = [
+            pool.submit(
+                _process_raw_file_logged, raw_file, output_path, date, streaming
+            )
+            for raw_file in raw_files
+        ]
+        try:
+            for future in futures:
+                yield future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def _init_worker() -> None:
+    """子程序初始化：預先載入 jieba 詞典 (內部函數)
+
+    詞典從資料目錄的快取載入、關鍵詞自動機從 Config.KEYWORDS_FILE 編譯、
+    雜訊規則依 Config.NOISE_FILTER_RULES 建立 (已從父程序繼承時不重複
+    載入)，避免計入第一個檔案。
+    """
+    initialize_tokenizer()
+    get_noise_filter()
+
+
+def _process_raw_file_logged(
+    raw_file: Path,
+    output_path: Path,
+    date: str,
+    streaming: bool = False
+) -> Tuple[str, Dict]:
+    """_process_raw_file / _stream_raw_file，失敗時記錄檔案名稱 (內部函數)"""
+    try:
+        if streaming:
+            return _stream_raw_file(raw_file, output_path, date)
+        return _process_raw_file(raw_file, output_path, date)
+    except Exception as e:
+        logger.error(f"Error processing {raw_file.name}: {e}")
+        raise
+
+
+def _process_raw_file(
+    raw_file: Path,
+    output_path: Path,
+    date: str
+) -> Tuple[str, Dict]:
+    """處理單個群組的原始訊息檔案並寫入處理結果 (內部函數)
+
+    Args:
+        raw_file: 原始訊息檔案
+        output_path: 輸出目錄
+        date: 輸出檔案日期
+
+    Returns:
+        (group_id, {"messages": 處理後的訊息批次, "output_file": 輸出檔案路徑,
+        "stats": 統計信息})
+    """
+    logger.info(f"Processing: {raw_file.name}")
+
+    # 讀取原始訊息 (.json 或逐行讀取 .jsonl) 為欄位式批次，
+    # 處理時使用 Message 列對象 (支持 dict 風格存取)
+    raw_data, raw_batch = load_raw_batch(raw_file, Config.TIMEZONE)
+
+    group_id = raw_data.get('group_id', '')
+    group_name = raw_data.get('group_name', '')
+
+    raw_messages = list(raw_batch)
+    del raw_batch
+    original_count = len(raw_messages)
+
+    logger.info(f"Group {group_id}: {original_count} raw messages")
+
+    # 執行訊息處理流程
+    processed_messages, removed_duplicates = remove_duplicates_with_count(
+        raw_messages
+    )
+    deduplicated_count = len(processed_messages)
+    processed_messages, noise_rules = filter_noise_with_stats(processed_messages)
+    filtered_noise = deduplicated_count - len(processed_messages)
+    near_duplicates = 0
+    if Config.NEAR_DUPLICATE_DETECTION:
+        processed_messages, near_duplicates = collapse_near_duplicates(
+            processed_messages,
+            threshold=Config.NEAR_DUPLICATE_THRESHOLD,
+            window_minutes=Config.NEAR_DUPLICATE_WINDOW_MINUTES
+        )
+
+    # 分類和重要性分數共用一次關鍵詞比對
+    processed_messages = classify_and_score_messages(processed_messages)
+
+    # 一次分詞同時提取每則訊息和群組級別的關鍵詞
+    message_keywords, group_keywords = extract_message_and_group_keywords(
+        processed_messages,
+        top_n=3,
+        group_top_n=10
+    )
+    for msg, keywords in zip(processed_messages, message_keywords):
+        msg['keywords'] = keywords
+
+    # 計算統計信息
+    stats = _calculate_statistics(
+        raw_messages,
+        processed_messages,
+        group_name,
+        group_keywords,
+        removed_duplicates=removed_duplicates,
+        filtered_noise=filtered_noise,
+        near_duplicates=near_duplicates,
+        noise_rules=noise_rules
+    )
+
+    # 保存處理後的訊息
+    output_file = output_path / f"{group_id}_{date}.json"
+    processed_data = {
+        "group_id": group_id,
+        "group_name": group_name,
+        "picture_url": raw_data.get('picture_url'),
+        "date": date,
+        "total_original": original_count,
+        "total_processed": len(processed_messages),
+        "messages": [msg.to_dict() for msg in processed_messages],
+    }
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(
+            processed_data,
+            f,
+            ensure_ascii=False,
+            indent=2
+        )
+
+    logger.info(
+        f"Saved processed messages to {output_file.name}: "
+        f"{len(processed_messages)} messages"
+    )
+
+    # 以欄位式批次返回 (所有群組處理完之前佔用較少記憶體，跨程序傳遞也較小)
+    return group_id, {
+        "messages": MessageBatch.from_dicts(processed_messages, Config.TIMEZONE),
+        "output_file": str(output_file),
+        "stats": stats
+    }
+
+
+def _stream_raw_file(
+    raw_file: Path,
+    output_path: Path,
+    date: str
+) -> Tuple[str, Dict]:
+    """以串流方式處理單個群組的原始訊息檔案 (內部函數)
+
+    去重、雜訊過濾、近似重複合併、分類評分和關鍵詞提取串接為 generator，
+    訊息逐筆讀入、逐筆寫出，統計信息邊處理邊累計。各步驟只保留時間窗口
+    內的狀態，記憶體用量與群組當天的訊息數無關。原始檔案需依時間排序：
+    Agent 1 和匯入工具以 write_group_messages 寫入，多次寫入時新訊息依
+    timestamp_ms 合併進既有訊息 (見 _write_group_jsonl)；其他來源的檔案
+    若不依時間排序，時間倒退的訊息可能漏判重複 (記錄警告)。
+
+    Args:
+        raw_file: 原始訊息檔案 (.jsonl 逐行讀取；.json 需完整解析)
+        output_path: 輸出目錄
+        date: 輸出檔案日期
+
+    Returns:
+        (group_id, {"output_file": 輸出檔案路徑, "stats": 統計信息})
+    """
+    logger.info(f"Streaming: {raw_file.name}")
+
+    raw_data, records = open_raw_stream(raw_file)
+    group_id = raw_data.get('group_id', '')
+    group_name = raw_data.get('group_name', '')
+
+    counts = Counter()
+    noise_rules: Dict[str, dict] = {}
+    group_freq = Counter()
+    collector = _StatsCollector()
+
+    messages = _read_time_ordered(records, counts)
+    messages = iter_remove_duplicates(messages, counts)
+    messages = iter_filter_noise(messages, noise_rules)
+    if Config.NEAR_DUPLICATE_DETECTION:
+        messages = iter_collapse_near_duplicates(
+            messages,
+            counts,
+            threshold=Config.NEAR_DUPLICATE_THRESHOLD,
+            window_minutes=Config.NEAR_DUPLICATE_WINDOW_MINUTES,
+            max_pending=STREAM_MAX_PENDING
+        )
+    messages = iter_classify_and_score(messages)
+    messages = iter_message_keywords(messages, group_freq, top_n=3)
+
+    output_file = output_path / f"{group_id}_{date}.json"
+    _write_processed_stream(
+        output_file,
+        {
+            "group_id": group_id,
+            "group_name": group_name,
+            "picture_url": raw_data.get('picture_url'),
+            "date": date,
+        },
+        collector.collect(messages),
+        counts
+    )
+
+    if counts['out_of_order']:
+        logger.warning(
+            f"{raw_file.name}: {counts['out_of_order']} messages out of "
+            f"time order; duplicates among them may be missed"
+        )
+
+    stats = collector.to_stats(
+        group_name,
+        {"keywords": [word for word, _ in group_freq.most_common(10)]},
+        removed_duplicates=counts['removed_duplicates'],
+        filtered_noise=sum(rule["dropped"] for rule in noise_rules.values()),
+        near_duplicates=counts['near_duplicates'],
+        noise_rules=noise_rules
+    )
+
+    logger.info(
+        f"Streamed {counts['total_original']} raw messages of group {group_id} "
+        f"to {output_file.name}: {collector.total} messages"
+    )
+    return group_id, {"output_file": str(output_file), "stats": stats}
+
+
+def _read_time_ordered(records: Iterable[dict], counts: Counter) -> Iterator[Message]:
+    """將原始訊息轉為 Message，並計數總數和時間倒退的訊息 (內部函數)"""
+    last_timestamp = None
+    for record in records:
+        msg = Message.from_dict(record)
+        counts['total_original'] += 1
+        if last_timestamp is not None and msg.timestamp_ms < last_timestamp:
+            counts['out_of_order'] += 1
+        else:
+            last_timestamp = msg.timestamp_ms
+        yield msg
+
+
+def _write_processed_stream(
+    output_file: Path,
+    header: Dict,
+    messages: Iterable[Message],
+    counts: Counter
+) -> int:
+    """逐筆寫出處理後的訊息 (內部函數)
+
+    格式與一般模式相同 (同一個 JSON 物件，可直接 json.load)，但每則訊息
+    一行，total_original / total_processed 在訊息之後寫入。先寫入暫存檔
+    再改名，中斷時不會留下不完整的檔案。
+
+    Args:
+        output_file: 輸出檔案
+        header: messages 之前的欄位
+        messages: 處理後的訊息迭代器
+        counts: 處理完後讀取 counts['total_original']
+
+    Returns:
+        寫入的訊息數
+    """
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    count = 0
+
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, ensure_ascii=False)[:-1])
+            f.write(', "messages": [')
+            for msg in messages:
+                f.write(",\n" if count else "\n")
+                f.write(json.dumps(msg.to_dict(), ensure_ascii=False))
+                count += 1
+            f.write(
+                f'\n], "total_original": {counts["total_original"]}, '
+                f'"total_processed": {count}}}\n'
+            )
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+    return count
+
+
 def _calculate_statistics(
     raw_messages: List[dict],
     processed_messages: List[dict],
     group_name: str,
-    group_keywords: Dict[str, List[str]]
+    group_keywords: Dict[str, List[str]],
+    removed_duplicates: Optional[int] = None,
+    filtered_noise: int = 0,
+    near_duplicates: int = 0,
+    noise_rules: Optional[Dict[str, dict]] = None
 ) -> Dict:
     """計算統計信息 (內部函數)
 
@@ -192,50 +574,101 @@ def _calculate_statistics(
         processed_messages: 處理後的訊息列表
         group_name: 群組名稱
         group_keywords: 群組關鍵詞
+        removed_duplicates: 去除的重複訊息數 (remove_duplicates_with_count)，
+            未提供時以原始與處理後的訊息數差計算
+        filtered_noise: filter_noise 過濾的訊息數
+        near_duplicates: 併入其他近似重複訊息的數量
+        noise_rules: 每條雜訊規則的過濾數和耗時 (filter_noise_with_stats)
 
     Returns:
         統計信息字典
     """
-    removed_duplicates = len(raw_messages) - len(processed_messages)
-    filtered_noise = 0  # 這個值在後續可以由filter_noise函數返回
-
-    # 計算發送人統計
-    sender_counts = Counter(
-        msg.get('sender_name', 'Unknown') for msg in processed_messages
-    )
-    top_senders = [
-        {"name": name, "count": count}
-        for name, count in sender_counts.most_common(5)
-    ]
-
-    # 計算訊息類型統計
-    message_types = Counter(
-        msg.get('message_type', 'other') for msg in processed_messages
+    if removed_duplicates is None:
+        removed_duplicates = (
+            len(raw_messages) - len(processed_messages)
+            - filtered_noise - near_duplicates
+        )
+
+    collector = _StatsCollector()
+    for msg in processed_messages:
+        collector.add(msg)
+
+    return collector.to_stats(
+        group_name,
+        group_keywords,
+        removed_duplicates=removed_duplicates,
+        filtered_noise=filtered_noise,
+        near_duplicates=near_duplicates,
+        noise_rules=noise_rules
     )
-    message_types_dict = dict(message_types)
 
-    # 計算分類統計
-    categories = Counter(
-        msg.get('category', 'other') for msg in processed_messages
-    )
-    categories_dict = dict(categories)
 
-    # 計算重要性分布
-    high_importance_count = sum(
-        1 for msg in processed_messages
-        if msg.get('importance', 0) >= 0.7
+class _StatsCollector:
+    """逐則累計處理後訊息的統計 (內部類別)"""
+
+    __slots__ = (
+        "total",
+        "sender_counts",
+        "message_types",
+        "categories",
+        "high_importance_count",
     )
 
-    stats = {
-        "group_name": group_name,
-        "total_messages": len(processed_messages),
-        "removed_duplicates": removed_duplicates,
-        "filtered_noise": filtered_noise,
-        "top_senders": top_senders,
-        "top_keywords": group_keywords.get('keywords', []),
-        "message_types": message_types_dict,
-        "categories": categories_dict,
-        "high_importance_messages": high_importance_count,
-    }
+    def __init__(self) -> None:
+        self.total = 0
+        self.sender_counts = Counter()
+        self.message_types = Counter()
+        self.categories = Counter()
+        self.high_importance_count = 0
+
+    def add(self, msg: dict) -> None:
+        """加入一則處理後的訊息"""
+        self.total += 1
+        self.sender_counts[msg.get('sender_name', 'Unknown')] += 1
+        self.message_types[msg.get('message_type', 'other')] += 1
+        self.categories[msg.get('category', 'other')] += 1
+        if msg.get('importance', 0) >= 0.7:
+            self.high_importance_count += 1
+
+    def collect(self, messages: Iterable[dict]) -> Iterator[dict]:
+        """串流步驟：累計經過的訊息並原樣輸出"""
+        for msg in messages:
+            self.add(msg)
+            yield msg
+
+    def to_stats(
+        self,
+        group_name: str,
+        group_keywords: Dict[str, List[str]],
+        removed_duplicates: int,
+        filtered_noise: int,
+        near_duplicates: int,
+        noise_rules: Optional[Dict[str, dict]]
+    ) -> Dict:
+        """產生統計信息字典 (格式見 _calculate_statistics)"""
+        top_senders = [
+            {"name": name, "count": count}
+            for name, count in self.sender_counts.most_common(5)
+        ]
+
+        return {
+            "group_name": group_name,
+            "total_messages": self.total,
+            "removed_duplicates": removed_duplicates,
+            "filtered_noise": filtered_noise,
+            "near_duplicates": near_duplicates,
+            "noise_filter": noise_rules or {},
+            "top_senders": top_senders,
+            "top_keywords": group_keywords.get('keywords', []),
+            "message_types": dict(self.message_types),
+            "categories": dict(self.categories),
+            "high_importance_messages": self.high_importance_count,
+        }
+
 
-    return stats
+def _sum_noise_rules(group_stats: Iterable[Dict]) -> Dict[str, dict]:
+    """合計所有群組每條雜訊規則的過濾數和耗時 (內部函數)"""
+    totals: Dict[str, dict] = {}
+    for stats in group_stats:
+        merge_rule_stats(totals, stats.get("noise_filter", {}))
+    return totals
@@ -1,20 +1,24 @@
 """Scheduler for Agent 4 - Orchestrates daily pipeline execution"""
 
 import logging
+import argparse
 import asyncio
 import json
+import os
 import schedule
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from pathlib import Path
 import pytz
 
 from src.config import Config
-from src.agent_crawler import crawl_messages
+from src.agent_crawler import crawl_messages, refresh_group_metadata
 from src.agent_processor import process_messages
 from src.agent_summarizer import generate_summaries
+from src.utils.partitions import migrate_flat_layout, partition_path
 from src.utils.sender import LineSender
+from src.utils.tokenizer import warm_up_in_background
 
 # 配置日誌
 log_dir = Path(Config.LOGS_DIR)
@@ -44,13 +48,18 @@ def schedule_daily_tasks(time_str: str = "08:00") -> None:
         - 使用 schedule 庫設置
         - 無限循環監控
         - 調用 execute_pipeline() 執行管道
+        - 每 GROUP_METADATA_REFRESH_HOURS 小時刷新群組名稱/圖片快取
     """
     logger.info(f"Scheduling daily tasks at {time_str}")
+    loop = asyncio.get_event_loop()
 
     # 設置每日執行
-    schedule.every().day.at(time_str).do(
-        _run_async_pipeline,
-        asyncio.get_event_loop()
+    schedule.every().day.at(time_str).do(_run_async_pipeline, loop)
+
+    # 定期刷新群組摘要，爬蟲時直接使用快取
+    schedule.every(Config.GROUP_METADATA_REFRESH_HOURS).hours.do(
+        _run_group_metadata_refresh,
+        loop
     )
 
     logger.info("Daily schedule configured, waiting for execution time...")
@@ -80,7 +89,22 @@ def _run_async_pipeline(loop):
         logger.error(f"Pipeline execution failed: {e}")
 
 
-async def execute_pipeline() -> Dict[str, Any]:
+def _run_group_metadata_refresh(loop):
+    """刷新群組摘要快取 (內部函數)
+
+    Args:
+        loop: asyncio event loop
+    """
+    try:
+        refreshed = loop.run_until_complete(
+            refresh_group_metadata(Config.TARGET_GROUP_IDS)
+        )
+        logger.info(f"Refreshed metadata for {len(refreshed)} groups")
+    except Exception as e:
+        logger.error(f"Group metadata refresh failed: {e}")
+
+
+async def execute_pipeline(date_str: Optional[str] = None) -> Dict[str, Any]:
     """執行完整的摘要生成管道
 
     流程：
@@ -92,6 +116,9 @@ async def execute_pipeline() -> Dict[str, Any]:
     6. 記錄統計信息
     7. 保存執行結果
 
+    Args:
+        date_str: 要執行的日期 (YYYY-MM-DD)，預設為昨天
+
     Returns:
         {
             "status": "success" or "failure",
@@ -104,70 +131,269 @@ async def execute_pipeline() -> Dict[str, Any]:
     logger.info("=" * 60)
 
     start_time = datetime.now(pytz.timezone(Config.TIMEZONE))
+
+    # 計算日期（爬蟲前一天）
+    if date_str is None:
+        date_str = (start_time.date() - timedelta(days=1)).isoformat()
+
+    results = await _run_pipeline_for_date(date_str)
+
+    # 記錄結束時間和統計
+    end_time = datetime.now(pytz.timezone(Config.TIMEZONE))
+    duration = (end_time - start_time).total_seconds()
+
+    results["start_time"] = start_time.isoformat()
+    results["end_time"] = end_time.isoformat()
+    results["duration_seconds"] = int(duration)
+
+    # 保存執行統計
+    stats = {
+        "last_execution": end_time.isoformat(),
+        "status": results["status"],
+        "duration_seconds": int(duration),
+        "next_execution": (
+            end_time.replace(hour=8, minute=0, second=0) + timedelta(days=1)
+        ).isoformat()
+    }
+
+    # 合併 Agent 結果到統計
+    for agent, agent_result in results.get("agents_results", {}).items():
+        for key, value in agent_result.items():
+            if key != "status":
+                stats[f"{agent}_{key}"] = value
+
+    # 保存統計檔案 (沒有執行工作的階段沿用上次的排程報告，保留預估用的
+    # seconds_per_unit 歷史)
+    stats_file = Path(Config.EXECUTION_STATS_FILE)
+    _carry_forward_schedules(stats, _load_stats(stats_file))
+    _save_stats(stats_file, stats)
+
+    logger.info(
+        f"完成，耗時 {int(duration // 60)} 分 {int(duration % 60)} 秒"
+    )
+    logger.info("=" * 60)
+
+    return results
+
+
+async def execute_backfill(
+    start_date: str,
+    end_date: str,
+    max_concurrent_days: Optional[int] = None
+) -> Dict[str, Any]:
+    """補跑多天的管道 (停機後追趕進度)
+
+    每一天獨立執行完整的 爬蟲 → 處理 → 摘要 → 發送 流程，各自輸出到
+    該日期的檔案。多天並行執行，同時進行的天數受 max_concurrent_days 限制；
+    LINE API 流量由全域速率限制器統一控制。各階段的並發上限
+    (CRAWL_MAX_CONCURRENT_GROUPS、SUMMARY_MAX_CONCURRENT_GROUPS、
+    PROCESSOR_WORKERS) 是整個補跑的總預算，由同時執行的天數平分 (每天至少
+    1)，總並發量不會是天數乘以單日上限。
+
+    Args:
+        start_date: 開始日期 (YYYY-MM-DD，包含)
+        end_date: 結束日期 (YYYY-MM-DD，包含)
+        max_concurrent_days: 同時執行的天數上限 (預設 Config.BACKFILL_MAX_CONCURRENT_DAYS)
+
+    Returns:
+        {
+            "status": "success" or "failure",
+            "duration_seconds": 300,
+            "days": {"2026-02-10": {...}, ...}
+        }
+
+    Raises:
+        ValueError: 日期格式錯誤或範圍無效時
+    """
+    first = datetime.strptime(start_date, "%Y-%m-%d").date()
+    last = datetime.strptime(end_date, "%Y-%m-%d").date()
+    if last < first:
+        raise ValueError("end_date must not be earlier than start_date")
+
+    dates = [
+        (first + timedelta(days=offset)).isoformat()
+        for offset in range((last - first).days + 1)
+    ]
+    limit = max(1, max_concurrent_days or Config.BACKFILL_MAX_CONCURRENT_DAYS)
+    semaphore = asyncio.Semaphore(limit)
+    concurrent_days = min(limit, len(dates))
+
+    logger.info("=" * 60)
+    logger.info(
+        f"開始補跑 {len(dates)} 天 ({start_date} ~ {end_date})，"
+        f"同時最多 {limit} 天"
+    )
+    logger.info("=" * 60)
+
+    start_time = datetime.now(pytz.timezone(Config.TIMEZONE))
+
+    async def _run_day(day: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await _run_pipeline_for_date(day, concurrent_days)
+
+    day_results = await asyncio.gather(*(_run_day(day) for day in dates))
+
+    end_time = datetime.now(pytz.timezone(Config.TIMEZONE))
+    duration = (end_time - start_time).total_seconds()
+    failed_days = [
+        day for day, result in zip(dates, day_results)
+        if result["status"] != "success"
+    ]
+
     results = {
-        "status": "success",
+        "status": "failure" if failed_days else "success",
         "start_time": start_time.isoformat(),
+        "end_time": end_time.isoformat(),
+        "duration_seconds": int(duration),
+        "failed_days": failed_days,
+        "days": dict(zip(dates, day_results)),
+    }
+
+    _save_stats(Path(Config.BACKFILL_STATS_FILE), results)
+
+    logger.info(
+        f"補跑完成：{len(dates) - len(failed_days)}/{len(dates)} 天成功，"
+        f"耗時 {int(duration // 60)} 分 {int(duration % 60)} 秒"
+    )
+    logger.info("=" * 60)
+
+    return results
+
+
+async def _run_pipeline_for_date(
+    date_str: str,
+    concurrent_days: int = 1
+) -> Dict[str, Any]:
+    """執行單一日期的四個 Agent (內部函數)
+
+    每個 Agent 只讀寫該日期的分區 (RAW_MESSAGES_DIR、PROCESSED_MESSAGES_DIR、
+    SUMMARIES_DIR 下的 YYYY/MM/DD)，依分區的 manifest 略過未變更的輸入。
+
+    Args:
+        date_str: 日期 (YYYY-MM-DD)
+        concurrent_days: 同時執行的天數 (補跑模式)，各階段的並發上限
+            由這些天平分
+
+    Returns:
+        {"status": ..., "date": ..., "agents_results": {...}}
+    """
+    results = {
+        "status": "success",
+        "date": date_str,
         "agents_results": {}
     }
 
+    # 附件在 Agent 1 返回後繼續下載，與 Agent 2/3 並行，發送前才等待
+    attachment_downloads = []
+
     try:
-        # 計算日期（爬蟲前一天）
-        date_str = (start_time.date() - timedelta(days=1)).isoformat()
+        # Agent 1 等待網路時在背景載入 Agent 2 的分詞詞典
+        warm_up_in_background()
 
         # ============ Agent 1: 爬蟲 ============
-        logger.info("[Agent 1] 開始爬蟲，群組數：{}".format(len(Config.TARGET_GROUP_IDS)))
-        crawler_result = await crawl_messages(Config.TARGET_GROUP_IDS, date_str)
+        logger.info(
+            f"[Agent 1] [{date_str}] 開始爬蟲，群組數："
+            f"{len(Config.TARGET_GROUP_IDS)}"
+        )
+        crawl_schedule = {}
+        crawler_result = await crawl_messages(
+            Config.TARGET_GROUP_IDS,
+            date_str,
+            schedule_report=crawl_schedule,
+            attachment_downloads=attachment_downloads,
+            max_concurrent_groups=_day_share(
+                Config.CRAWL_MAX_CONCURRENT_GROUPS,
+                concurrent_days
+            )
+        )
 
         crawler_messages_count = sum(
             len(msgs) for msgs in crawler_result.values()
         )
-        logger.info(f"[Agent 1] 完成爬蟲，爬取訊息數：{crawler_messages_count}")
+        logger.info(
+            f"[Agent 1] [{date_str}] 完成爬蟲，爬取訊息數：{crawler_messages_count}"
+        )
         results["agents_results"]["crawler"] = {
             "status": "success",
             "messages_crawled": crawler_messages_count,
-            "groups": len(crawler_result)
+            "groups": len(crawler_result),
+            "schedule": crawl_schedule
         }
 
         # ============ Agent 2: 處理 ============
-        logger.info("[Agent 2] 開始訊息處理")
-        processor_result = process_messages(
-            str(Path(Config.RAW_MESSAGES_DIR)),
-            "data/processed_messages"
+        # 在執行緒中執行，補跑時不阻塞其他日期的 I/O
+        logger.info(f"[Agent 2] [{date_str}] 開始訊息處理")
+        processed_dir = partition_path(Config.PROCESSED_MESSAGES_DIR, date_str)
+        processor_result = await asyncio.to_thread(
+            process_messages,
+            str(partition_path(Config.RAW_MESSAGES_DIR, date_str)),
+            str(processed_dir),
+            date=date_str,
+            workers=_day_share(
+                Config.PROCESSOR_WORKERS or os.cpu_count() or 1,
+                concurrent_days
+            )
         )
 
         processor_messages_count = sum(
-            len(data["messages"]) for data in processor_result.values()
+            data["stats"].get("total_messages", 0)
+            for data in processor_result.values()
+        )
+        logger.info(
+            f"[Agent 2] [{date_str}] 完成處理，已處理訊息數：{processor_messages_count}"
         )
-        logger.info(f"[Agent 2] 完成處理，已處理訊息數：{processor_messages_count}")
         results["agents_results"]["processor"] = {
             "status": "success",
             "messages_processed": processor_messages_count,
-            "groups": len(processor_result)
+            "groups": len(processor_result),
+            "groups_unchanged": sum(
+                1 for data in processor_result.values() if data.get("skipped")
+            )
         }
 
         # ============ Agent 3: 摘要生成 ============
-        logger.info("[Agent 3] 開始摘要生成")
+        logger.info(f"[Agent 3] [{date_str}] 開始摘要生成")
+        summary_schedule = {}
+        summary_dir = partition_path(Config.SUMMARIES_DIR, date_str)
         summarizer_result = await generate_summaries(
-            "data/processed_messages",
-            "output/summaries"
+            str(processed_dir),
+            str(summary_dir),
+            date=date_str,
+            schedule_report=summary_schedule,
+            max_concurrent_groups=_day_share(
+                Config.SUMMARY_MAX_CONCURRENT_GROUPS,
+                concurrent_days
+            )
         )
 
-        logger.info(f"[Agent 3] 完成摘要，生成 {len(summarizer_result)} 份摘要")
+        logger.info(
+            f"[Agent 3] [{date_str}] 完成摘要，生成 {len(summarizer_result)} 份摘要"
+        )
         results["agents_results"]["summarizer"] = {
             "status": "success",
-            "summaries_generated": len(summarizer_result)
+            "summaries_generated": len(summarizer_result),
+            "schedule": summary_schedule
         }
 
+        if attachment_downloads:
+            results["agents_results"]["attachments"] = {
+                "status": "success",
+                **await _await_downloads(attachment_downloads)
+            }
+
         # ============ Agent 4: 發送 ============
-        logger.info("[Agent 4] 開始發送摘要")
+        logger.info(f"[Agent 4] [{date_str}] 開始發送摘要")
         sender = LineSender(Config.LINE_CHANNEL_ACCESS_TOKEN)
         send_results = await sender.send_batch_summaries(
             Config.USER_ID,
-            "output/summaries"
+            str(summary_dir),
+            date=date_str
         )
 
         success_count = sum(1 for v in send_results.values() if v)
-        logger.info(f"[Agent 4] 發送成功：{success_count}/{len(send_results)}")
+        logger.info(
+            f"[Agent 4] [{date_str}] 發送成功：{success_count}/{len(send_results)}"
+        )
         results["agents_results"]["sender"] = {
             "status": "success",
             "summaries_sent": success_count,
@@ -175,55 +401,139 @@ async def execute_pipeline() -> Dict[str, Any]:
         }
 
     except Exception as e:
-        logger.error(f"Pipeline execution failed: {e}")
+        logger.error(f"Pipeline execution failed for {date_str}: {e}")
         results["status"] = "failure"
         results["error"] = str(e)
+    finally:
+        # 失敗時也等待下載完成，釋放下載器的連線
+        if attachment_downloads:
+            await _await_downloads(attachment_downloads)
 
-    # 記錄結束時間和統計
-    end_time = datetime.now(pytz.timezone(Config.TIMEZONE))
-    duration = (end_time - start_time).total_seconds()
+    return results
 
-    results["end_time"] = end_time.isoformat()
-    results["duration_seconds"] = int(duration)
 
-    # 保存執行統計
-    stats = {
-        "last_execution": end_time.isoformat(),
-        "status": results["status"],
-        "duration_seconds": int(duration),
-        "next_execution": (
-            end_time.replace(hour=8, minute=0, second=0) + timedelta(days=1)
-        ).isoformat()
-    }
+def _day_share(limit: int, concurrent_days: int) -> Optional[int]:
+    """同時執行多天時每一天分到的並發上限 (內部函數)
 
-    # 合併 Agent 結果到統計
-    for agent, agent_result in results.get("agents_results", {}).items():
-        for key, value in agent_result.items():
-            if key != "status":
-                stats[f"{agent}_{key}"] = value
+    Returns:
+        limit 平分後的上限 (至少 1)；只有一天時為 None (使用預設上限)
+    """
+    if concurrent_days <= 1:
+        return None
+    return max(1, limit // concurrent_days)
 
-    # 保存統計檔案
-    stats_file = Path("data/execution_stats.json")
-    with open(stats_file, 'w', encoding='utf-8') as f:
-        json.dump(stats, f, ensure_ascii=False, indent=2)
 
-    logger.info(
-        f"完成，耗時 {int(duration // 60)} 分 {int(duration % 60)} 秒"
-    )
-    logger.info("=" * 60)
+async def _await_downloads(tasks: list) -> Dict[str, int]:
+    """等待附件下載 task 並合計下載統計 (內部函數)
 
-    return results
+    等待後清空列表；下載器本身的錯誤只記錄，不影響管道結果。
+
+    Args:
+        tasks: crawl_messages 加入的附件下載 task
+
+    Returns:
+        合計的下載統計
+    """
+    totals: Dict[str, int] = {}
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    tasks.clear()
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            logger.error(f"Attachment downloads failed: {outcome}")
+            continue
+        for key, value in outcome.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _carry_forward_schedules(
+    stats: Dict[str, Any],
+    previous: Dict[str, Any]
+) -> None:
+    """沿用上次執行的排程報告 (就地更新，內部函數)
+
+    所有摘要都沿用舊檔時 Agent 3 的排程報告為空，管道失敗時後面的階段
+    沒有報告；直接寫入會覆蓋 "{agent}_schedule"，下次執行的預估
+    (load_seconds_per_unit) 就沒有歷史。本次沒有量測到 seconds_per_unit
+    的階段改用上次的報告。
+
+    Args:
+        stats: 本次的執行統計
+        previous: 上次的執行統計
+    """
+    for key, report in previous.items():
+        if not key.endswith("_schedule") or not isinstance(report, dict):
+            continue
+        current = stats.get(key)
+        if not current or current.get("seconds_per_unit") is None:
+            stats[key] = report
+
+
+def _load_stats(stats_file: Path) -> Dict[str, Any]:
+    """讀取上次的執行統計，不存在或損壞時返回空字典 (內部函數)"""
+    try:
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable execution stats {stats_file}: {e}")
+        return {}
+    return stats if isinstance(stats, dict) else {}
+
+
+def _save_stats(stats_file: Path, stats: Dict[str, Any]) -> None:
+    """保存執行統計檔案 (內部函數)"""
+    stats_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(stats_file, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2)
 
 
 if __name__ == "__main__":
     """主程序入口
 
-    設置每日 08:00 執行任務
+    - 預設：設置每日 08:00 執行任務
+    - --backfill START END：補跑日期範圍內的每一天
+    - --migrate-layout：將舊的平坦目錄中的檔案移入日期分區後結束
     """
-    logger.info("Starting LINE Message Daily Summary Scheduler")
+    parser = argparse.ArgumentParser(
+        description="LINE Message Daily Summary Scheduler"
+    )
+    parser.add_argument(
+        "--backfill",
+        nargs=2,
+        metavar=("START_DATE", "END_DATE"),
+        help="run the pipeline for every date in the range (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--max-days",
+        type=int,
+        default=None,
+        help="max number of days to run concurrently in backfill mode"
+    )
+    parser.add_argument(
+        "--migrate-layout",
+        action="store_true",
+        help="move files of the old flat data layout into date partitions"
+    )
+    args = parser.parse_args()
+
+    if args.migrate_layout:
+        migrate_flat_layout([
+            Config.RAW_MESSAGES_DIR,
+            Config.PROCESSED_MESSAGES_DIR,
+            Config.SUMMARIES_DIR,
+        ])
+        raise SystemExit(0)
 
     # 驗證配置
     Config.validate()
 
-    # 啟動排程
-    schedule_daily_tasks("08:00")
+    if args.backfill:
+        logger.info("Starting LINE Message Summary backfill")
+        asyncio.run(execute_backfill(*args.backfill, args.max_days))
+    else:
+        logger.info("Starting LINE Message Daily Summary Scheduler")
+
+        # 啟動排程
+        schedule_daily_tasks("08:00")
@@ -1,12 +1,18 @@
 """Summary generator for Agent 3 - Generates summaries using Claude API"""
 
 import logging
-import asyncio
 import json
-from typing import Dict
+from typing import Dict, List, Optional
 from pathlib import Path
 
 from src.config import Config
+from src.models import MessageBatch
+from src.utils.lpt_scheduler import load_seconds_per_unit, run_lpt
+from src.utils.partitions import (
+    MANIFEST_NAME,
+    outputs_by_source,
+    refresh_manifest,
+)
 from src.utils.summarizer_utils import (
     create_summary_prompt,
     call_claude_api,
@@ -20,25 +26,38 @@ logger = logging.getLogger(__name__)
 async def generate_summaries(
     processed_dir: str,
     output_dir: str,
-    model: str = "claude-3-5-sonnet-20241022"
+    model: str = "claude-3-5-sonnet-20241022",
+    date: Optional[str] = None,
+    schedule_report: Optional[Dict] = None,
+    force: bool = False,
+    max_concurrent_groups: Optional[int] = None
 ) -> Dict[str, str]:
     """生成所有摘要的主函數
 
     流程：
-    1. 讀取 Agent 2 的輸出 JSON (data/processed_messages/)
+    1. 讀取 Agent 2 的輸出 JSON (data/processed_messages/ 的日期分區)，
+       略過內容與上次生成摘要時相同的檔案 (沿用既有摘要，不調用 API)
     2. 為每個群組構建 prompt（優化成本）
-    3. 並發調用 Claude API
+    3. 並發調用 Claude API (最多 SUMMARY_MAX_CONCURRENT_GROUPS 個，訊息量
+       大的群組先開始)
     4. 格式化為 Markdown
     5. 輸出為 output/summaries/{group_id}_{date}.md
-    6. 生成 HTML 索引頁面
+    6. 生成 HTML 索引頁面，並在輸出目錄的 manifest 記錄每份摘要的來源
+       雜湊
 
     Args:
-        processed_dir: 處理後訊息的目錄 (預設: data/processed_messages)
-        output_dir: 輸出目錄 (預設: output/summaries)
+        processed_dir: 處理後訊息的目錄 (data/processed_messages/YYYY/MM/DD)
+        output_dir: 輸出目錄 (output/summaries/YYYY/MM/DD)
         model: Claude 模型選擇
+        date: 只處理該日期 (YYYY-MM-DD) 的檔案，索引頁面輸出為
+            index_{date}.html；預設處理目錄中所有檔案並輸出 index.html
+        schedule_report: 若提供，寫入排程統計 (預估/實際 makespan)
+        force: 忽略 manifest，重新生成所有摘要
+        max_concurrent_groups: 同時生成摘要的群組數上限 (預設
+            Config.SUMMARY_MAX_CONCURRENT_GROUPS)
 
     Returns:
-        字典結構:
+        字典結構 (包含沿用的摘要):
         {
             "group_id_1": "path/to/summary_file.md",
             "group_id_2": "path/to/summary_file.md",
@@ -63,10 +82,12 @@ async def generate_summaries(
             f"Processed messages directory not found: {processed_dir}"
         )
 
-    # 找到所有訊息檔案（不是 stats 檔案）
+    # 找到所有訊息檔案（不是 stats 檔案和 manifest）
     message_files = [
         f for f in processed_path.glob('*.json')
         if not f.name.startswith('stats_')
+        and f.name != MANIFEST_NAME
+        and (not date or f.stem.endswith(f"_{date}"))
     ]
 
     if not message_files:
@@ -75,10 +96,25 @@ async def generate_summaries(
 
     logger.info(f"Found {len(message_files)} message files to summarize")
 
+    # 來源未變更且摘要未被修改的群組沿用既有摘要 (不調用 API)
+    processed_manifest = refresh_manifest(processed_path)
+    outcomes = {} if force else _reusable_summaries(
+        message_files,
+        processed_manifest,
+        refresh_manifest(output_path),
+        output_path
+    )
+    pending_files = [f for f in message_files if f.name not in outcomes]
+    if outcomes:
+        logger.info(
+            f"Skipping {len(outcomes)} unchanged groups, "
+            f"{len(pending_files)} to summarize"
+        )
+
     # 讀取統計檔案
-    stats_files = list(processed_path.glob('stats_*.json'))
+    stats_files = list(processed_path.glob(f"stats_{date or '*'}.json"))
     stats_by_date = {}
-    date = None
+    index_name = f"index_{date}.html" if date else "index.html"
 
     for stats_file in stats_files:
         try:
@@ -90,35 +126,72 @@ async def generate_summaries(
         except Exception as e:
             logger.warning(f"Error reading stats file {stats_file}: {e}")
 
-    # 並發生成摘要
-    tasks = [
-        _generate_single_summary(
-            msg_file,
-            output_path,
-            model,
-            stats_by_date
+    # 並發生成摘要，依當日統計的訊息量由大到小啟動 (LPT 排程)
+    annotations = {}
+    if pending_files:
+        volumes = {
+            msg_file.name: stats_by_date[group_id].get('total_messages', 0)
+            for msg_file in pending_files
+            for group_id in [msg_file.stem.rsplit('_', 1)[0]]
+            if group_id in stats_by_date
+        }
+        results_by_file, report = await run_lpt(
+            {
+                msg_file.name: (
+                    lambda f=msg_file: _generate_single_summary(
+                        f,
+                        output_path,
+                        model,
+                        stats_by_date
+                    )
+                )
+                for msg_file in pending_files
+            },
+            volumes,
+            max_concurrent_groups or Config.SUMMARY_MAX_CONCURRENT_GROUPS,
+            seconds_per_unit=load_seconds_per_unit(
+                Config.EXECUTION_STATS_FILE,
+                "summarizer_schedule"
+            )
         )
-        for msg_file in message_files
-    ]
+        if schedule_report is not None:
+            schedule_report.update(report)
 
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+        for msg_file in pending_files:
+            result = results_by_file[msg_file.name]
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Failed to generate summary for {msg_file}: {result}"
+                )
+                continue
 
-    # 整理結果
+            group_id, file_path, group_info = result
+            outcomes[msg_file.name] = result
+            annotations[Path(file_path).name] = {
+                "source": msg_file.name,
+                "source_sha256": processed_manifest["files"]
+                .get(msg_file.name, {}).get("sha256"),
+                "group_id": group_id,
+                "group_info": {
+                    key: value for key, value in group_info.items()
+                    if key != 'file_path'
+                },
+            }
+
+    # 整理結果 (依訊息檔案順序)
     summary_results = {}
     summaries_info = {}
 
-    for msg_file, result in zip(message_files, results):
-        if isinstance(result, Exception):
-            logger.error(f"Failed to generate summary for {msg_file}: {result}")
-        else:
-            group_id, file_path, group_info = result
+    for msg_file in message_files:
+        if msg_file.name in outcomes:
+            group_id, file_path, group_info = outcomes[msg_file.name]
             summary_results[group_id] = str(file_path)
             summaries_info[group_id] = group_info
 
-    # 生成 HTML 索引頁面
-    if summary_results and date:
+    # 生成 HTML 索引頁面 (全部沿用且索引已存在時不重新生成)
+    index_path = output_path / index_name
+    if summary_results and date and (annotations or not index_path.exists()):
         try:
-            index_path = output_path / "index.html"
             index_html = generate_index_html(date, summaries_info)
 
             with open(index_path, 'w', encoding='utf-8') as f:
@@ -128,14 +201,55 @@ async def generate_summaries(
         except Exception as e:
             logger.error(f"Error generating index page: {e}")
 
+    # 記錄摘要的來源雜湊，下次執行時略過未變更的群組
+    refresh_manifest(output_path, annotations)
+
     logger.info(
         f"Summary generation completed: "
-        f"{len(summary_results)} summaries generated"
+        f"{len(annotations)} summaries generated, "
+        f"{len(summary_results) - len(annotations)} unchanged"
     )
 
     return summary_results
 
 
+def _reusable_summaries(
+    message_files: List[Path],
+    processed_manifest: Dict,
+    summary_manifest: Dict,
+    output_path: Path
+) -> Dict[str, tuple]:
+    """找出來源未變更、可沿用既有摘要的訊息檔案 (內部函數)
+
+    摘要被修改或刪除時 manifest 的記錄會失去來源欄位，因此會重新生成。
+
+    Returns:
+        {訊息檔名: (group_id, 摘要檔案路徑, group_info)}
+    """
+    summaries = outputs_by_source(summary_manifest)
+    reused = {}
+
+    for msg_file in message_files:
+        summary_name, entry = summaries.get(msg_file.name, (None, {}))
+        source = processed_manifest["files"].get(msg_file.name)
+        if (
+            not summary_name
+            or not source
+            or "group_info" not in entry
+            or entry.get("source_sha256") != source["sha256"]
+        ):
+            continue
+
+        summary_file = output_path / summary_name
+        reused[msg_file.name] = (
+            entry["group_id"],
+            summary_file,
+            {**entry["group_info"], "file_path": str(summary_file)},
+        )
+
+    return reused
+
+
 async def _generate_single_summary(
     msg_file: Path,
     output_path: Path,
@@ -163,7 +277,11 @@ async def _generate_single_summary(
         group_id = message_data.get('group_id', '')
         group_name = message_data.get('group_name', '')
         date = message_data.get('date', '')
-        messages = message_data.get('messages', [])
+        messages = MessageBatch.from_dicts(
+            message_data.get('messages', []),
+            Config.TIMEZONE
+        )
+        message_data['messages'] = messages
 
         # 獲取該群組的統計信息
         group_stats = stats_by_date.get(group_id, {})
@@ -200,6 +318,7 @@ async def _generate_single_summary(
         # 準備群組信息用於索引
         group_info = {
             'group_name': group_name,
+            'picture_url': message_data.get('picture_url'),
             'file_path': str(output_file),
             'message_count': len(messages),
         }
@@ -0,0 +1,248 @@
+"""Crawler benchmark - Drives crawl_messages against the local LINE API stand-in"""
+
+import logging
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from typing import Any, Dict, Optional
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+import pytz
+
+from aiohttp import web
+
+from src.agent_crawler import crawl_messages
+from src.config import Config
+from src.fake_line_api import (
+    FakeLineApi,
+    add_fake_api_arguments,
+    create_fake_app,
+    fake_api_from_args,
+)
+from src.utils.line_handler import LineHandler
+from src.utils.message_store import MessageStore
+from src.utils.rate_limiter import get_rate_limiter, reset_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+async def run_benchmark(
+    api: FakeLineApi,
+    groups: int = 1000,
+    messages_per_group: int = 50,
+    senders_per_group: int = 10,
+    lazy_senders: bool = True,
+    attachment_rate: float = 0.0,
+    work_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """在假 LINE API 上執行一次完整爬蟲並回報吞吐量和延遲
+
+    流程：
+    1. 在隨機埠啟動假 API 伺服器
+    2. 為每個合成群組寫入訊息到訊息儲存 (模擬 webhook 已接收)
+    3. 將 Config 指向假 API 和暫存目錄後執行 crawl_messages
+    4. 彙整爬蟲耗時、伺服器請求數和各端點的 p50/p99 延遲
+
+    Args:
+        api: FakeLineApi 實例
+        groups: 合成群組數
+        messages_per_group: 每個群組的訊息數
+        senders_per_group: 每個群組的發言者數
+        lazy_senders: 是否只解析發言者名稱 (False 時抓取完整成員列表)
+        attachment_rate: 圖片訊息 (需下載附件) 的比例
+        work_dir: 輸出目錄 (預設使用暫存目錄)
+
+    Returns:
+        {
+            "groups": 1000,
+            "messages": 50000,
+            "duration_seconds": 12.3,
+            "groups_per_second": 81.3,
+            "api_requests_per_second": 1620.5,
+            "endpoints": {"profile": {"p50_ms": ..., "p99_ms": ...}, ...},
+            "server": {...}
+        }
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base = Path(work_dir or tmp_dir)
+
+        runner = web.AppRunner(create_fake_app(api))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = runner.addresses[0][:2]
+
+        try:
+            with _benchmark_config(base, f"http://{host}:{port}", lazy_senders):
+                date = datetime.now(pytz.timezone(Config.TIMEZONE)).date()
+                group_ids = [f"C{i:032x}" for i in range(groups)]
+                total_messages = await _seed_messages(
+                    api,
+                    group_ids,
+                    date - timedelta(days=1),
+                    messages_per_group,
+                    senders_per_group,
+                    attachment_rate
+                )
+
+                reset_rate_limiter()
+                started = time.perf_counter()
+                await crawl_messages(group_ids, date.isoformat())
+                duration = time.perf_counter() - started
+                limiter_stats = get_rate_limiter().stats()
+        finally:
+            await runner.cleanup()
+
+    server_stats = api.stats()
+    report = {
+        "groups": groups,
+        "messages": total_messages,
+        "lazy_senders": lazy_senders,
+        "duration_seconds": round(duration, 3),
+        "groups_per_second": round(groups / duration, 2),
+        "messages_per_second": round(total_messages / duration, 2),
+        "api_requests_per_second": round(
+            server_stats["total_requests"] / duration, 2
+        ),
+        "endpoints": limiter_stats,
+        "server": server_stats,
+    }
+
+    logger.info(
+        f"Crawled {groups} groups ({total_messages} messages) in "
+        f"{duration:.2f}s: {report['groups_per_second']} groups/s, "
+        f"{report['api_requests_per_second']} API requests/s"
+    )
+    for endpoint, stats in limiter_stats.items():
+        logger.info(
+            f"  {endpoint}: {stats['requests']} requests, "
+            f"p50 {stats['p50_ms']}ms, p99 {stats['p99_ms']}ms, "
+            f"{stats['throttled']} throttled"
+        )
+
+    return report
+
+
+async def _seed_messages(
+    api: FakeLineApi,
+    group_ids: list,
+    crawl_date,
+    messages_per_group: int,
+    senders_per_group: int,
+    attachment_rate: float = 0.0
+) -> int:
+    """將合成訊息寫入訊息儲存 (內部函數)
+
+    Returns:
+        寫入的訊息總數
+    """
+    tz = pytz.timezone(Config.TIMEZONE)
+    day_start = tz.localize(
+        datetime.combine(crawl_date, datetime.min.time())
+    ) + timedelta(hours=1)
+    start_ms = int(day_start.timestamp() * 1000)
+    span_ms = 20 * 3600 * 1000
+    rng = random.Random(api.seed)
+
+    store = MessageStore(Config.WEBHOOK_STORE_DIR, timezone=Config.TIMEZONE)
+    await store.start()
+    total = 0
+    try:
+        for group_id in group_ids:
+            senders = api.group_members(group_id)[:senders_per_group]
+            items = []
+            for i in range(messages_per_group):
+                timestamp_ms = start_ms + rng.randrange(span_ms)
+                message_id = f"{group_id[-8:]}{i:06d}"
+                is_image = rng.random() < attachment_rate
+                items.append((group_id, {
+                    "message_id": message_id,
+                    "timestamp": LineHandler.convert_timestamp_to_iso8601(
+                        timestamp_ms,
+                        Config.TIMEZONE
+                    ),
+                    "timestamp_ms": timestamp_ms,
+                    "sender_id": rng.choice(senders) if senders else "",
+                    "sender_name": "",
+                    "message_type": "image" if is_image else "text",
+                    "content": "[Image]" if is_image else f"benchmark message {i}",
+                    "attachments": [f"image_{message_id}"] if is_image else [],
+                }))
+            await store.append_many(items)
+            total += len(items)
+    finally:
+        await store.stop()
+    return total
+
+
+@contextmanager
+def _benchmark_config(base: Path, api_base_url: str, lazy_senders: bool):
+    """暫時將 Config 指向假 API 和 benchmark 目錄 (內部函數)"""
+    overrides = {
+        "LINE_API_BASE_URL": api_base_url,
+        "LINE_DATA_API_BASE_URL": api_base_url,
+        "ATTACHMENTS_DIR": str(base / "attachments"),
+        "LINE_CHANNEL_ACCESS_TOKEN": "benchmark_token",
+        "LAZY_SENDER_RESOLUTION": lazy_senders,
+        "WEBHOOK_STORE_DIR": str(base / "webhook_messages"),
+        "RAW_MESSAGES_DIR": str(base / "raw_messages"),
+        "PROFILE_CACHE_PATH": str(base / "profiles.sqlite3"),
+    }
+    saved = {name: getattr(Config, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(Config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+
+def main() -> None:
+    """命令列入口
+
+    python -m src.benchmark_crawler --groups 1000 --latency-ms 30 --throttle-rate 0.01
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark crawl_messages against a local LINE API stand-in"
+    )
+    parser.add_argument("--groups", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=50,
+                        help="messages per group")
+    parser.add_argument("--senders", type=int, default=10,
+                        help="active senders per group")
+    parser.add_argument("--eager", action="store_true",
+                        help="fetch full member lists instead of active senders")
+    parser.add_argument("--attachment-rate", type=float, default=0.0,
+                        help="fraction of messages that are images to download")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    add_fake_api_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='[%(asctime)s] %(levelname)s: %(message)s'
+    )
+    logger.setLevel(logging.INFO)
+
+    report = asyncio.run(run_benchmark(
+        fake_api_from_args(args),
+        groups=args.groups,
+        messages_per_group=args.messages,
+        senders_per_group=args.senders,
+        lazy_senders=not args.eager,
+        attachment_rate=args.attachment_rate
+    ))
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,712 @@
+"""Chat export importer - Bootstraps raw messages from LINE chat-history exports"""
+
+import logging
+import argparse
+import hashlib
+import json
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as date_type, datetime, timedelta
+from itertools import compress, repeat
+from operator import contains, is_
+from typing import Dict, Iterator, List, Optional, Tuple
+from pathlib import Path
+
+from src.agent_crawler import write_group_messages
+from src.config import Config
+from src.utils.time_utils import get_timezone, ms_to_iso8601
+
+logger = logging.getLogger(__name__)
+
+# 每次讀取的區塊大小 (bytes)
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# 時間前綴：09:15 / 上午09:15 / 午後1:30 / 9:15 PM
+_TIME_RE = re.compile(
+    r"(?:(上午|下午|午前|午後|AM|PM) ?)?(\d{1,2}):(\d{2})(?: ?(AM|PM))?"
+)
+
+# 日期標題：2026/02/16(Mon) / 2026/02/16（一） / 2026.02.16 星期一
+_DATE_RE = re.compile(
+    r"(\d{4})[/.](\d{1,2})[/.](\d{1,2})"
+    r" ?(?:[（(][^）)]{0,12}[）)]|[^\W\d][^\t]{0,11})?$"
+)
+
+# 匯出檔第一行：[LINE] Chat history in 群組 / [LINE] 「群組」的聊天記錄
+_TITLE_RE = re.compile(
+    r"^\[LINE\]\s*(?:Chat history in |Chat history with )?「?(.+?)」?"
+    r"(?:的聊天記錄|的聊天|とのトーク履歴|のトーク履歴)?\s*$"
+)
+
+# 需要逐行處理的行 (_line_kinds 不是 2)
+_IRREGULAR_RE = re.compile(rb"[^\x02]")
+
+_PM = ("下午", "午後", "PM")
+_AM = ("上午", "午前", "AM")
+
+# 匯出檔中的媒體標記 → (message_type, 與爬蟲相同的內容佔位符)
+_MEDIA_MARKERS = {
+    "[Photo]": ("image", "[Image]"),
+    "[照片]": ("image", "[Image]"),
+    "[写真]": ("image", "[Image]"),
+    "[Album]": ("image", "[Image]"),
+    "[相簿]": ("image", "[Image]"),
+    "[Video]": ("video", "[Video]"),
+    "[影片]": ("video", "[Video]"),
+    "[動画]": ("video", "[Video]"),
+    "[Sticker]": ("sticker", "[Sticker]"),
+    "[貼圖]": ("sticker", "[Sticker]"),
+    "[スタンプ]": ("sticker", "[Sticker]"),
+    "[Voice message]": ("audio", "[Audio]"),
+    "[Audio]": ("audio", "[Audio]"),
+    "[語音訊息]": ("audio", "[Audio]"),
+    "[ボイスメッセージ]": ("audio", "[Audio]"),
+    "[File]": ("file", "[File] Unknown"),
+    "[檔案]": ("file", "[File] Unknown"),
+    "[ファイル]": ("file", "[File] Unknown"),
+}
+
+
+class ExportStats:
+    """單一匯出檔的解析統計"""
+
+    __slots__ = ("lines", "messages", "skipped")
+
+    def __init__(self) -> None:
+        self.lines = 0
+        self.messages = 0
+        self.skipped = 0
+
+
+class ExportDay:
+    """匯出檔中一天的訊息 (欄位分開存放，不為每則訊息建立物件)
+
+    Attributes:
+        date: 日期 (匯出檔的當地日期)
+        timestamps_ms: 訊息時間戳 (毫秒)
+        senders: 發送者顯示名稱
+        contents: 訊息內容 (多行訊息已還原)
+    """
+
+    __slots__ = ("date", "timestamps_ms", "senders", "contents")
+
+    def __init__(self, date: Optional[date_type] = None) -> None:
+        self.date = date
+        self.timestamps_ms: List[int] = []
+        self.senders: List[str] = []
+        self.contents: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.timestamps_ms)
+
+
+def read_export_title(path: Path) -> Optional[str]:
+    """讀取匯出檔第一行中的群組名稱
+
+    Args:
+        path: 匯出檔路徑
+
+    Returns:
+        群組名稱，無法辨識時為 None
+    """
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        match = _TITLE_RE.match(f.readline().strip())
+    return match.group(1) if match else None
+
+
+def iter_export_days(
+    path: Path,
+    timezone: str = "Asia/Taipei",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stats: Optional[ExportStats] = None
+) -> Iterator[ExportDay]:
+    """串流解析匯出檔，逐日產生訊息
+
+    檔案以 chunk_size 分塊讀取 (在換行處切開)，每塊解碼一次後切成行
+    交給 _ExportParser；記憶體用量與檔案大小無關 (只保留當天的訊息)。
+
+    多行訊息在匯出檔中以雙引號包住 (內部的 " 寫成 "")，解析時還原。
+    系統訊息 (沒有發送者欄位，例如加入群組) 和第一個日期標題之前的
+    內容會略過。
+
+    Args:
+        path: 匯出檔路徑 (UTF-8，可含 BOM，LF 或 CRLF)
+        timezone: 匯出檔時間所在的時區
+        chunk_size: 每次讀取的 bytes 數
+        stats: 若提供，累計行數/訊息數/略過數
+
+    Yields:
+        每天的訊息 (ExportDay)，依檔案順序
+    """
+    if stats is None:
+        stats = ExportStats()
+    parser = _ExportParser(get_timezone(timezone), stats)
+    pending = b""
+    first = True
+
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            final = not data
+            if final:
+                data, pending = pending, b""
+            else:
+                data = pending + data
+                cut = data.rfind(b"\n") + 1
+                data, pending = data[:cut], data[cut:]
+
+            text = data.decode("utf-8-sig" if first else "utf-8")
+            first = first and not data
+            if "\r" in text:
+                text = text.replace("\r\n", "\n")
+
+            yield from parser.feed(text)
+            if final:
+                break
+
+    yield from parser.close()
+
+
+class _ExportParser:
+    """匯出檔的逐行解析狀態 (內部類別)
+
+    出現過的時間前綴 (例如 "09:15" 或 "下午3:05") 快取為距當地午夜的
+    毫秒數，加上當天午夜的時間戳即為訊息時間戳。每塊文字只切成行和欄位
+    各一次，一般訊息 (剛好兩個 tab) 以 slice/map 整段轉換，不需逐行執行
+    Python；只有日期標題、多行訊息後續行和系統訊息逐行處理，regex 只用於
+    這些行和第一次出現的時間前綴。沒有 \t" 的區塊不需檢查引號。
+
+    日光節約時間切換的日子 (一天不是 24 小時) 不使用快速路徑，逐行以
+    當地時間換算。
+
+    內容以 " 開頭且引號尚未結束的訊息是多行訊息的開頭：之後的行 (即使
+    剛好兩個 tab 或以時間開頭) 都接到這則訊息，直到結尾引號。引號到
+    日期標題或檔案結尾仍未結束時，視為一般以 " 開頭的訊息，吸收的行
+    重新解析。
+    """
+
+    __slots__ = (
+        "tz", "stats", "day", "day_start", "prefix_offsets", "hour_starts",
+        "continued", "in_message", "in_quote"
+    )
+
+    def __init__(self, tz, stats: ExportStats) -> None:
+        self.tz = tz
+        self.stats = stats
+        self.day = ExportDay()
+        self.day_start: Optional[int] = None
+        self.prefix_offsets: Dict[str, int] = {}
+        self.hour_starts: Dict[int, int] = {}
+        self.continued: List[int] = []
+        self.in_message = False
+        self.in_quote = False
+
+    def feed(self, text: str) -> List[ExportDay]:
+        """解析一塊完整的行 (以換行結尾，檔案最後一塊除外)
+
+        Returns:
+            這塊文字中結束的日子
+        """
+        lines = text.split("\n")
+        if not lines[-1]:
+            lines.pop()
+        self.stats.lines += len(lines)
+        finished = []
+        self._feed_lines(
+            lines,
+            text.replace("\n", "\t").split("\t"),
+            '\t"' in text,
+            finished
+        )
+        return finished
+
+    def _feed_lines(
+        self,
+        lines: List[str],
+        fields: List[str],
+        quotes: bool,
+        finished: List
+    ) -> None:
+        """解析一批行
+
+        Args:
+            lines: 行
+            fields: 所有行以 tab 切開的欄位 (依序串接)
+            quotes: 行中是否可能有以 " 開頭的內容 (含 \t")
+            finished: 結束的日子加入此列表
+        """
+        # 只有 tab 數不是 2 的行 (日期標題、多行訊息、系統訊息) 和可能開啟
+        # 引號的行 (含 \t") 逐行處理，其間連續的一般訊息一次轉換；欄位位置
+        # 依前面各行的 tab 數推算
+        start = field = 0
+        for match in _IRREGULAR_RE.finditer(_line_kinds(lines, quotes)):
+            k = match.start()
+            end = field + 3 * (k - start)
+            if k > start:
+                self._extend_run(lines[start:k], fields[field:end], finished)
+            self._parse_line(lines[k], finished)
+            start = k + 1
+            field = end + lines[k].count("\t") + 1
+        if start:
+            lines = lines[start:]
+            fields = fields[field:field + 3 * len(lines)]
+        self._extend_run(lines, fields, finished)
+
+    def close(self) -> List[ExportDay]:
+        """結束解析，返回最後一天"""
+        finished = []
+        self._abandon_quote(finished)
+        self._finish_day(finished)
+        return finished
+
+    def _extend_run(
+        self,
+        lines: List[str],
+        fields: List[str],
+        finished: List
+    ) -> None:
+        """加入一段每行剛好兩個 tab、不含 \t" 的行 (fields 為這些行的欄位，
+        每行 3 個)
+
+        多行訊息引號內的行逐行接到上一則訊息，其餘以 _extend_regular 整段
+        轉換。
+        """
+        if self.in_quote:
+            k = 0
+            while k < len(lines) and self.in_quote:
+                self._parse_line(lines[k], finished)
+                k += 1
+            lines = lines[k:]
+            fields = fields[3 * k:]
+        self._extend_regular(lines, fields, finished)
+
+    def _extend_regular(
+        self,
+        lines: List[str],
+        fields: List[str],
+        finished: List
+    ) -> None:
+        """加入一段連續的一般訊息 (每行剛好兩個 tab，沒有開啟引號)
+
+        時間前綴查詢和時間戳換算都在 C 層完成；有無效的時間前綴或當天是
+        日光節約時間切換日時改為逐行處理。
+        """
+        if not lines:
+            return
+
+        if self.day_start is not None:
+            prefixes = fields[0::3]
+            offsets = list(map(self.prefix_offsets.get, prefixes))
+            if None in offsets:
+                unknown = set(compress(prefixes, map(is_, offsets, repeat(None))))
+                for prefix in unknown:
+                    self._learn_prefix(prefix)
+                offsets = list(map(self.prefix_offsets.get, prefixes))
+
+            if None not in offsets:
+                day = self.day
+                day.timestamps_ms.extend(map(self.day_start.__add__, offsets))
+                day.senders.extend(fields[1::3])
+                day.contents.extend(fields[2::3])
+                self.in_message = True
+                return
+
+        for line in lines:
+            self._parse_line(line, finished)
+
+    def _learn_prefix(self, prefix: str) -> Optional[int]:
+        """解析並快取時間前綴
+
+        Returns:
+            距當地午夜的毫秒數，不是有效的時間前綴時為 None
+        """
+        match = _TIME_RE.fullmatch(prefix)
+        offset = _time_offset_ms(match) if match is not None else None
+        if offset is not None:
+            self.prefix_offsets[prefix] = offset
+        return offset
+
+    def _parse_line(self, line: str, finished: List) -> None:
+        """逐行解析：日期標題、多行訊息後續行、系統訊息、新的時間前綴"""
+        if self.in_quote:
+            if not (line[:4].isdigit() and _DATE_RE.match(line)):
+                self._continue_message(line)
+                return
+            self._abandon_quote(finished)
+
+        prefix, sep, rest = line.partition("\t")
+        offset = self.prefix_offsets.get(prefix)
+
+        if offset is None:
+            offset = self._learn_prefix(prefix) if sep else None
+            if offset is None:
+                match = _DATE_RE.match(line) if line[:4].isdigit() else None
+                if match is not None:
+                    self._start_day(match, finished)
+                elif self.in_message:
+                    self._continue_message(line)
+                elif sep:
+                    self.stats.skipped += 1
+                return
+
+        sender, sep, content = rest.partition("\t")
+        day = self.day
+        if not sep or day.date is None:
+            self.in_message = False
+            self.stats.skipped += 1
+            return
+        if self.day_start is not None:
+            day.timestamps_ms.append(self.day_start + offset)
+        else:
+            day.timestamps_ms.append(self._local_timestamp_ms(offset))
+        day.senders.append(sender)
+        day.contents.append(content)
+        self.in_message = True
+        self.in_quote = _quote_open(content)
+
+    def _start_day(self, match: "re.Match", finished: List) -> None:
+        """處理日期標題"""
+        self.in_message = False
+        try:
+            new_day = date_type(*map(int, match.groups()))
+        except ValueError:
+            self.stats.skipped += 1
+            return
+        if new_day == self.day.date:
+            return
+
+        self._finish_day(finished)
+        self.day = ExportDay(new_day)
+        self.hour_starts = {}
+        start = _hour_start_ms(self.tz, new_day, 0)
+        next_start = _hour_start_ms(self.tz, new_day + timedelta(days=1), 0)
+        self.day_start = start if next_start - start == 86400000 else None
+
+    def _continue_message(self, line: str) -> None:
+        """多行訊息的後續行接到上一則訊息"""
+        contents = self.day.contents
+        contents[-1] += "\n" + line
+        last = len(contents) - 1
+        if not self.continued or self.continued[-1] != last:
+            self.continued.append(last)
+        if self.in_quote:
+            self.in_quote = _quote_open(contents[-1])
+
+    def _abandon_quote(self, finished: List) -> None:
+        """引號到日期標題或檔案結尾仍未結束：該訊息只保留第一行，
+        吸收的行重新解析 (其中的訊息也可能開啟引號，重複處理)"""
+        while self.in_quote:
+            contents = self.day.contents
+            first, *rest = contents[-1].split("\n")
+            contents[-1] = first
+            if self.continued and self.continued[-1] == len(contents) - 1:
+                self.continued.pop()
+            self.in_quote = False
+            self.in_message = True
+            self._feed_lines(
+                rest,
+                "\t".join(rest).split("\t"),
+                True,
+                finished
+            )
+
+    def _finish_day(self, finished: List[ExportDay]) -> None:
+        """還原當天的多行訊息，將當天加入 finished"""
+        day = self.day
+        if not day:
+            return
+        contents = day.contents
+        for index in self.continued:
+            contents[index] = _unquote(contents[index])
+        self.stats.messages += len(day)
+        finished.append(day)
+        self.day = ExportDay(day.date)
+        self.continued = []
+
+    def _local_timestamp_ms(self, offset: int) -> int:
+        """日光節約時間切換日：依當地小時換算距午夜 offset 毫秒的時間戳"""
+        hour, rest = divmod(offset, 3600000)
+        start = self.hour_starts.get(hour)
+        if start is None:
+            start = self.hour_starts[hour] = _hour_start_ms(
+                self.tz, self.day.date, hour
+            )
+        return start + rest
+
+
+def _time_offset_ms(match: "re.Match") -> Optional[int]:
+    """時間前綴距當地午夜的毫秒數 (內部函數)
+
+    Returns:
+        毫秒數，時間無效時為 None
+    """
+    p1, hour, minute, p2 = match.groups()
+    h = int(hour)
+    m = int(minute)
+    period = p1 or p2
+    if period is not None:
+        if period in _PM:
+            if h < 12:
+                h += 12
+        elif period in _AM and h == 12:
+            h = 0
+    if h > 23 or m > 59:
+        return None
+    return h * 3600000 + m * 60000
+
+
+def _hour_start_ms(tz, day: date_type, hour: int) -> int:
+    """當地某日某小時開始的毫秒時間戳 (內部函數)"""
+    local = tz.localize(datetime(day.year, day.month, day.day, hour))
+    return int(local.timestamp()) * 1000
+
+
+def _line_kinds(lines: List[str], quotes: bool) -> bytes:
+    """每行一個 byte：一般訊息為 2，其他值為需要逐行處理的行 (內部函數)
+
+    一般訊息是剛好兩個 tab 且不含 \t" (不可能開啟引號) 的行；quotes 為
+    False 時呼叫者已確認沒有任何行含 \t"。
+
+    Args:
+        lines: 行
+        quotes: 是否需要檢查 \t"
+
+    Returns:
+        與 lines 等長的 bytes
+    """
+    try:
+        kinds = bytes(map(str.count, lines, repeat("\t")))
+    except ValueError:
+        kinds = bytes(map(min, map(str.count, lines, repeat("\t")), repeat(255)))
+    if quotes:
+        # 含 \t" 的行加上 0x80 (tab 數超過 127 的行本來就不是 2)
+        marks = bytes(map(contains, lines, repeat('\t"')))
+        kinds = (
+            int.from_bytes(kinds, "big") | int.from_bytes(marks, "big") << 7
+        ).to_bytes(len(lines), "big")
+    return kinds
+
+
+def _quote_open(content: str) -> bool:
+    """內容是否以 " 開頭且尚未以結尾引號結束 (內部函數)
+
+    引號內的 " 寫成 ""，因此結尾的連續引號為奇數個時才是結尾引號。
+    """
+    if content[:1] != '"':
+        return False
+    body = content[1:]
+    return (len(body) - len(body.rstrip('"'))) % 2 == 0
+
+
+def _unquote(content: str) -> str:
+    """去除結尾空行，並還原多行訊息的引號包裝 (內部函數)"""
+    content = content.rstrip("\n")
+    if "\n" in content and content[0] == '"' and content[-1] == '"':
+        content = content[1:-1].replace('""', '"')
+    return content
+
+
+def export_to_messages(
+    group_id: str,
+    day: ExportDay,
+    timezone: str = "Asia/Taipei"
+) -> List[dict]:
+    """將解析結果轉換為 crawl_messages 的原始訊息格式
+
+    匯出檔沒有訊息 ID 和 user ID，因此：
+    - message_id 由 (群組, 時間, 發送者, 內容, 同內容出現次數) 雜湊產生，
+      重新匯入同一份 (或涵蓋範圍更大的) 匯出檔時會合併而不是重複
+    - sender_id 由群組和顯示名稱雜湊產生 (同一群組內同名視為同一人)
+
+    Args:
+        group_id: 群組 ID
+        day: iter_export_days 產生的一天
+        timezone: 時區
+
+    Returns:
+        訊息列表
+    """
+    seen: Dict[Tuple[int, str, str], int] = {}
+    sender_ids: Dict[str, str] = {}
+    messages = []
+
+    for timestamp_ms, sender, content in zip(
+        day.timestamps_ms, day.senders, day.contents
+    ):
+        key = (timestamp_ms, sender, content)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+
+        sender_id = sender_ids.get(sender)
+        if sender_id is None:
+            sender_id = sender_ids[sender] = "U" + hashlib.blake2b(
+                f"{group_id}\x1f{sender}".encode("utf-8"),
+                digest_size=16
+            ).hexdigest()
+
+        message_id = "export_" + hashlib.blake2b(
+            f"{group_id}\x1f{timestamp_ms}\x1f{sender}\x1f{content}"
+            f"\x1f{occurrence}".encode("utf-8"),
+            digest_size=8
+        ).hexdigest()
+
+        message_type, text = _MEDIA_MARKERS.get(content, ("text", content))
+        messages.append({
+            "message_id": message_id,
+            "timestamp": ms_to_iso8601(timestamp_ms, timezone),
+            "timestamp_ms": timestamp_ms,
+            "sender_id": sender_id,
+            "sender_name": sender,
+            "message_type": message_type,
+            "content": text,
+            "attachments": [],
+        })
+
+    return messages
+
+
+def import_export(
+    path: str,
+    group_id: Optional[str] = None,
+    output_dir: Optional[str] = None,
+    timezone: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict:
+    """匯入一個匯出檔，依日期寫入原始訊息檔案
+
+    與爬蟲相同，某一天的訊息寫入隔天日期分區中的 {group_id}_{隔天日期}
+    檔案，並以 message_id 與既有檔案合併 (分區的 manifest 在 Agent 2
+    處理該日期時更新)。
+
+    Args:
+        path: 匯出檔路徑
+        group_id: 群組 ID (預設由匯出檔中的群組名稱雜湊產生)
+        output_dir: 輸出資料目錄 (預設 Config.RAW_MESSAGES_DIR)
+        timezone: 時區 (預設 Config.TIMEZONE)
+        chunk_size: 每次讀取的 bytes 數
+
+    Returns:
+        {"path", "group_id", "group_name", "days", "lines", "messages",
+         "skipped", "parse_seconds", "total_seconds", "lines_per_second"}
+    """
+    export_path = Path(path)
+    timezone = timezone or Config.TIMEZONE
+    group_name = read_export_title(export_path) or export_path.stem
+    if not group_id:
+        group_id = "C" + hashlib.md5(group_name.encode("utf-8")).hexdigest()
+
+    metadata = {"group_name": group_name, "picture_url": None,
+                "member_count": None}
+    stats = ExportStats()
+    days = 0
+    write_seconds = 0.0
+    started = time.perf_counter()
+
+    for day in iter_export_days(export_path, timezone, chunk_size, stats):
+        write_started = time.perf_counter()
+        write_group_messages(
+            group_id,
+            (day.date + timedelta(days=1)).isoformat(),
+            export_to_messages(group_id, day, timezone),
+            metadata,
+            output_dir
+        )
+        write_seconds += time.perf_counter() - write_started
+        days += 1
+
+    total = time.perf_counter() - started
+    parse_seconds = max(total - write_seconds, 1e-9)
+    result = {
+        "path": str(export_path),
+        "group_id": group_id,
+        "group_name": group_name,
+        "days": days,
+        "lines": stats.lines,
+        "messages": stats.messages,
+        "skipped": stats.skipped,
+        "parse_seconds": round(parse_seconds, 3),
+        "total_seconds": round(total, 3),
+        "lines_per_second": round(stats.lines / parse_seconds),
+    }
+    logger.info(
+        f"Imported {stats.messages} messages over {days} days from "
+        f"{export_path.name} into {group_id} ({result['lines_per_second']} "
+        f"lines/s parsing, {total:.2f}s total)"
+    )
+    return result
+
+
+def import_exports(
+    exports: List[Tuple[str, Optional[str]]],
+    output_dir: Optional[str] = None,
+    timezone: Optional[str] = None,
+    max_workers: Optional[int] = None
+) -> List[Dict]:
+    """平行匯入多個匯出檔 (每個檔案一個子程序)
+
+    Args:
+        exports: [(匯出檔路徑, 群組 ID 或 None), ...]
+        output_dir: 輸出資料目錄 (預設 Config.RAW_MESSAGES_DIR)
+        timezone: 時區 (預設 Config.TIMEZONE)
+        max_workers: 最多同時匯入的檔案數 (預設為 CPU 核心數)
+
+    Returns:
+        每個檔案的匯入結果 (順序與輸入相同)，見 import_export
+    """
+    if len(exports) == 1:
+        path, group_id = exports[0]
+        return [import_export(path, group_id, output_dir, timezone)]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(import_export, path, group_id, output_dir, timezone)
+            for path, group_id in exports
+        ]
+        return [future.result() for future in futures]
+
+
+def _parse_export_arg(value: str) -> Tuple[str, Optional[str]]:
+    """解析 [GROUP_ID=]PATH 參數 (內部函數)"""
+    group_id, sep, path = value.partition("=")
+    if sep and group_id and not Path(value).exists():
+        return path, group_id
+    return value, None
+
+
+def main() -> None:
+    """命令列入口
+
+    python -m src.chat_export_importer C1234...=chat.txt other_group.txt
+    """
+    parser = argparse.ArgumentParser(
+        description="Import LINE chat-history exports as raw message files"
+    )
+    parser.add_argument(
+        "exports",
+        nargs="+",
+        metavar="[GROUP_ID=]PATH",
+        help="export file, optionally prefixed with the LINE group ID"
+    )
+    parser.add_argument("--output-dir", help="default: RAW_MESSAGES_DIR")
+    parser.add_argument("--timezone", help="default: TIMEZONE")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="max exports imported in parallel")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s'
+    )
+
+    results = import_exports(
+        [_parse_export_arg(value) for value in args.exports],
+        output_dir=args.output_dir,
+        timezone=args.timezone,
+        max_workers=args.workers
+    )
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
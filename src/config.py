@@ -17,6 +17,11 @@ class Config:
         ""
     )
 
+    LINE_CHANNEL_SECRET: str = os.getenv(
+        "LINE_CHANNEL_SECRET",
+        ""
+    )
+
     # Anthropic Configuration
     ANTHROPIC_API_KEY: str = os.getenv(
         "ANTHROPIC_API_KEY",
@@ -35,8 +40,132 @@ class Config:
     # Timezone
     TIMEZONE: str = os.getenv("TIMEZONE", "Asia/Taipei")
 
-    # Data paths
+    # LINE API base URL (empty = SDK default https://api.line.me;
+    # point at src.fake_line_api for local load tests)
+    LINE_API_BASE_URL: str = os.getenv("LINE_API_BASE_URL", "")
+
+    # LINE API connection pool (shared by all groups in a run)
+    LINE_API_MAX_CONNECTIONS: int = int(
+        os.getenv("LINE_API_MAX_CONNECTIONS", "100")
+    )
+
+    # LINE API rate limits (requests per second, shared process-wide)
+    LINE_API_RATE_LIMIT: float = float(
+        os.getenv("LINE_API_RATE_LIMIT", "2000")
+    )
+    LINE_MULTICAST_RATE_LIMIT: float = float(
+        os.getenv("LINE_MULTICAST_RATE_LIMIT", "200")
+    )
+
+    # Max in-flight member profile requests
+    PROFILE_FETCH_CONCURRENCY: int = int(
+        os.getenv("PROFILE_FETCH_CONCURRENCY", "20")
+    )
+
+    # Resolve only active senders instead of the full member list
+    LAZY_SENDER_RESOLUTION: bool = os.getenv(
+        "LAZY_SENDER_RESOLUTION",
+        "true"
+    ).lower() in ("1", "true", "yes")
+
+    # Member profile cache
+    PROFILE_CACHE_PATH: str = os.getenv(
+        "PROFILE_CACHE_PATH",
+        "data/cache/profiles.sqlite3"
+    )
+    PROFILE_CACHE_TTL_HOURS: int = int(
+        os.getenv("PROFILE_CACHE_TTL_HOURS", "24")
+    )
+    PROFILE_CACHE_MAX_ENTRIES: int = int(
+        os.getenv("PROFILE_CACHE_MAX_ENTRIES", "200000")
+    )
+
+    # Group name/picture/member count refresh interval (cached in the same DB)
+    GROUP_METADATA_REFRESH_HOURS: int = int(
+        os.getenv("GROUP_METADATA_REFRESH_HOURS", "6")
+    )
+
+    # Webhook ingestion
+    WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8000"))
+    WEBHOOK_BATCH_SIZE: int = int(os.getenv("WEBHOOK_BATCH_SIZE", "5000"))
+    WEBHOOK_STORE_DIR: str = os.getenv(
+        "WEBHOOK_STORE_DIR",
+        "data/webhook_messages"
+    )
+
+    # Attachment downloads (content-addressed store)
+    DOWNLOAD_ATTACHMENTS: bool = os.getenv(
+        "DOWNLOAD_ATTACHMENTS", "true"
+    ).lower() in ("1", "true", "yes")
+    ATTACHMENTS_DIR: str = os.getenv("ATTACHMENTS_DIR", "data/attachments")
+    ATTACHMENT_DOWNLOAD_CONCURRENCY: int = int(
+        os.getenv("ATTACHMENT_DOWNLOAD_CONCURRENCY", "8")
+    )
+    LINE_DATA_API_BASE_URL: str = os.getenv("LINE_DATA_API_BASE_URL", "")
+
+    # Raw message output format: "json" or streaming "jsonl"
+    RAW_OUTPUT_FORMAT: str = os.getenv("RAW_OUTPUT_FORMAT", "json").lower()
+
+    # Groups crawled / summarized concurrently (largest groups start first,
+    # sized from the last VOLUME_HISTORY_DAYS of stats_{date}.json)
+    CRAWL_MAX_CONCURRENT_GROUPS: int = int(
+        os.getenv("CRAWL_MAX_CONCURRENT_GROUPS", "50")
+    )
+    SUMMARY_MAX_CONCURRENT_GROUPS: int = int(
+        os.getenv("SUMMARY_MAX_CONCURRENT_GROUPS", "5")
+    )
+    VOLUME_HISTORY_DAYS: int = int(os.getenv("VOLUME_HISTORY_DAYS", "7"))
+
+    # Max number of days run concurrently in backfill mode
+    BACKFILL_MAX_CONCURRENT_DAYS: int = int(
+        os.getenv("BACKFILL_MAX_CONCURRENT_DAYS", "7")
+    )
+
+    # Near-duplicate collapsing in Agent 2 (Jaccard similarity over
+    # character bigrams; repeats within the window since the last one)
+    NEAR_DUPLICATE_DETECTION: bool = os.getenv(
+        "NEAR_DUPLICATE_DETECTION", "true"
+    ).lower() in ("1", "true", "yes")
+    NEAR_DUPLICATE_THRESHOLD: float = float(
+        os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8")
+    )
+    NEAR_DUPLICATE_WINDOW_MINUTES: int = int(
+        os.getenv("NEAR_DUPLICATE_WINDOW_MINUTES", "60")
+    )
+
+    # Agent 2 worker processes for raw files (0 = CPU count, 1 = in-process)
+    PROCESSOR_WORKERS: int = int(os.getenv("PROCESSOR_WORKERS", "1"))
+
+    # Agent 2 streaming mode: generator stages, record-by-record output,
+    # memory independent of group size (best with RAW_OUTPUT_FORMAT=jsonl)
+    PROCESSOR_STREAMING: bool = os.getenv(
+        "PROCESSOR_STREAMING", "false"
+    ).lower() in ("1", "true", "yes")
+
+    # jieba prefix dictionary cache and domain user dictionary
+    # (one "word [freq] [tag]" per line; skipped when missing)
+    JIEBA_CACHE_DIR: str = os.getenv("JIEBA_CACHE_DIR", "data/cache")
+    JIEBA_USER_DICT: str = os.getenv("JIEBA_USER_DICT", "data/user_dict.txt")
+
+    # Extra classification keywords, JSON {"question"|"action"|
+    # "announcement"|"bot": [terms]} added to the built-in sets
+    KEYWORDS_FILE: str = os.getenv("KEYWORDS_FILE", "data/keywords.json")
+
+    # Agent 2 noise filter rules, run cheapest first: built-in "empty",
+    # "command", "bot", "emoji_only" or plugins "package.module:function"
+    NOISE_FILTER_RULES: List[str] = os.getenv(
+        "NOISE_FILTER_RULES",
+        "empty,command,bot,emoji_only"
+    ).split(",")
+
+    # Data paths (each agent reads and writes the YYYY/MM/DD partition of
+    # its run date, indexed by a manifest.json of file sizes and hashes)
     RAW_MESSAGES_DIR: str = "data/raw_messages"
+    PROCESSED_MESSAGES_DIR: str = "data/processed_messages"
+    SUMMARIES_DIR: str = "output/summaries"
+    EXECUTION_STATS_FILE: str = "data/execution_stats.json"
+    BACKFILL_STATS_FILE: str = "data/backfill_stats.json"
     LOGS_DIR: str = "logs"
 
     @classmethod
@@ -0,0 +1,567 @@
+"""Local stand-in for the LINE Messaging API - Used for load tests and benchmarks"""
+
+import logging
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# 支持的延遲分佈
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# Cassette 模式
+CASSETTE_MODES = ("record", "replay")
+
+# LINE API 的成員 ID 每頁上限
+MEMBER_IDS_PAGE_SIZE = 100
+
+# multicast 單次最多的收件者數
+MULTICAST_MAX_RECIPIENTS = 500
+
+# 訊息內容回應的分塊大小
+CONTENT_CHUNK_SIZE = 64 * 1024
+
+FAKE_API_KEY = web.AppKey("fake_line_api", object)
+
+
+class FakeLineApi:
+    """LINE Messaging API 的本地替身
+
+    提供爬蟲和發送器用到的端點：成員 ID (分頁)、成員數、成員資料、
+    訊息內容 (附件)、push 和 multicast。群組成員由 group_id 決定性產生 (同一個 seed
+    每次相同)，成員從共用的使用者池中抽取，因此不同群組之間會有
+    重疊的使用者。
+
+    每個請求依設定的分佈加入延遲，並可按比例注入 500 錯誤和 429
+    (附 Retry-After)。Cassette 模式：
+    - record: 記錄每個請求的回應 (可透過 upstream 代理到真正的 LINE API)
+    - replay: 依記錄的順序重播回應和延遲，不產生新的隨機結果
+    訊息內容是二進位串流，不寫入 cassette，重播時同樣依 seed 產生。
+    """
+
+    def __init__(
+        self,
+        members_per_group: int = 200,
+        user_pool: int = 5000,
+        page_size: int = MEMBER_IDS_PAGE_SIZE,
+        latency_ms: float = 20.0,
+        latency_distribution: str = "lognormal",
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        content_size: int = 256 * 1024,
+        content_variants: int = 100,
+        seed: int = 0,
+        cassette_path: Optional[str] = None,
+        cassette_mode: Optional[str] = None,
+        upstream: Optional[str] = None
+    ) -> None:
+        """初始化假 API
+
+        Args:
+            members_per_group: 每個群組的成員數
+            user_pool: 使用者池大小 (所有群組的成員從中抽取)
+            page_size: 成員 ID 每頁筆數
+            latency_ms: 平均延遲 (毫秒)
+            latency_distribution: 延遲分佈 (fixed, uniform, exponential, lognormal)
+            error_rate: 回應 500 的比例 (0 ~ 1)
+            throttle_rate: 回應 429 的比例 (0 ~ 1)
+            retry_after: 429 回應的 Retry-After 秒數
+            content_size: 訊息內容 (附件) 的大小 (bytes)
+            content_variants: 不同內容的數量 (模擬被轉傳的相同圖片/檔案)
+            seed: 隨機種子
+            cassette_path: cassette 檔案路徑 (JSON Lines)
+            cassette_mode: "record" 或 "replay"
+            upstream: record 模式下代理的上游網址 (例如 https://api.line.me)
+
+        Raises:
+            ValueError: 參數無效時
+        """
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"latency_distribution must be one of {LATENCY_DISTRIBUTIONS}"
+            )
+        if not 0 <= error_rate + throttle_rate <= 1:
+            raise ValueError("error_rate + throttle_rate must be within [0, 1]")
+        if cassette_mode is not None and cassette_mode not in CASSETTE_MODES:
+            raise ValueError(f"cassette_mode must be one of {CASSETTE_MODES}")
+        if cassette_mode is not None and not cassette_path:
+            raise ValueError("cassette_path is required in cassette mode")
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        if content_variants < 1:
+            raise ValueError("content_variants must be at least 1")
+
+        self.members_per_group = min(members_per_group, user_pool)
+        self.user_pool = user_pool
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.content_size = content_size
+        self.content_variants = content_variants
+        self.seed = seed
+        self.cassette_path = Path(cassette_path) if cassette_path else None
+        self.cassette_mode = cassette_mode
+        self.upstream = upstream.rstrip("/") if upstream else None
+
+        self._rng = random.Random(seed)
+        self._groups: Dict[str, Tuple[List[str], set]] = {}
+        self._recorded: List[dict] = []
+        self._replay: Dict[str, List[dict]] = {}
+        self._replay_positions: Dict[str, int] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sent_messages = 0
+
+        # 統計
+        self.requests: Dict[str, int] = {}
+        self.statuses: Dict[int, int] = {}
+
+        if cassette_mode == "replay":
+            self._load_cassette()
+
+    def group_members(self, group_id: str) -> List[str]:
+        """群組的成員 user_id 列表 (依 seed 和 group_id 決定性產生)"""
+        return self._group(group_id)[0]
+
+    def group_name(self, group_id: str) -> str:
+        """群組的顯示名稱 (依 group_id 決定)"""
+        return f"Group {group_id[-6:]}"
+
+    def user_id(self, index: int) -> str:
+        """使用者池中第 index 位使用者的 user_id"""
+        digest = hashlib.md5(f"{self.seed}:user:{index}".encode()).hexdigest()
+        return f"U{digest}"
+
+    def message_content(self, message_id: str) -> bytes:
+        """訊息的內容 (依 message_id 決定性選出 content_variants 之一)"""
+        digest = hashlib.md5(f"{self.seed}:{message_id}".encode()).hexdigest()
+        variant = int(digest, 16) % self.content_variants
+        rng = random.Random(f"{self.seed}:content:{variant}")
+        return rng.randbytes(self.content_size)
+
+    def sample_latency(self) -> float:
+        """依設定的分佈抽取一次延遲 (秒)"""
+        mean = self.latency_ms / 1000
+        if mean <= 0:
+            return 0.0
+        if self.latency_distribution == "fixed":
+            return mean
+        if self.latency_distribution == "uniform":
+            return self._rng.uniform(0, 2 * mean)
+        if self.latency_distribution == "exponential":
+            return self._rng.expovariate(1 / mean)
+
+        # lognormal: 長尾分佈，sigma=0.5 時平均值等於 mean
+        sigma = 0.5
+        return self._rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+
+    def stats(self) -> Dict[str, dict]:
+        """各端點的請求數和各狀態碼的回應數"""
+        return {
+            "requests": dict(self.requests),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "total_requests": sum(self.requests.values()),
+        }
+
+    def save_cassette(self) -> None:
+        """record 模式：將記錄的請求寫入 cassette 檔案"""
+        if self.cassette_mode != "record":
+            return
+
+        self.cassette_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cassette_path.with_name(self.cassette_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for interaction in self._recorded:
+                f.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.cassette_path)
+        logger.info(
+            f"Saved {len(self._recorded)} interactions to {self.cassette_path}"
+        )
+
+    async def serve(
+        self,
+        request: web.Request,
+        endpoint: str,
+        body: Optional[dict] = None
+    ) -> web.Response:
+        """處理一個請求：延遲、錯誤注入、產生 (或重播/代理) 回應並記錄
+
+        Args:
+            request: aiohttp 請求
+            endpoint: 端點名稱 (members_ids, member_count, summary, profile, push, multicast)
+            body: 已解析的 JSON 請求內容 (POST 時)
+
+        Returns:
+            aiohttp 回應
+        """
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        key = f"{request.method} {request.path_qs}"
+
+        if self.cassette_mode == "replay":
+            interaction = self._next_replay(key)
+            if interaction is None:
+                status, payload, headers = 404, {
+                    "message": f"No recorded interaction for {key}"
+                }, {}
+            else:
+                await asyncio.sleep(interaction["latency_ms"] / 1000)
+                status = interaction["status"]
+                payload = interaction["body"]
+                headers = interaction.get("headers", {})
+            return self._respond(status, payload, headers)
+
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return self._respond(401, {"message": "Authentication failed"})
+
+        latency = self.sample_latency()
+        await asyncio.sleep(latency)
+
+        status, payload, headers = self._inject_fault()
+        if status is None:
+            if self.upstream:
+                status, payload, headers = await self._proxy(request, body)
+            else:
+                status, payload = self._build_response(request, endpoint, body)
+
+        if self.cassette_mode == "record":
+            self._recorded.append({
+                "key": key,
+                "status": status,
+                "body": payload,
+                "headers": headers,
+                "latency_ms": round(latency * 1000, 3),
+            })
+
+        return self._respond(status, payload, headers)
+
+    async def serve_content(self, request: web.Request) -> web.StreamResponse:
+        """處理訊息內容請求：分塊串流二進位內容 (不寫入 cassette)
+
+        Args:
+            request: aiohttp 請求
+
+        Returns:
+            aiohttp 串流回應
+        """
+        self.requests["content"] = self.requests.get("content", 0) + 1
+
+        if self.cassette_mode != "replay":
+            if not request.headers.get("Authorization", "").startswith(
+                "Bearer "
+            ):
+                return self._respond(401, {"message": "Authentication failed"})
+
+            await asyncio.sleep(self.sample_latency())
+            status, payload, headers = self._inject_fault()
+            if status is not None:
+                return self._respond(status, payload, headers)
+
+        data = self.message_content(request.match_info["message_id"])
+        response = web.StreamResponse(
+            headers={"Content-Type": "application/octet-stream"}
+        )
+        response.content_length = len(data)
+        await response.prepare(request)
+        for offset in range(0, len(data), CONTENT_CHUNK_SIZE):
+            await response.write(data[offset:offset + CONTENT_CHUNK_SIZE])
+        await response.write_eof()
+
+        self.statuses[200] = self.statuses.get(200, 0) + 1
+        return response
+
+    def _group(self, group_id: str) -> Tuple[List[str], set]:
+        """群組成員 (列表, 集合)，第一次查詢時產生 (內部函數)"""
+        if group_id not in self._groups:
+            rng = random.Random(f"{self.seed}:{group_id}")
+            indices = rng.sample(range(self.user_pool), self.members_per_group)
+            members = [self.user_id(i) for i in indices]
+            self._groups[group_id] = (members, set(members))
+        return self._groups[group_id]
+
+    def _inject_fault(self) -> Tuple[Optional[int], Optional[dict], dict]:
+        """依比例注入 429 或 500 (內部函數)
+
+        Returns:
+            (status, body, headers)，不注入時 status 為 None
+        """
+        roll = self._rng.random()
+        if roll < self.throttle_rate:
+            return 429, {
+                "message": "The API rate limit has been exceeded. "
+                           "Try again later."
+            }, {"Retry-After": str(self.retry_after)}
+        if roll < self.throttle_rate + self.error_rate:
+            return 500, {"message": "Internal server error"}, {}
+        return None, None, {}
+
+    def _build_response(
+        self,
+        request: web.Request,
+        endpoint: str,
+        body: Optional[dict]
+    ) -> Tuple[int, dict]:
+        """產生合成回應 (內部函數)"""
+        if endpoint == "members_ids":
+            members = self.group_members(request.match_info["group_id"])
+            start = int(request.query.get("start") or 0)
+            end = start + self.page_size
+            payload = {"memberIds": members[start:end]}
+            if end < len(members):
+                payload["next"] = str(end)
+            return 200, payload
+
+        if endpoint == "summary":
+            group_id = request.match_info["group_id"]
+            return 200, {
+                "groupId": group_id,
+                "groupName": self.group_name(group_id),
+                "pictureUrl": f"https://profile.line-scdn.net/{group_id}",
+            }
+
+        if endpoint == "member_count":
+            members = self.group_members(request.match_info["group_id"])
+            return 200, {"count": len(members)}
+
+        if endpoint == "profile":
+            user_id = request.match_info["user_id"]
+            if user_id not in self._group(request.match_info["group_id"])[1]:
+                return 404, {"message": "Not found"}
+            return 200, {
+                "displayName": f"User_{user_id[1:7]}",
+                "userId": user_id,
+                "pictureUrl": f"https://profile.line-scdn.net/{user_id}",
+            }
+
+        if not body or "to" not in body or not body.get("messages"):
+            return 400, {"message": "The request body has 1 error(s)"}
+
+        if endpoint == "multicast":
+            if len(body["to"]) > MULTICAST_MAX_RECIPIENTS:
+                return 400, {"message": "Size must be between 1 and 500"}
+            self._sent_messages += len(body["messages"]) * len(body["to"])
+            return 200, {}
+
+        sent = []
+        for _ in body["messages"]:
+            self._sent_messages += 1
+            sent.append({
+                "id": str(self._sent_messages),
+                "quoteToken": f"q{self._sent_messages}",
+            })
+        return 200, {"sentMessages": sent}
+
+    async def _proxy(
+        self,
+        request: web.Request,
+        body: Optional[dict]
+    ) -> Tuple[int, dict, dict]:
+        """將請求轉發到上游 LINE API (內部函數)"""
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+
+        headers = {"Authorization": request.headers["Authorization"]}
+        async with self._session.request(
+            request.method,
+            f"{self.upstream}{request.path_qs}",
+            json=body,
+            headers=headers
+        ) as response:
+            try:
+                payload = await response.json(content_type=None)
+            except ValueError:
+                payload = {}
+            kept = {}
+            if "Retry-After" in response.headers:
+                kept["Retry-After"] = response.headers["Retry-After"]
+            return response.status, payload or {}, kept
+
+    async def close(self) -> None:
+        """關閉上游連線並保存 cassette"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self.save_cassette()
+
+    def _load_cassette(self) -> None:
+        """replay 模式：讀取 cassette 並按請求分組 (內部函數)
+
+        Raises:
+            FileNotFoundError: cassette 檔案不存在時
+        """
+        if not self.cassette_path.exists():
+            raise FileNotFoundError(f"Cassette not found: {self.cassette_path}")
+
+        with open(self.cassette_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._replay.setdefault(interaction["key"], []).append(
+                        interaction
+                    )
+        logger.info(
+            f"Loaded {sum(len(v) for v in self._replay.values())} "
+            f"interactions from {self.cassette_path}"
+        )
+
+    def _next_replay(self, key: str) -> Optional[dict]:
+        """同一請求依記錄順序重播，用完後重複最後一筆 (內部函數)"""
+        interactions = self._replay.get(key)
+        if not interactions:
+            return None
+        position = self._replay_positions.get(key, 0)
+        self._replay_positions[key] = position + 1
+        return interactions[min(position, len(interactions) - 1)]
+
+    def _respond(
+        self,
+        status: int,
+        payload: dict,
+        headers: Optional[dict] = None
+    ) -> web.Response:
+        """產生 JSON 回應並計入統計 (內部函數)"""
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        return web.json_response(payload, status=status, headers=headers)
+
+
+def create_fake_app(api: FakeLineApi) -> web.Application:
+    """建立假 LINE API 應用
+
+    Args:
+        api: FakeLineApi 實例
+
+    Returns:
+        aiohttp 應用
+    """
+    app = web.Application()
+    app[FAKE_API_KEY] = api
+
+    def _get(endpoint: str):
+        async def handler(request: web.Request) -> web.Response:
+            return await request.app[FAKE_API_KEY].serve(request, endpoint)
+        return handler
+
+    def _post(endpoint: str):
+        async def handler(request: web.Request) -> web.Response:
+            try:
+                body = await request.json()
+            except ValueError:
+                body = None
+            return await request.app[FAKE_API_KEY].serve(
+                request, endpoint, body
+            )
+        return handler
+
+    async def _content(request: web.Request) -> web.StreamResponse:
+        return await request.app[FAKE_API_KEY].serve_content(request)
+
+    async def _close(app: web.Application) -> None:
+        await app[FAKE_API_KEY].close()
+
+    app.on_cleanup.append(_close)
+    app.router.add_get(
+        "/v2/bot/group/{group_id}/members/ids", _get("members_ids")
+    )
+    app.router.add_get(
+        "/v2/bot/group/{group_id}/members/count", _get("member_count")
+    )
+    app.router.add_get(
+        "/v2/bot/group/{group_id}/summary", _get("summary")
+    )
+    app.router.add_get(
+        "/v2/bot/group/{group_id}/member/{user_id}", _get("profile")
+    )
+    app.router.add_get("/v2/bot/message/{message_id}/content", _content)
+    app.router.add_post("/v2/bot/message/push", _post("push"))
+    app.router.add_post("/v2/bot/message/multicast", _post("multicast"))
+    return app
+
+
+def add_fake_api_arguments(parser: argparse.ArgumentParser) -> None:
+    """加入假 API 的命令列參數 (伺服器和 benchmark 共用)"""
+    parser.add_argument("--members", type=int, default=200,
+                        help="members per group")
+    parser.add_argument("--user-pool", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=MEMBER_IDS_PAGE_SIZE)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--latency-distribution",
+                        choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--content-size", type=int, default=256 * 1024,
+                        help="attachment size in bytes")
+    parser.add_argument("--content-variants", type=int, default=100,
+                        help="number of distinct attachment contents")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", metavar="CASSETTE",
+                        help="record interactions to a cassette file")
+    parser.add_argument("--replay", metavar="CASSETTE",
+                        help="replay interactions from a cassette file")
+    parser.add_argument("--upstream",
+                        help="proxy to this LINE API host while recording")
+
+
+def fake_api_from_args(args: argparse.Namespace) -> FakeLineApi:
+    """依命令列參數建立 FakeLineApi
+
+    Raises:
+        ValueError: 同時指定 --record 和 --replay 時
+    """
+    if args.record and args.replay:
+        raise ValueError("--record and --replay are mutually exclusive")
+
+    mode = "record" if args.record else "replay" if args.replay else None
+    return FakeLineApi(
+        members_per_group=args.members,
+        user_pool=args.user_pool,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        content_size=args.content_size,
+        content_variants=args.content_variants,
+        seed=args.seed,
+        cassette_path=args.record or args.replay,
+        cassette_mode=mode,
+        upstream=args.upstream
+    )
+
+
+def main() -> None:
+    """命令列入口
+
+    python -m src.fake_line_api --port 8080 --latency-ms 30 --throttle-rate 0.01
+    然後設定 LINE_API_BASE_URL 和 LINE_DATA_API_BASE_URL=http://127.0.0.1:8080
+    """
+    parser = argparse.ArgumentParser(description="Local LINE Messaging API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_fake_api_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s'
+    )
+
+    api = fake_api_from_args(args)
+    web.run_app(create_fake_app(api), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,393 @@
 """Data models for LINE Message Summarizer"""
 
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional
-from datetime import datetime
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from src.utils.time_utils import iso8601_to_ms, ms_to_iso8601
+
+# Message 的固定欄位 (依輸出順序)
+MESSAGE_FIELDS = (
+    "message_id",
+    "timestamp",
+    "timestamp_ms",
+    "sender_id",
+    "sender_name",
+    "message_type",
+    "content",
+    "attachments",
+)
+
+# Agent 2 加入的處理結果欄位 (未設定時不輸出)
+PROCESSED_FIELDS = ("category", "importance", "keywords")
+
+_NO_VALUE = object()
 
 
-@dataclass
 class Message:
-    """Single message data model"""
+    """Single message data model
 
-    message_id: str
-    timestamp: str  # ISO 8601 format
-    sender_id: str
-    sender_name: str
-    message_type: str  # text, image, file, video, audio, sticker, etc.
-    content: str
-    attachments: List[str]  # URLs of attachments
+    以 __slots__ 儲存，並提供 dict 風格的存取 (get / [] / in)，Agent 2 的
+    處理函數可以直接操作 Message 而不需轉換。sender_id、sender_name 和
+    message_type 在建立時 intern，相同字串只保留一份。
+    """
+
+    __slots__ = MESSAGE_FIELDS + PROCESSED_FIELDS + ("extras",)
+
+    def __init__(
+        self,
+        message_id: str,
+        timestamp: str,  # ISO 8601 format
+        sender_id: str,
+        sender_name: str,
+        message_type: str,  # text, image, file, video, audio, sticker, etc.
+        content: str,
+        attachments: List[str],  # URLs of attachments
+        timestamp_ms: int = 0,  # epoch milliseconds (same instant as timestamp)
+        category: Optional[str] = None,
+        importance: Optional[float] = None,
+        keywords: Optional[List[str]] = None,
+        extras: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.message_id = message_id
+        self.timestamp = timestamp
+        self.timestamp_ms = timestamp_ms
+        self.sender_id = sys.intern(sender_id)
+        self.sender_name = sys.intern(sender_name)
+        self.message_type = sys.intern(message_type)
+        self.content = content
+        self.attachments = attachments
+        self.category = category
+        self.importance = importance
+        self.keywords = keywords
+        self.extras = extras
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Message":
+        """從 Agent 1/2 的訊息字典建立 (缺少 timestamp_ms 時由 timestamp 換算)"""
+        extras = {
+            key: value for key, value in data.items()
+            if key not in MESSAGE_FIELDS and key not in PROCESSED_FIELDS
+        }
+        timestamp = data.get("timestamp", "")
+        timestamp_ms = data.get("timestamp_ms")
+        if timestamp_ms is None:
+            timestamp_ms = iso8601_to_ms(timestamp) if timestamp else 0
+
+        return cls(
+            data.get("message_id", ""),
+            timestamp,
+            data.get("sender_id", ""),
+            data.get("sender_name", ""),
+            data.get("message_type", "text"),
+            data.get("content", ""),
+            data.get("attachments", []),
+            timestamp_ms,
+            data.get("category"),
+            data.get("importance"),
+            data.get("keywords"),
+            extras or None,
+        )
 
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
-        return asdict(self)
+        result = {field: getattr(self, field) for field in MESSAGE_FIELDS}
+        for field in PROCESSED_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                result[field] = value
+        if self.extras:
+            result.update(self.extras)
+        return result
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict.get 相容的欄位讀取 (未設定的處理欄位視為不存在)"""
+        value = self._lookup(key)
+        return default if value is _NO_VALUE else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._lookup(key)
+        if value is _NO_VALUE:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in Message.__slots__ and key != "extras":
+            setattr(self, key, value)
+        else:
+            if self.extras is None:
+                self.extras = {}
+            self.extras[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key) is not _NO_VALUE
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Message):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Message({self.to_dict()!r})"
+
+    def _lookup(self, key: str) -> Any:
+        """讀取欄位，不存在時返回 _NO_VALUE (內部函數)"""
+        if key in MESSAGE_FIELDS:
+            return getattr(self, key)
+        if key in PROCESSED_FIELDS:
+            value = getattr(self, key)
+            return _NO_VALUE if value is None else value
+        if self.extras and key in self.extras:
+            return self.extras[key]
+        return _NO_VALUE
+
+
+class MessageBatch:
+    """Columnar container for the messages of one group
+
+    以欄位陣列 (struct-of-arrays) 儲存，取代每則訊息一個 dict：
+    - timestamp_ms: array('q')；ISO 字串依時區即時產生，只有與產生結果
+      不同的原始字串才另外保存
+    - 發送者 (sender_id, sender_name)、訊息類型和分類：字典編碼，每則訊息
+      只存一個整數代碼
+    - 附件、關鍵詞和其他欄位：稀疏儲存 (只記錄有值的列)
+
+    迭代或索引時產生 Message 列對象。
+    """
+
+    __slots__ = (
+        "timezone",
+        "message_ids",
+        "timestamps_ms",
+        "contents",
+        "sender_codes",
+        "type_codes",
+        "category_codes",
+        "importances",
+        "_senders",
+        "_sender_index",
+        "_values",
+        "_value_index",
+        "_timestamp_overrides",
+        "_attachments",
+        "_keywords",
+        "_extras",
+    )
+
+    def __init__(self, timezone: str = "Asia/Taipei") -> None:
+        """初始化空的訊息批次
+
+        Args:
+            timezone: 產生 ISO 8601 時間字串使用的時區
+        """
+        self.timezone = timezone
+        self.message_ids: List[str] = []
+        self.timestamps_ms = array("q")
+        self.contents: List[str] = []
+        self.sender_codes = array("I")
+        self.type_codes = array("H")
+        self.category_codes = array("h")
+        self.importances = array("d")
+
+        self._senders: List[Tuple[str, str]] = []
+        self._sender_index: Dict[Tuple[str, str], int] = {}
+        self._values: List[str] = []
+        self._value_index: Dict[str, int] = {}
+
+        self._timestamp_overrides: Dict[int, str] = {}
+        self._attachments: Dict[int, List[str]] = {}
+        self._keywords: Dict[int, List[str]] = {}
+        self._extras: Dict[int, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_dicts(
+        cls,
+        messages: Iterable[Union[Dict, Message]],
+        timezone: str = "Asia/Taipei"
+    ) -> "MessageBatch":
+        """從訊息字典 (或 Message) 的迭代器建立批次 (可為 generator)
+
+        Args:
+            messages: 訊息迭代器
+            timezone: 時區
+
+        Returns:
+            MessageBatch
+        """
+        batch = cls(timezone)
+        for message in messages:
+            batch.append(message)
+        return batch
+
+    def append(self, message: Union[Dict, Message]) -> None:
+        """加入一則訊息
+
+        Args:
+            message: 訊息字典或 Message
+        """
+        row = len(self.message_ids)
+        timestamp = message.get("timestamp", "")
+        timestamp_ms = message.get("timestamp_ms")
+        if timestamp_ms is None:
+            timestamp_ms = iso8601_to_ms(timestamp) if timestamp else 0
+
+        self.message_ids.append(message.get("message_id", ""))
+        self.timestamps_ms.append(timestamp_ms)
+        self.contents.append(message.get("content", ""))
+        self.sender_codes.append(self._sender_code(
+            message.get("sender_id", ""),
+            message.get("sender_name", "")
+        ))
+        self.type_codes.append(
+            self._value_code(message.get("message_type", "text"))
+        )
+
+        category = message.get("category")
+        self.category_codes.append(
+            -1 if category is None else self._value_code(category)
+        )
+        importance = message.get("importance")
+        self.importances.append(
+            float("nan") if importance is None else importance
+        )
+
+        if timestamp != ms_to_iso8601(timestamp_ms, self.timezone):
+            self._timestamp_overrides[row] = timestamp
+        if message.get("attachments"):
+            self._attachments[row] = message["attachments"]
+        if message.get("keywords") is not None:
+            self._keywords[row] = message["keywords"]
+
+        if isinstance(message, Message):
+            extras = message.extras
+        else:
+            extras = {
+                key: value for key, value in message.items()
+                if key not in MESSAGE_FIELDS and key not in PROCESSED_FIELDS
+            }
+        if extras:
+            self._extras[row] = extras
+
+    def __len__(self) -> int:
+        return len(self.message_ids)
+
+    def __iter__(self) -> Iterator[Message]:
+        for row in range(len(self)):
+            yield self.row(row)
+
+    def __getitem__(
+        self,
+        index: Union[int, slice]
+    ) -> Union[Message, "MessageBatch"]:
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("MessageBatch index out of range")
+        return self.row(index)
+
+    def row(self, row: int) -> Message:
+        """產生第 row 列的 Message 對象"""
+        sender_id, sender_name = self._senders[self.sender_codes[row]]
+        timestamp_ms = self.timestamps_ms[row]
+        category_code = self.category_codes[row]
+        importance = self.importances[row]
+
+        return Message(
+            self.message_ids[row],
+            self._timestamp_overrides.get(row)
+            or ms_to_iso8601(timestamp_ms, self.timezone),
+            sender_id,
+            sender_name,
+            self._values[self.type_codes[row]],
+            self.contents[row],
+            self._attachments.get(row, []),
+            timestamp_ms,
+            None if category_code < 0 else self._values[category_code],
+            None if importance != importance else importance,  # NaN = 未設定
+            self._keywords.get(row),
+            self._extras.get(row),
+        )
+
+    def to_dicts(self) -> List[Dict]:
+        """轉換為訊息字典列表"""
+        return list(self.iter_dicts())
+
+    def iter_dicts(self) -> Iterator[Dict]:
+        """逐筆產生訊息字典 (不一次建立完整列表)"""
+        for row in range(len(self)):
+            yield self.row(row).to_dict()
+
+    def sender_id(self, row: int) -> str:
+        """第 row 列的 sender_id (不建立 Message)"""
+        return self._senders[self.sender_codes[row]][0]
+
+    def sender_name(self, row: int) -> str:
+        """第 row 列的 sender_name (不建立 Message)"""
+        return self._senders[self.sender_codes[row]][1]
+
+    def message_type(self, row: int) -> str:
+        """第 row 列的 message_type (不建立 Message)"""
+        return self._values[self.type_codes[row]]
+
+    def take(self, rows: Iterable[int]) -> "MessageBatch":
+        """依列索引建立新的批次 (用於排序和過濾)
+
+        Args:
+            rows: 列索引
+
+        Returns:
+            新的 MessageBatch
+        """
+        result = MessageBatch(self.timezone)
+        for row in rows:
+            result.append(self.row(row))
+        return result
+
+    def sorted_by_time(self) -> "MessageBatch":
+        """依 timestamp_ms 排序的新批次 (相同時間保持原順序)"""
+        order = sorted(range(len(self)), key=self.timestamps_ms.__getitem__)
+        return self.take(order)
+
+    def _sender_code(self, sender_id: str, sender_name: str) -> int:
+        """發送者的字典編碼 (內部函數)"""
+        key = (sender_id, sender_name)
+        code = self._sender_index.get(key)
+        if code is None:
+            code = len(self._senders)
+            self._senders.append((sys.intern(sender_id), sys.intern(sender_name)))
+            self._sender_index[key] = code
+        return code
+
+    def _value_code(self, value: str) -> int:
+        """訊息類型/分類字串的字典編碼 (內部函數)"""
+        code = self._value_index.get(value)
+        if code is None:
+            code = len(self._values)
+            self._values.append(sys.intern(value))
+            self._value_index[value] = code
+        return code
 
 
-@dataclass
 class GroupMessages:
     """Container for all messages from a group"""
 
-    group_id: str
-    group_name: str
-    date: str  # YYYY-MM-DD format
-    messages: List[Message]
+    __slots__ = ("group_id", "group_name", "date", "messages")
+
+    def __init__(
+        self,
+        group_id: str,
+        group_name: str,
+        date: str,  # YYYY-MM-DD format
+        messages: Union[MessageBatch, List[Message]]
+    ) -> None:
+        self.group_id = group_id
+        self.group_name = group_name
+        self.date = date
+        self.messages = messages
 
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
@@ -0,0 +1,302 @@
+"""Streaming attachment downloader with content-addressed storage"""
+
+import logging
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from typing import Dict, Iterable, Optional
+from pathlib import Path
+
+import aiohttp
+from linebot.v3.messaging.exceptions import ApiException
+
+from src.config import Config
+from src.utils.rate_limiter import RateLimiter, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# extract_message_content 產生的附件佔位符類型 ({type}_{message_id})
+ATTACHMENT_TYPES = ("image", "video", "audio", "file")
+
+# 每次讀取/寫入的區塊大小
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# LINE 訊息內容 API 的預設網址
+DEFAULT_DATA_API_BASE_URL = "https://api-data.line.me"
+
+
+class AttachmentFetcher:
+    """附件下載器 (串流寫入、內容定址儲存)
+
+    檔案位置:
+    - {storage_dir}/objects/{sha256[:2]}/{sha256}  附件內容 (相同內容只存一份)
+    - {storage_dir}/index.jsonl                    message_id → sha256 索引
+
+    schedule() 立即返回，下載在背景進行，同時進行中的下載數受
+    max_concurrency 限制，請求經過全域速率限制器的 "content" 類別。
+    內容以 chunk_size 分塊寫入暫存檔並同時計算雜湊，不會整個載入記憶體；
+    完成後若相同雜湊已存在則丟棄暫存檔，否則成為新的物件檔。
+    """
+
+    def __init__(
+        self,
+        channel_access_token: str,
+        storage_dir: str,
+        max_concurrency: int = 8,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        api_base_url: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ) -> None:
+        """初始化附件下載器
+
+        Args:
+            channel_access_token: LINE Channel Access Token
+            storage_dir: 附件儲存根目錄
+            max_concurrency: 同時進行中的下載數上限
+            chunk_size: 串流讀寫的區塊大小 (bytes)
+            api_base_url: 訊息內容 API 網址 (預設 Config.LINE_DATA_API_BASE_URL)
+            rate_limiter: 速率限制器 (預設使用全域共用實例)
+
+        Raises:
+            ValueError: 如果 token 為空或 max_concurrency 小於 1
+        """
+        if not channel_access_token:
+            raise ValueError("Channel access token cannot be empty")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.channel_access_token = channel_access_token
+        self.storage_dir = Path(storage_dir)
+        self.chunk_size = chunk_size
+        self.api_base_url = (
+            api_base_url
+            or Config.LINE_DATA_API_BASE_URL
+            or DEFAULT_DATA_API_BASE_URL
+        ).rstrip("/")
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._index: Optional[Dict[str, str]] = None
+
+        # 下載統計
+        self.downloaded = 0
+        self.deduplicated = 0
+        self.failed = 0
+        self.bytes_written = 0
+
+    def schedule(self, messages: Iterable[dict]) -> int:
+        """為訊息中的附件排程背景下載 (不等待完成)
+
+        已下載 (索引中存在) 或已排程的 message_id 會跳過。
+
+        Args:
+            messages: 訊息列表 (attachments 為 {type}_{message_id} 佔位符)
+
+        Returns:
+            新排程的下載數
+        """
+        index = self._load_index()
+        scheduled = 0
+        for msg in messages:
+            for attachment in msg.get("attachments", []):
+                message_id = parse_attachment(attachment)
+                if (
+                    message_id is None
+                    or message_id in index
+                    or message_id in self._tasks
+                ):
+                    continue
+                self._tasks[message_id] = asyncio.ensure_future(
+                    self.fetch(message_id)
+                )
+                scheduled += 1
+        return scheduled
+
+    async def drain(self) -> Dict[str, int]:
+        """等待所有已排程的下載完成
+
+        Returns:
+            {"downloaded", "deduplicated", "failed", "bytes_written"}
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values())
+        return self.stats()
+
+    async def close(self) -> None:
+        """等待下載完成並關閉 HTTP session"""
+        await self.drain()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, int]:
+        """下載統計"""
+        return {
+            "downloaded": self.downloaded,
+            "deduplicated": self.deduplicated,
+            "failed": self.failed,
+            "bytes_written": self.bytes_written,
+        }
+
+    def object_path(self, digest: str) -> Path:
+        """內容雜湊對應的物件檔案路徑"""
+        return self.storage_dir / "objects" / digest[:2] / digest
+
+    def resolve(self, attachment: str) -> Optional[Path]:
+        """附件佔位符對應的物件檔案 (尚未下載時為 None)
+
+        Args:
+            attachment: 附件佔位符 (例如 "image_100001")
+
+        Returns:
+            物件檔案路徑
+        """
+        digest = self._load_index().get(parse_attachment(attachment) or "")
+        return self.object_path(digest) if digest else None
+
+    async def fetch(self, message_id: str) -> Optional[str]:
+        """下載單一訊息的內容並存入物件儲存
+
+        Args:
+            message_id: LINE 訊息 ID
+
+        Returns:
+            內容的 SHA-256，失敗時為 None
+        """
+        async with self._semaphore:
+            try:
+                digest, size, content_type = await self.rate_limiter.call(
+                    "content",
+                    self._download,
+                    message_id
+                )
+            except Exception as e:
+                self.failed += 1
+                logger.warning(
+                    f"Failed to download content of message {message_id}: {e}"
+                )
+                return None
+
+        await asyncio.to_thread(self._append_index, {
+            "message_id": message_id,
+            "sha256": digest,
+            "size": size,
+            "content_type": content_type,
+        })
+        self._index[message_id] = digest
+        return digest
+
+    async def _download(self, message_id: str) -> tuple:
+        """串流下載內容到暫存檔並計算雜湊 (內部函數)
+
+        Returns:
+            (sha256, size, content_type)
+
+        Raises:
+            ApiException: HTTP 狀態碼不是 200 時 (429 由速率限制器重試)
+        """
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+
+        url = f"{self.api_base_url}/v2/bot/message/{message_id}/content"
+        headers = {"Authorization": f"Bearer {self.channel_access_token}"}
+
+        tmp_dir = self.storage_dir / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / f"{message_id}.{uuid.uuid4().hex}.part"
+
+        async with self._session.get(url, headers=headers) as response:
+            if response.status != 200:
+                error = ApiException(
+                    status=response.status,
+                    reason=response.reason
+                )
+                error.headers = dict(response.headers)
+                raise error
+
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                with open(tmp_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(
+                        self.chunk_size
+                    ):
+                        await asyncio.to_thread(_write_chunk, f, digest, chunk)
+                        size += len(chunk)
+                hexdigest = digest.hexdigest()
+                stored = await asyncio.to_thread(
+                    self._store_object, tmp_path, hexdigest
+                )
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+
+        if stored:
+            self.downloaded += 1
+            self.bytes_written += size
+        else:
+            self.deduplicated += 1
+        return hexdigest, size, response.headers.get("Content-Type", "")
+
+    def _store_object(self, tmp_path: Path, digest: str) -> bool:
+        """將暫存檔連結為物件檔，內容已存在時丟棄 (內部函數)
+
+        以 os.link 建立物件檔：目標已存在時失敗而不覆蓋，並發下載相同
+        內容時只有一個會成功。
+
+        Returns:
+            True 表示新增了物件，False 表示內容已存在
+        """
+        path = self.object_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(tmp_path, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            tmp_path.unlink()
+
+    def _load_index(self) -> Dict[str, str]:
+        """讀取 message_id → sha256 索引 (第一次調用時，內部函數)"""
+        if self._index is None:
+            self._index = {}
+            index_path = self.storage_dir / "index.jsonl"
+            if index_path.exists():
+                with open(index_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            record = json.loads(line)
+                            self._index[record["message_id"]] = record["sha256"]
+        return self._index
+
+    def _append_index(self, record: dict) -> None:
+        """寫入一筆索引記錄 (在執行緒中執行，內部函數)"""
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.storage_dir / "index.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def parse_attachment(attachment: str) -> Optional[str]:
+    """從附件佔位符取出 message_id
+
+    Args:
+        attachment: 附件佔位符 (例如 "image_100001")
+
+    Returns:
+        message_id，不是可下載的附件時為 None
+    """
+    kind, _, message_id = attachment.partition("_")
+    if kind not in ATTACHMENT_TYPES or not message_id:
+        return None
+    return message_id
+
+
+def _write_chunk(f, digest, chunk: bytes) -> None:
+    """寫入一個區塊並更新雜湊 (在執行緒中執行，內部函數)"""
+    digest.update(chunk)
+    f.write(chunk)
@@ -0,0 +1,156 @@
+"""Cached group metadata (name, picture, member count) with background refresh"""
+
+import logging
+import asyncio
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from src.utils.line_handler import LineHandler
+from src.utils.profile_cache import ProfileCache
+
+logger = logging.getLogger(__name__)
+
+
+class GroupMetadataResolver:
+    """群組摘要解析器
+
+    群組名稱、圖片網址和成員數保存在 ProfileCache 中：
+    - 已知群組：立即返回快取 (即使已過期)，過期時在背景刷新，不阻塞爬蟲
+    - 未知群組：第一次需等待 API 請求，同一群組的並發查詢共用一個請求
+    - 請求失敗：返回 Group_{group_id[:8]} 佔位名稱，不影響爬蟲
+    """
+
+    def __init__(
+        self,
+        handler: LineHandler,
+        cache: ProfileCache,
+        refresh_seconds: int = 6 * 3600
+    ) -> None:
+        """初始化解析器
+
+        Args:
+            handler: LineHandler 實例 (用於 API 請求)
+            cache: 保存群組摘要的 ProfileCache
+            refresh_seconds: 快取超過此秒數後在背景刷新
+
+        Raises:
+            ValueError: refresh_seconds 不是正數時
+        """
+        if refresh_seconds <= 0:
+            raise ValueError("refresh_seconds must be positive")
+
+        self.handler = handler
+        self.cache = cache
+        self.refresh_seconds = refresh_seconds
+
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    async def get(self, group_id: str) -> Dict:
+        """取得群組摘要
+
+        Args:
+            group_id: 群組 ID
+
+        Returns:
+            {"group_name": str, "picture_url": Optional[str],
+             "member_count": Optional[int]}
+        """
+        cached = await asyncio.to_thread(self._lookup, group_id)
+        if cached is not None:
+            if time.time() - cached.pop("fetched_at") >= self.refresh_seconds:
+                self._refresh_in_background(group_id)
+            return cached
+
+        summary = await self._fetch(group_id)
+        return summary or default_group_metadata(group_id)
+
+    async def refresh(self, group_ids: Iterable[str]) -> Dict[str, Dict]:
+        """批量刷新群組摘要 (並發請求，寫入快取)
+
+        Args:
+            group_ids: 群組 ID 列表
+
+        Returns:
+            {group_id: summary}，只包含刷新成功的群組
+        """
+        group_ids = list(dict.fromkeys(group_ids))
+        results = await asyncio.gather(
+            *(self._fetch(group_id) for group_id in group_ids)
+        )
+        refreshed = {
+            group_id: summary
+            for group_id, summary in zip(group_ids, results)
+            if summary is not None
+        }
+        logger.info(
+            f"Refreshed metadata for {len(refreshed)}/{len(group_ids)} groups"
+        )
+        return refreshed
+
+    async def close(self) -> None:
+        """等待背景刷新完成 (結果寫入快取供下次使用)"""
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    def _lookup(self, group_id: str) -> Optional[Dict]:
+        """讀取快取，讀取失敗時視為未知群組 (在執行緒中執行，內部函數)"""
+        try:
+            return self.cache.get_group_summary(group_id)
+        except Exception as e:
+            logger.warning(f"Failed to read cached metadata for {group_id}: {e}")
+            return None
+
+    def _refresh_in_background(self, group_id: str) -> None:
+        """排程背景刷新 (同一群組只排程一次，內部函數)"""
+        if group_id in self._inflight:
+            return
+        task = asyncio.ensure_future(self._fetch(group_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _fetch(self, group_id: str) -> Optional[Dict]:
+        """請求群組摘要並寫入快取，合併同一群組的並發請求 (內部函數)"""
+        task = self._inflight.get(group_id)
+        if task is None:
+            task = asyncio.ensure_future(self._request(group_id))
+            self._inflight[group_id] = task
+            task.add_done_callback(
+                lambda _: self._inflight.pop(group_id, None)
+            )
+        return await asyncio.shield(task)
+
+    async def _request(self, group_id: str) -> Optional[Dict]:
+        """向 LINE API 請求群組摘要 (內部函數)
+
+        Returns:
+            群組摘要，失敗時為 None
+        """
+        try:
+            summary = await self.handler.get_group_summary(group_id)
+            await asyncio.to_thread(
+                self.cache.put_group_summary,
+                group_id,
+                summary
+            )
+            return summary
+        except Exception as e:
+            logger.warning(f"Failed to get metadata for group {group_id}: {e}")
+            return None
+
+
+def default_group_metadata(group_id: str) -> Dict:
+    """無法取得群組摘要時使用的佔位資料
+
+    Args:
+        group_id: 群組 ID
+
+    Returns:
+        {"group_name": "Group_{group_id[:8]}", "picture_url": None,
+         "member_count": None}
+    """
+    return {
+        "group_name": f"Group_{group_id[:8]}",
+        "picture_url": None,
+        "member_count": None,
+    }
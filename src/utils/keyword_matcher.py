@@ -0,0 +1,187 @@
+"""Multi-pattern keyword matching for Agent 2 - Aho-Corasick automaton over keyword classes"""
+
+import logging
+import json
+from typing import Dict, FrozenSet, Iterable, List, Mapping
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordAutomaton:
+    """多類別關鍵詞的 Aho-Corasick 自動機
+
+    所有類別的關鍵詞編譯成同一個自動機，每則文字只掃描一次就能得到
+    出現了哪些類別；掃描時間與文字長度成正比，與關鍵詞數量無關。
+    比對不分大小寫 (關鍵詞和文字都轉為小寫)。
+
+    Example:
+        automaton = KeywordAutomaton({"question": ["?", "如何"], "bot": ["bot"]})
+        automaton.match("如何設定 Bot？")  # frozenset({"question", "bot"})
+    """
+
+    __slots__ = ("classes", "_goto", "_fail", "_out", "_match_sets", "_all")
+
+    def __init__(self, keyword_classes: Mapping[str, Iterable[str]]):
+        """
+        Args:
+            keyword_classes: {類別名稱: 關鍵詞}，空字符串會被忽略
+
+        Raises:
+            ValueError: 類別數超過 63 個
+        """
+        self.classes = tuple(keyword_classes)
+        if len(self.classes) > 63:
+            raise ValueError("KeywordAutomaton supports at most 63 classes")
+
+        # 狀態 0 為根；_goto[state] = {字元: 下一狀態}，_out[state] = 類別位元
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[int] = [0]
+
+        for bit, name in enumerate(self.classes):
+            for keyword in keyword_classes[name]:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                state = 0
+                for ch in keyword:
+                    next_state = self._goto[state].get(ch)
+                    if next_state is None:
+                        next_state = len(self._goto)
+                        self._goto[state][ch] = next_state
+                        self._goto.append({})
+                        self._out.append(0)
+                    state = next_state
+                self._out[state] |= 1 << bit
+
+        self._fail = self._build_failure_links()
+        self._all = (1 << len(self.classes)) - 1
+        self._match_sets: Dict[int, FrozenSet[str]] = {}
+
+    def __len__(self) -> int:
+        """自動機狀態數"""
+        return len(self._goto)
+
+    def match_mask(self, text: str) -> int:
+        """掃描一次文字，返回出現的類別位元 (第 i 個類別為 1 << i)
+
+        Args:
+            text: 要比對的文字
+
+        Returns:
+            類別位元組合 (沒有符合時為 0)
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        root = goto[0]
+        everything = self._all
+
+        state = 0
+        found = 0
+        for ch in text.lower():
+            if state:
+                # 沿失敗連結回退，直到可以接受此字元 (或回到根)
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+            else:
+                state = root.get(ch, 0)
+                if not state:
+                    continue
+            if out[state]:
+                found |= out[state]
+                if found == everything:
+                    break
+        return found
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """掃描一次文字，返回出現的類別名稱
+
+        Args:
+            text: 要比對的文字
+
+        Returns:
+            類別名稱集合
+        """
+        mask = self.match_mask(text)
+        match_set = self._match_sets.get(mask)
+        if match_set is None:
+            match_set = frozenset(
+                name for bit, name in enumerate(self.classes) if mask >> bit & 1
+            )
+            self._match_sets[mask] = match_set
+        return match_set
+
+    def _build_failure_links(self) -> List[int]:
+        """以廣度優先建立失敗連結，並將後綴狀態的輸出併入 (內部函數)"""
+        goto = self._goto
+        out = self._out
+        fail = [0] * len(goto)
+
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, next_state in goto[state].items():
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                fail[next_state] = goto[link].get(ch, 0)
+                out[next_state] |= out[fail[next_state]]
+                queue.append(next_state)
+
+        return fail
+
+
+def load_keyword_file(path: str) -> Dict[str, List[str]]:
+    """讀取關鍵詞設定檔
+
+    檔案為 JSON 物件 {類別名稱: [關鍵詞, ...]}，例如：
+        {"action": ["上線", "部署"], "bot": ["notify"]}
+
+    Args:
+        path: 設定檔路徑
+
+    Returns:
+        {類別名稱: 關鍵詞列表}
+
+    Raises:
+        ValueError: 檔案格式不正確
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if not isinstance(data, dict) or not all(
+        isinstance(terms, list) and all(isinstance(t, str) for t in terms)
+        for terms in data.values()
+    ):
+        raise ValueError(
+            f"Keyword file {path} must map class names to lists of strings"
+        )
+    return data
+
+
+def merge_keyword_classes(
+    base: Mapping[str, Iterable[str]],
+    path: str
+) -> Dict[str, set]:
+    """將設定檔的關鍵詞加入內建關鍵詞 (設定檔不存在時只使用內建)
+
+    Args:
+        base: 內建的 {類別名稱: 關鍵詞}
+        path: 設定檔路徑 (空字符串 = 不使用)
+
+    Returns:
+        {類別名稱: 關鍵詞集合}
+    """
+    merged = {name: set(terms) for name, terms in base.items()}
+    if not path or not Path(path).is_file():
+        return merged
+
+    extra = load_keyword_file(path)
+    for name, terms in extra.items():
+        merged.setdefault(name, set()).update(terms)
+    logger.info(
+        f"Loaded {sum(len(terms) for terms in extra.values())} keywords "
+        f"from {path}"
+    )
+    return merged
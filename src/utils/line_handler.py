@@ -2,42 +2,116 @@
 
 import logging
 import asyncio
-from typing import List, Dict
-from datetime import datetime
-import pytz
+import time
+from typing import List, Dict, Iterable, Optional, Tuple, AsyncIterator
 
-from linebot.v3.messaging import ApiClient, Configuration, MessagingApi
+from linebot.v3.messaging import (
+    AsyncApiClient, AsyncMessagingApi, Configuration
+)
 from linebot.v3.messaging.exceptions import ApiException
 
+from src.config import Config
+from src.utils.message_store import MessageStore
+from src.utils.profile_cache import ProfileCache
+from src.utils.rate_limiter import RateLimiter, get_rate_limiter
+from src.utils.time_utils import ms_to_iso8601
+
 logger = logging.getLogger(__name__)
 
 
 class LineHandler:
     """LINE Messaging API 處理器
 
-    負責封裝所有 LINE API 調用，包括：
+    負責封裝所有 LINE API 調用 (非同步 aiohttp 傳輸、共用連線池)，包括：
     - 獲取群組訊息
     - 獲取群組成員信息
     - 時間戳轉換和訊息格式化
     """
 
-    def __init__(self, channel_access_token: str) -> None:
+    def __init__(
+        self,
+        channel_access_token: str,
+        max_connections: int = 100,
+        max_concurrent_profiles: int = 20,
+        profile_cache: Optional[ProfileCache] = None,
+        message_store: Optional[MessageStore] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        api_base_url: Optional[str] = None
+    ) -> None:
         """初始化 LINE Handler
 
         Args:
             channel_access_token: LINE Channel Access Token
+            max_connections: 連線池最大並發連線數 (所有群組共用)
+            max_concurrent_profiles: 同時進行中的成員資料請求上限
+            profile_cache: 成員資料快取 (None 表示不使用快取)
+            message_store: webhook 訊息儲存 (訊息來源)
+            rate_limiter: 速率限制器 (預設使用全域共用實例)
+            api_base_url: LINE API 網址 (預設 Config.LINE_API_BASE_URL，
+                空值時使用 SDK 預設的 https://api.line.me)
 
         Raises:
             ValueError: 如果 token 為空
         """
         if not channel_access_token:
             raise ValueError("Channel access token cannot be empty")
+        if max_concurrent_profiles < 1:
+            raise ValueError("max_concurrent_profiles must be at least 1")
+
+        self.configuration = Configuration(
+            host=api_base_url or Config.LINE_API_BASE_URL or None,
+            access_token=channel_access_token
+        )
+        self.configuration.connection_pool_maxsize = max_connections
+
+        # aiohttp session 必須在 event loop 內建立，因此延遲到第一次請求
+        self.api_client = None
+        self.messaging_api = None
+
+        # 所有 API 請求經過全域共用的速率限制器
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+
+        # 成員資料請求的並發上限 (跨群組共用)
+        self._profile_semaphore = asyncio.Semaphore(max_concurrent_profiles)
 
-        configuration = Configuration(access_token=channel_access_token)
-        self.api_client = ApiClient(configuration)
-        self.messaging_api = MessagingApi(self.api_client)
+        # 成員資料快取，以及進行中的請求 (同一 user_id 共用一個請求)
+        self.profile_cache = profile_cache
+        self._inflight_profiles: Dict[str, asyncio.Future] = {}
+
+        # LINE API 無法拉取歷史訊息，訊息由 webhook 伺服器寫入此儲存
+        self.message_store = message_store
+
+        # 每個群組的成員資料抓取統計 {group_id: {...}}
+        self.member_fetch_stats: Dict[str, dict] = {}
         logger.info("LineHandler initialized successfully")
 
+    def _get_messaging_api(self) -> AsyncMessagingApi:
+        """取得共用的非同步 Messaging API 客戶端 (內部函數)
+
+        第一次調用時建立 keep-alive 連線池，之後所有群組共用同一個池。
+
+        Returns:
+            AsyncMessagingApi 實例
+        """
+        if self.messaging_api is None:
+            self.api_client = AsyncApiClient(self.configuration)
+            self.messaging_api = AsyncMessagingApi(self.api_client)
+        return self.messaging_api
+
+    async def close(self) -> None:
+        """關閉連線池"""
+        if self.api_client is not None:
+            await self.api_client.close()
+            self.api_client = None
+            self.messaging_api = None
+            logger.info("LineHandler connection pool closed")
+
+    async def __aenter__(self) -> "LineHandler":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
     async def get_group_members(self, group_id: str) -> Dict[str, str]:
         """獲取群組成員映射 (user_id → name)
 
@@ -54,34 +128,51 @@ class LineHandler:
         logger.info(f"Fetching group members for group: {group_id}")
 
         try:
-            members_map = {}
-
-            # 取得群組成員 ID 列表（支持分頁）
-            member_ids = []
-            response = self.messaging_api.get_group_members_ids(group_id)
-            member_ids.extend(response.member_ids)
-
-            # 處理分頁（next token）
-            while response.next:
-                response = self.messaging_api.get_group_members_ids(
+            # 成員數未變動且快取完整時，直接使用快取
+            member_count = None
+            if self.profile_cache is not None:
+                member_count = await self._get_member_count(group_id)
+                cached = await asyncio.to_thread(
+                    self._get_unchanged_group,
                     group_id,
-                    start=response.next
+                    member_count
                 )
-                member_ids.extend(response.member_ids)
-
-            # 逐個獲取成員資料
-            for member_id in member_ids:
-                try:
-                    profile = self.messaging_api.get_group_member_profile(
-                        group_id,
-                        member_id
+                if cached is not None:
+                    logger.info(
+                        f"Group {group_id} unchanged ({member_count} members), "
+                        f"using cached profiles"
                     )
-                    members_map[member_id] = profile.display_name
-                except ApiException as e:
-                    logger.warning(
-                        f"Failed to get profile for {member_id}: {e}"
+                    return cached
+
+            # 邊分頁邊抓取：每取得一頁成員 ID 就開始抓取該頁的成員資料
+            started = time.perf_counter()
+            page_tasks = []
+            async for page in self.iter_group_member_ids(group_id):
+                page_tasks.append(
+                    asyncio.ensure_future(
+                        self._resolve_profiles(group_id, page)
                     )
-                    members_map[member_id] = f"Unknown_{member_id[:8]}"
+                )
+
+            members_map = {}
+            cache_hits = failed = 0
+            for page_map, page_hits, page_failed in await asyncio.gather(
+                *page_tasks
+            ):
+                members_map.update(page_map)
+                cache_hits += page_hits
+                failed += page_failed
+
+            self._record_fetch_stats(
+                group_id, len(members_map), cache_hits, failed, started
+            )
+
+            if self.profile_cache is not None and member_count is not None:
+                await asyncio.to_thread(
+                    self.profile_cache.set_member_count,
+                    group_id,
+                    member_count
+                )
 
             logger.info(
                 f"Successfully fetched {len(members_map)} group members"
@@ -95,11 +186,268 @@ class LineHandler:
             logger.error(f"Unexpected error when fetching members: {e}")
             raise
 
+    async def iter_group_member_ids(
+        self,
+        group_id: str
+    ) -> AsyncIterator[List[str]]:
+        """逐頁產生群組成員 ID（不在記憶體中累積完整列表）
+
+        Args:
+            group_id: LINE 群組 ID
+
+        Yields:
+            每一頁的 user_id 列表
+        """
+        messaging_api = self._get_messaging_api()
+        response = await self.rate_limiter.call(
+            "members",
+            messaging_api.get_group_members_ids,
+            group_id
+        )
+        yield list(response.member_ids)
+
+        # 處理分頁（next token）
+        while response.next:
+            response = await self.rate_limiter.call(
+                "members",
+                messaging_api.get_group_members_ids,
+                group_id,
+                start=response.next
+            )
+            yield list(response.member_ids)
+
+    async def fetch_member_profiles(
+        self,
+        group_id: str,
+        member_ids: Iterable[str]
+    ) -> Dict[str, str]:
+        """並發獲取多個成員的顯示名稱
+
+        先查詢快取，只抓取未命中的成員。同時進行中的請求數受
+        max_concurrent_profiles 限制，同一 user_id 的並發查詢共用一個請求；
+        單一成員失敗不影響其他成員，失敗者以 Unknown_{id[:8]} 代替。
+        抓取耗時記錄於 member_fetch_stats[group_id]。
+
+        Args:
+            group_id: LINE 群組 ID
+            member_ids: 成員 user_id 列表
+
+        Returns:
+            字典，格式: {"U123...": "Alice", ...}
+        """
+        started = time.perf_counter()
+        members_map, cache_hits, failed = await self._resolve_profiles(
+            group_id,
+            member_ids
+        )
+        self._record_fetch_stats(
+            group_id, len(members_map), cache_hits, failed, started
+        )
+        return members_map
+
+    async def resolve_sender_names(
+        self,
+        group_id: str,
+        messages: List[dict]
+    ) -> List[dict]:
+        """只解析實際發言者的顯示名稱（批量一次完成）
+
+        收集訊息中出現過、且尚未有 sender_name 的不重複 sender_id，
+        一次批量查詢後回填 sender_name。
+
+        Args:
+            group_id: LINE 群組 ID
+            messages: 含 sender_id 的訊息列表（就地更新）
+
+        Returns:
+            更新後的訊息列表
+        """
+        sender_ids = list(dict.fromkeys(
+            msg["sender_id"] for msg in messages
+            if msg.get("sender_id") and not msg.get("sender_name")
+        ))
+        if not sender_ids:
+            return messages
+
+        names = await self.fetch_member_profiles(group_id, sender_ids)
+        for msg in messages:
+            if not msg.get("sender_name") and msg.get("sender_id") in names:
+                msg["sender_name"] = names[msg["sender_id"]]
+
+        logger.info(
+            f"Resolved {len(sender_ids)} active senders for {group_id}"
+        )
+        return messages
+
+    async def _resolve_profiles(
+        self,
+        group_id: str,
+        member_ids: Iterable[str]
+    ) -> Tuple[Dict[str, str], int, int]:
+        """查詢快取並抓取未命中的成員資料 (內部函數)
+
+        Returns:
+            (members_map, cache_hits, failed)
+        """
+        member_ids = list(member_ids)
+
+        cached = {}
+        if self.profile_cache is not None:
+            cached = await asyncio.to_thread(
+                self.profile_cache.lookup,
+                group_id,
+                member_ids
+            )
+        to_fetch = [m for m in member_ids if m not in cached]
+
+        names = await asyncio.gather(
+            *(self._get_profile_name(group_id, m) for m in to_fetch)
+        )
+        fetched = {
+            member_id: name
+            for member_id, name in zip(to_fetch, names)
+            if name is not None
+        }
+
+        if self.profile_cache is not None:
+            await asyncio.to_thread(
+                self.profile_cache.put_many,
+                group_id,
+                fetched
+            )
+
+        members_map = {}
+        for member_id in member_ids:
+            name = cached.get(member_id) or fetched.get(member_id)
+            members_map[member_id] = name or f"Unknown_{member_id[:8]}"
+
+        return members_map, len(cached), len(to_fetch) - len(fetched)
+
+    def _record_fetch_stats(
+        self,
+        group_id: str,
+        members: int,
+        cache_hits: int,
+        failed: int,
+        started: float
+    ) -> None:
+        """記錄群組的成員資料抓取統計 (內部函數)"""
+        latency = time.perf_counter() - started
+        self.member_fetch_stats[group_id] = {
+            "members": members,
+            "cache_hits": cache_hits,
+            "failed": failed,
+            "latency_seconds": round(latency, 3),
+        }
+        logger.info(
+            f"Fetched {members} profiles for {group_id} "
+            f"in {latency:.2f}s ({cache_hits} cached, {failed} failed)"
+        )
+
+    async def _get_profile_name(
+        self,
+        group_id: str,
+        member_id: str
+    ) -> Optional[str]:
+        """獲取單一成員的顯示名稱，合併同一 user_id 的並發請求 (內部函數)
+
+        Returns:
+            顯示名稱，失敗時為 None
+        """
+        task = self._inflight_profiles.get(member_id)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._request_profile(group_id, member_id)
+            )
+            self._inflight_profiles[member_id] = task
+            task.add_done_callback(
+                lambda _: self._inflight_profiles.pop(member_id, None)
+            )
+        return await asyncio.shield(task)
+
+    async def _request_profile(
+        self,
+        group_id: str,
+        member_id: str
+    ) -> Optional[str]:
+        """向 LINE API 請求成員資料 (內部函數)"""
+        messaging_api = self._get_messaging_api()
+        async with self._profile_semaphore:
+            try:
+                profile = await self.rate_limiter.call(
+                    "profile",
+                    messaging_api.get_group_member_profile,
+                    group_id,
+                    member_id
+                )
+                return profile.display_name
+            except Exception as e:
+                logger.warning(f"Failed to get profile for {member_id}: {e}")
+                return None
+
+    async def get_group_summary(self, group_id: str) -> Dict:
+        """獲取群組名稱、圖片網址和成員數 (兩個請求並發)
+
+        Args:
+            group_id: LINE 群組 ID
+
+        Returns:
+            {"group_name": str, "picture_url": Optional[str],
+             "member_count": Optional[int]}
+
+        Raises:
+            ApiException: 群組摘要 API 調用失敗時 (成員數失敗時為 None)
+        """
+        summary, member_count = await asyncio.gather(
+            self.rate_limiter.call(
+                "members",
+                self._get_messaging_api().get_group_summary,
+                group_id
+            ),
+            self._get_member_count(group_id)
+        )
+        return {
+            "group_name": summary.group_name,
+            "picture_url": summary.picture_url,
+            "member_count": member_count,
+        }
+
+    async def _get_member_count(self, group_id: str) -> Optional[int]:
+        """獲取群組成員數，失敗時返回 None (內部函數)"""
+        try:
+            response = await self.rate_limiter.call(
+                "members",
+                self._get_messaging_api().get_group_member_count,
+                group_id
+            )
+            return response.count
+        except Exception as e:
+            logger.warning(f"Failed to get member count for {group_id}: {e}")
+            return None
+
+    def _get_unchanged_group(
+        self,
+        group_id: str,
+        member_count: Optional[int]
+    ) -> Optional[Dict[str, str]]:
+        """成員數與上次相同且快取完整時返回快取成員 (在執行緒中執行，內部函數)"""
+        if member_count is None:
+            return None
+        if self.profile_cache.get_member_count(group_id) != member_count:
+            return None
+
+        cached = self.profile_cache.get_group_members(group_id)
+        if len(cached) < member_count:
+            return None
+        return cached
+
     async def get_group_messages(
         self,
         group_id: str,
         start_time: int,
-        end_time: int
+        end_time: int,
+        lazy_senders: bool = True,
+        store_offsets: Optional[Dict[str, int]] = None
     ) -> List[dict]:
         """從 LINE API 獲取群組訊息
 
@@ -107,12 +455,17 @@ class LineHandler:
             group_id: LINE 群組 ID (格式: C + 32 個字符)
             start_time: 開始時間戳 (毫秒級 Unix time)
             end_time: 結束時間戳 (毫秒級 Unix time)
+            lazy_senders: True 時先以 sender_id 收集訊息，最後只解析實際
+                發言者的名稱；False 時預先抓取完整成員映射
+            store_offsets: 若提供，只讀取訊息儲存中這些位置之後到達的訊息
+                (見 MessageStore.read_messages)，成功返回時就地更新
 
         Returns:
             訊息列表，每個訊息包含以下字段：
             {
                 "message_id": str,
                 "timestamp": str (ISO 8601 格式),
+                "timestamp_ms": int (毫秒級 Unix time),
                 "sender_id": str,
                 "sender_name": str,
                 "message_type": str (text, image, file, video, audio, etc.),
@@ -132,13 +485,38 @@ class LineHandler:
         messages = []
 
         try:
-            # 獲取群組成員映射
-            members_map = await self.get_group_members(group_id)
-
-            # 嘗試從 LINE Messaging API 獲取訊息
-            # 注意：LINE Messaging API 的訊息獲取功能有限制
-            # 實際的實現需要根據 LINE API 的具體功能進行調整
+            # 預先模式：獲取完整群組成員映射
+            members_map = {}
+            if not lazy_senders:
+                members_map = await self.get_group_members(group_id)
+
+            # LINE Messaging API 無法拉取歷史訊息，改從 webhook 儲存讀取
+            # (讀取位置在整個請求成功後才更新)
+            read_offsets = None
+            if self.message_store is not None:
+                read_offsets = dict(store_offsets or {})
+                messages = await asyncio.to_thread(
+                    self.message_store.read_messages,
+                    group_id,
+                    start_time,
+                    end_time,
+                    read_offsets
+                )
 
+            # 回填發送者名稱
+            if lazy_senders:
+                await self.resolve_sender_names(group_id, messages)
+            else:
+                for msg in messages:
+                    if not msg.get("sender_name"):
+                        sender_id = msg.get("sender_id", "")
+                        msg["sender_name"] = members_map.get(
+                            sender_id,
+                            f"Unknown_{sender_id[:8]}"
+                        )
+
+            if store_offsets is not None and read_offsets is not None:
+                store_offsets.update(read_offsets)
             logger.info(
                 f"Successfully fetched {len(messages)} messages for group"
             )
@@ -165,9 +543,7 @@ class LineHandler:
         Returns:
             ISO 8601 格式的時間戳 (例如: "2026-02-17T09:15:30+08:00")
         """
-        tz = pytz.timezone(timezone)
-        dt = datetime.fromtimestamp(timestamp_ms / 1000, tz=tz)
-        return dt.isoformat()
+        return ms_to_iso8601(timestamp_ms, timezone)
 
     @staticmethod
     def get_message_type(message_event) -> str:
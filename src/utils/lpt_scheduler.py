@@ -0,0 +1,262 @@
+"""Longest-processing-time-first (LPT) scheduling of per-group jobs"""
+
+import logging
+import asyncio
+import heapq
+import json
+import time
+from collections import deque
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+
+from src.utils.partitions import partition_path
+
+logger = logging.getLogger(__name__)
+
+
+def load_group_volumes(
+    stats_dir: str,
+    before_date: Optional[str] = None,
+    history_days: int = 7
+) -> Dict[str, float]:
+    """從 Agent 2 的 stats_{date}.json 歷史估計各群組的每日訊息量
+
+    統計檔案位於各日期分區 (stats_dir/YYYY/MM/DD/stats_{date}.json)；
+    指定 before_date 時只查看之前 history_days 天的分區，不掃描整個目錄。
+    舊的平坦目錄中的 stats_*.json 也會使用。
+
+    Args:
+        stats_dir: 統計檔案目錄 (data/processed_messages)
+        before_date: 只使用早於此日期 (YYYY-MM-DD) 的統計，預設使用全部
+        history_days: 最多使用最近幾天的統計
+
+    Returns:
+        {group_id: 平均原始訊息數 (處理後訊息數 + 去除的重複訊息數
+        + 過濾的雜訊數 + 合併的近似重複訊息數)}
+    """
+    stats_path = Path(stats_dir)
+    if not stats_path.exists():
+        return {}
+
+    candidates = list(stats_path.glob("stats_*.json"))
+    if before_date:
+        first_day = date.fromisoformat(before_date)
+        for offset in range(1, history_days + 1):
+            day = (first_day - timedelta(days=offset)).isoformat()
+            stats_file = partition_path(stats_dir, day) / f"stats_{day}.json"
+            if stats_file.exists():
+                candidates.append(stats_file)
+    else:
+        candidates.extend(stats_path.glob("*/*/*/stats_*.json"))
+
+    # 同一天同時有平坦目錄和分區的檔案時使用分區中的檔案
+    files_by_date = {f.stem[len("stats_"):]: f for f in candidates}
+    dated_files = sorted(
+        (
+            (day, f) for day, f in files_by_date.items()
+            if not before_date or day < before_date
+        ),
+        reverse=True
+    )[:history_days]
+
+    totals: Dict[str, List[int]] = {}
+    for _, stats_file in dated_files:
+        try:
+            with open(stats_file, "r", encoding="utf-8") as f:
+                stats_by_group = json.load(f).get("stats_by_group", {})
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable stats file {stats_file}: {e}")
+            continue
+
+        for group_id, stats in stats_by_group.items():
+            volume = (
+                stats.get("total_messages", 0)
+                + stats.get("removed_duplicates", 0)
+                + stats.get("filtered_noise", 0)
+                + stats.get("near_duplicates", 0)
+            )
+            totals.setdefault(group_id, []).append(volume)
+
+    return {
+        group_id: sum(volumes) / len(volumes)
+        for group_id, volumes in totals.items()
+    }
+
+
+def load_seconds_per_unit(stats_file: str, schedule_key: str) -> Optional[float]:
+    """讀取上一次執行記錄的每單位工作量耗時
+
+    run_lpt 的報告記錄在執行統計檔案 (data/execution_stats.json) 的
+    "{agent}_schedule" 下 (例如 "crawler_schedule")。
+
+    Args:
+        stats_file: 執行統計檔案
+        schedule_key: 排程報告的鍵
+
+    Returns:
+        秒/訊息，沒有歷史或檔案無法讀取時為 None
+    """
+    try:
+        with open(stats_file, "r", encoding="utf-8") as f:
+            report = json.load(f).get(schedule_key) or {}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable execution stats {stats_file}: {e}")
+        return None
+
+    seconds_per_unit = report.get("seconds_per_unit")
+    if isinstance(seconds_per_unit, (int, float)) and seconds_per_unit > 0:
+        return float(seconds_per_unit)
+    return None
+
+
+def lpt_order(
+    job_ids: Iterable[str],
+    volumes: Dict[str, float]
+) -> List[str]:
+    """依預估工作量由大到小排序 (量相同時保持原順序)
+
+    沒有歷史的工作以已知工作量的平均值估計。
+
+    Args:
+        job_ids: 工作 ID (群組 ID)
+        volumes: {job_id: 預估工作量}
+
+    Returns:
+        排序後的工作 ID
+    """
+    job_ids = list(job_ids)
+    default = _default_volume(job_ids, volumes)
+    return sorted(
+        job_ids,
+        key=lambda job_id: volumes.get(job_id, default),
+        reverse=True
+    )
+
+
+def predict_makespan(durations: Iterable[float], workers: int) -> float:
+    """模擬依序將工作交給最早空閒的 worker，返回完成全部工作的時間
+
+    Args:
+        durations: 依啟動順序排列的工作耗時
+        workers: 並發上限
+
+    Returns:
+        預估總耗時 (makespan)
+    """
+    loads = [0.0] * max(workers, 1)
+    for duration in durations:
+        heapq.heapreplace(loads, loads[0] + duration)
+    return max(loads)
+
+
+async def run_lpt(
+    jobs: Dict[str, Callable[[], Awaitable[Any]]],
+    volumes: Dict[str, float],
+    max_concurrency: int,
+    seconds_per_unit: Optional[float] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """以 LPT 順序、固定並發數執行工作
+
+    同時最多執行 max_concurrency 個工作，工作量大的先啟動，避免最大的
+    群組最後才開始而拉長總耗時。單一工作的異常不影響其他工作，異常對象
+    作為該工作的結果返回 (同 asyncio.gather(return_exceptions=True))。
+
+    預估耗時：開始前以之前執行的每單位工作量耗時 (seconds_per_unit) 換算
+    各工作的耗時，依 LPT 順序模擬排程，與實際耗時一起記錄，用於檢查
+    預測準確度。本次實測的每單位耗時也寫入報告，供下次預估使用。
+
+    Args:
+        jobs: {job_id: 產生 coroutine 的函數}
+        volumes: {job_id: 預估工作量 (訊息數)}
+        max_concurrency: 並發上限
+        seconds_per_unit: 之前執行的秒/訊息 (load_seconds_per_unit)，
+            None 時預估值記錄為 None (未知)
+
+    Returns:
+        (results, report)
+        results: {job_id: 結果或異常}
+        report: {
+            "workers": 5,
+            "jobs": 120,
+            "jobs_without_history": 3,
+            "predicted_makespan_seconds": 41.2,  # 沒有歷史時為 None
+            "actual_makespan_seconds": 43.8,
+            "lower_bound_seconds": 39.5,
+            "seconds_per_unit": 0.0021
+        }
+
+    Raises:
+        ValueError: max_concurrency 小於 1
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    order = lpt_order(jobs, volumes)
+    default = _default_volume(order, volumes)
+    estimates = [volumes.get(job_id, default) for job_id in order]
+    workers = min(max_concurrency, len(order)) or 1
+
+    # 在執行前預估，不使用本次的實際耗時
+    predicted = None
+    if seconds_per_unit is not None:
+        predicted = predict_makespan(
+            (estimate * seconds_per_unit for estimate in estimates),
+            workers
+        )
+
+    pending = deque(order)
+    results: Dict[str, Any] = {}
+    durations: Dict[str, float] = {}
+
+    async def _worker() -> None:
+        while pending:
+            job_id = pending.popleft()
+            started = time.perf_counter()
+            try:
+                results[job_id] = await jobs[job_id]()
+            except Exception as e:
+                results[job_id] = e
+            durations[job_id] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(workers)))
+    actual = time.perf_counter() - started
+
+    total_estimate = sum(estimates)
+    measured_seconds_per_unit = (
+        sum(durations.values()) / total_estimate if total_estimate else None
+    )
+    lower_bound = max(
+        max(durations.values(), default=0.0),
+        sum(durations.values()) / workers
+    )
+
+    report = {
+        "workers": workers,
+        "jobs": len(order),
+        "jobs_without_history": sum(1 for j in order if j not in volumes),
+        "predicted_makespan_seconds": (
+            round(predicted, 3) if predicted is not None else None
+        ),
+        "actual_makespan_seconds": round(actual, 3),
+        "lower_bound_seconds": round(lower_bound, 3),
+        "seconds_per_unit": (
+            round(measured_seconds_per_unit, 9)
+            if measured_seconds_per_unit is not None else None
+        ),
+    }
+    predicted_text = f"{predicted:.2f}s" if predicted is not None else "unknown"
+    logger.info(
+        f"LPT schedule: {len(order)} jobs on {workers} workers, "
+        f"predicted {predicted_text}, actual {actual:.2f}s"
+    )
+    return results, report
+
+
+def _default_volume(job_ids: Iterable[str], volumes: Dict[str, float]) -> float:
+    """沒有歷史的工作使用的預估量：已知工作量的平均值 (內部函數)"""
+    known = [volumes[job_id] for job_id in job_ids if job_id in volumes]
+    return sum(known) / len(known) if known else 1.0
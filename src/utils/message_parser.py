@@ -1,11 +1,14 @@
 """Message parsing and cleaning utilities for Agent 2"""
 
 import logging
-from typing import List, Dict
-from datetime import datetime, timedelta
-from collections import Counter
-import re
-import jieba
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+from collections import Counter, deque
+
+from src.config import Config
+from src.utils import tokenizer
+from src.utils.keyword_matcher import KeywordAutomaton, merge_keyword_classes
+from src.utils.noise_filter import NoiseFilter, build_noise_filter
+from src.utils.time_utils import MS_PER_MINUTE, message_timestamp_ms
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +32,21 @@ ACTION_KEYWORDS = {'需要', '完成', '提醒', '會議', '任務', '工作', '
 # Announcement markers
 ANNOUNCEMENT_MARKERS = {'【公告】', '【重要】', '[公告]', '[重要]', '通知：', '警告：'}
 
+# 關鍵詞類別 (Config.KEYWORDS_FILE 中的關鍵詞會加入對應類別)
+KEYWORD_CLASSES = {
+    'announcement': ANNOUNCEMENT_MARKERS,
+    'question': QUESTION_KEYWORDS,
+    'action': ACTION_KEYWORDS,
+    'bot': BOT_KEYWORDS,
+}
+
+_keyword_automaton: Optional[KeywordAutomaton] = None
+_noise_filter: Optional[NoiseFilter] = None
+
+# Deduplication windows (milliseconds)
+SAME_SENDER_WINDOW_MS = 5 * MS_PER_MINUTE
+ANY_SENDER_WINDOW_MS = 10 * MS_PER_MINUTE
+
 
 def remove_duplicates(messages: List[dict]) -> List[dict]:
     """去除重複訊息
@@ -43,83 +61,127 @@ def remove_duplicates(messages: List[dict]) -> List[dict]:
     Returns:
         去重後的訊息列表（保留第一條，刪除後續重複）
     """
+    return remove_duplicates_with_count(messages)[0]
+
+
+def remove_duplicates_with_count(messages: List[dict]) -> Tuple[List[dict], int]:
+    """去除重複訊息，並返回去除的數量
+
+    規則同 remove_duplicates：訊息依時間排序後，若之前「保留」的訊息中
+    有內容相同 (去除前後空白) 且
+    - 同一人、時間差 <= 5 分鐘，或
+    - 不同人、時間差 < 10 分鐘且內容非空
+    的訊息，則視為重複。
+
+    以雜湊索引取代兩兩比較：只記錄 10 分鐘滑動窗口內保留的訊息
+    - (內容, 發送者) → 最近一次的時間
+    - 內容 → 最近一次的 (時間, 發送者)，以及發送者不同的前一次
+    每則訊息 O(1) 判斷，整體 O(n log n) (排序)，同一分鐘內大量訊息的
+    群組也不會退化為 O(n²)。
+
+    Args:
+        messages: 原始訊息列表
+
+    Returns:
+        (去重後的訊息列表, 去除的重複訊息數)
+    """
     logger.info(f"Starting deduplication for {len(messages)} messages")
 
     if not messages:
-        return []
+        return [], 0
+
+    # 按時間排序（穩定排序，時間相同時保持原順序）
+    counts = Counter()
+    result = list(iter_remove_duplicates(
+        sorted(messages, key=message_timestamp_ms),
+        counts
+    ))
+    duplicates = counts['removed_duplicates']
 
-    # 按時間排序
-    sorted_messages = sorted(
-        messages,
-        key=lambda m: m.get('timestamp', '')
+    logger.info(
+        f"Deduplication complete: removed {duplicates} duplicates, "
+        f"{len(result)} remaining"
     )
+    return result, duplicates
 
-    duplicates = set()
-    result = []
 
-    for i, msg in enumerate(sorted_messages):
-        if i in duplicates:
-            continue
+def iter_remove_duplicates(
+    messages: Iterable[dict],
+    counts: Counter
+) -> Iterator[dict]:
+    """remove_duplicates 的串流版本 (輸入需依時間排序)
+
+    只保留 10 分鐘滑動窗口內的索引，記憶體與總訊息數無關。
+
+    Args:
+        messages: 依時間排序的訊息迭代器
+        counts: 累加 counts['removed_duplicates'] (去除的重複訊息數)
+
+    Yields:
+        保留的訊息
+    """
+    # (content, sender_id) → 最近保留的時間
+    last_by_sender: Dict[Tuple[str, str], int] = {}
+    # content → [最近保留的時間, 其發送者, 不同發送者的最近時間 或 None]
+    last_by_content: Dict[str, list] = {}
+    window: deque = deque()
+
+    for msg in messages:
+        msg_timestamp = message_timestamp_ms(msg)
+
+        # 移出不可能再與之後訊息重複的舊記錄 (時間差 >= 10 分鐘)
+        cutoff = msg_timestamp - ANY_SENDER_WINDOW_MS
+        while window and window[0][0] <= cutoff:
+            _, old_content, old_sender = window.popleft()
+            if last_by_sender.get((old_content, old_sender), msg_timestamp) <= cutoff:
+                del last_by_sender[(old_content, old_sender)]
+            entry = last_by_content.get(old_content)
+            if entry is not None:
+                if entry[0] <= cutoff:
+                    del last_by_content[old_content]
+                elif entry[2] is not None and entry[2] <= cutoff:
+                    entry[2] = None
 
-        msg_timestamp = datetime.fromisoformat(msg['timestamp'])
         msg_content = msg.get('content', '').strip()
         msg_sender = msg.get('sender_id', '')
 
-        # 檢查後續訊息中的重複
-        for j in range(i + 1, len(sorted_messages)):
-            if j in duplicates:
-                continue
-
-            other_msg = sorted_messages[j]
-            other_timestamp = datetime.fromisoformat(other_msg['timestamp'])
-            other_content = other_msg.get('content', '').strip()
-            other_sender = other_msg.get('sender_id', '')
-
-            # 時間差超過10分鐘，停止比較
-            time_diff = (other_timestamp - msg_timestamp).total_seconds() / 60
-            if time_diff > 10:
-                break
-
-            # 檢查是否重複
-            is_duplicate = False
-
-            # 條件1：同一人在5分鐘內完全相同
-            if (msg_sender == other_sender and
-                time_diff <= 5 and
-                msg_content == other_content):
-                is_duplicate = True
-
-            # 條件2：不同人但內容相同且時間相近
-            if (msg_sender != other_sender and
-                time_diff < 10 and
-                msg_content == other_content and
-                len(msg_content) > 0):
-                is_duplicate = True
-
-            if is_duplicate:
-                duplicates.add(j)
-                logger.debug(
-                    f"Duplicate found: {other_msg['message_id']} "
-                    f"(duplicate of {msg['message_id']})"
-                )
-
-        result.append(msg)
+        # 條件1：同一人在5分鐘內完全相同
+        last = last_by_sender.get((msg_content, msg_sender))
+        is_duplicate = (
+            last is not None
+            and msg_timestamp - last <= SAME_SENDER_WINDOW_MS
+        )
+
+        # 條件2：不同人但內容相同且時間相近
+        entry = last_by_content.get(msg_content)
+        if not is_duplicate and entry is not None and msg_content:
+            other = entry[0] if entry[1] != msg_sender else entry[2]
+            is_duplicate = (
+                other is not None
+                and msg_timestamp - other < ANY_SENDER_WINDOW_MS
+            )
+
+        if is_duplicate:
+            counts['removed_duplicates'] += 1
+            logger.debug(f"Duplicate found: {msg['message_id']}")
+            continue
 
-    logger.info(
-        f"Deduplication complete: removed {len(duplicates)} duplicates, "
-        f"{len(result)} remaining"
-    )
-    return result
+        window.append((msg_timestamp, msg_content, msg_sender))
+        last_by_sender[(msg_content, msg_sender)] = msg_timestamp
+        if entry is None:
+            last_by_content[msg_content] = [msg_timestamp, msg_sender, None]
+        else:
+            if entry[1] != msg_sender:
+                entry[2] = entry[0]
+            entry[0] = msg_timestamp
+            entry[1] = msg_sender
+        yield msg
 
 
 def filter_noise(messages: List[dict]) -> List[dict]:
     """過濾垃圾訊息
 
-    過濾規則：
-    - 機器人訊息（sender_name 包含 "Bot", "System"）
-    - 斜線命令（content 以 "/" 開頭）
-    - 僅包含表情符號的訊息
-    - 空訊息
+    規則見 filter_noise_with_stats。
 
     Args:
         messages: 訊息列表
@@ -127,46 +189,51 @@ def filter_noise(messages: List[dict]) -> List[dict]:
     Returns:
         過濾後的訊息列表
     """
-    logger.info(f"Starting noise filtering for {len(messages)} messages")
+    return filter_noise_with_stats(messages)[0]
 
-    result = []
-    filtered_count = 0
-
-    for msg in messages:
-        sender_name = msg.get('sender_name', '').lower()
-        content = msg.get('content', '').strip()
 
-        # 檢查1：機器人訊息
-        if any(bot_kw in sender_name for bot_kw in BOT_KEYWORDS):
-            filtered_count += 1
-            logger.debug(f"Filtered bot message: {msg['message_id']}")
-            continue
+def filter_noise_with_stats(
+    messages: List[dict]
+) -> Tuple[List[dict], Dict[str, dict]]:
+    """過濾垃圾訊息，並返回每條規則的過濾數和耗時
 
-        # 檢查2：斜線命令
-        if content.startswith('/'):
-            filtered_count += 1
-            logger.debug(f"Filtered command message: {msg['message_id']}")
-            continue
+    預設規則 (Config.NOISE_FILTER_RULES，依成本由低到高執行)：
+    - 空訊息
+    - 斜線命令（content 以 "/" 開頭）
+    - 機器人訊息（sender_name 包含 "Bot", "System"；每個發送者只比對一次）
+    - 僅包含表情符號的訊息
 
-        # 檢查3：空訊息
-        if not content or len(content) == 0:
-            filtered_count += 1
-            logger.debug(f"Filtered empty message: {msg['message_id']}")
-            continue
+    Args:
+        messages: 訊息列表
 
-        # 檢查4：僅表情符號 (簡單判斷：不包含中文字符、數字或英文)
-        if _is_emoji_only(content):
-            filtered_count += 1
-            logger.debug(f"Filtered emoji-only message: {msg['message_id']}")
-            continue
+    Returns:
+        (過濾後的訊息列表, {規則名稱: {"dropped": 3, "seconds": 0.0004}})
+    """
+    logger.info(f"Starting noise filtering for {len(messages)} messages")
 
-        result.append(msg)
+    result, rule_stats = get_noise_filter().apply(messages)
 
     logger.info(
-        f"Noise filtering complete: filtered {filtered_count}, "
+        f"Noise filtering complete: filtered {len(messages) - len(result)}, "
         f"{len(result)} remaining"
     )
-    return result
+    return result, rule_stats
+
+
+def iter_filter_noise(
+    messages: Iterable[dict],
+    rule_stats: Dict[str, dict]
+) -> Iterator[dict]:
+    """filter_noise 的串流版本 (每次以規則引擎處理一小批)
+
+    Args:
+        messages: 訊息迭代器
+        rule_stats: 累加每條規則的過濾數和耗時
+
+    Yields:
+        保留的訊息
+    """
+    return get_noise_filter().iter_apply(messages, rule_stats)
 
 
 def classify_messages(messages: List[dict]) -> List[dict]:
@@ -195,6 +262,96 @@ def classify_messages(messages: List[dict]) -> List[dict]:
     return messages
 
 
+def classify_and_score_messages(messages: List[dict]) -> List[dict]:
+    """分類訊息並計算重要性分數
+
+    結果同 classify_messages 之後逐則調用 calculate_importance，但每則
+    訊息只以關鍵詞自動機掃描一次，分類和評分共用比對結果。
+
+    Args:
+        messages: 訊息列表
+
+    Returns:
+        增加 "category" 和 "importance" 字段的訊息列表
+    """
+    logger.info(
+        f"Starting message classification and scoring for {len(messages)} messages"
+    )
+
+    automaton = get_keyword_automaton()
+    for msg in messages:
+        content = msg.get('content', '')
+        matches = automaton.match(content)
+        msg['category'] = _classify_single_message(content, matches)
+        msg['importance'] = calculate_importance(msg, matches)
+
+    logger.info("Message classification and scoring complete")
+    return messages
+
+
+def iter_classify_and_score(messages: Iterable[dict]) -> Iterator[dict]:
+    """classify_and_score_messages 的串流版本
+
+    Args:
+        messages: 訊息迭代器
+
+    Yields:
+        增加 "category" 和 "importance" 字段的訊息
+    """
+    automaton = get_keyword_automaton()
+    for msg in messages:
+        content = msg.get('content', '')
+        matches = automaton.match(content)
+        msg['category'] = _classify_single_message(content, matches)
+        msg['importance'] = calculate_importance(msg, matches)
+        yield msg
+
+
+def get_noise_filter() -> NoiseFilter:
+    """filter_noise 使用的雜訊過濾器 (第一次調用時依 Config.NOISE_FILTER_RULES 建立)
+
+    建立後保留在程序中，bot 規則的發送者記憶在多個群組之間共用。
+
+    Returns:
+        NoiseFilter
+
+    Raises:
+        ValueError: 設定了未知的規則或無法載入的插件
+    """
+    global _noise_filter
+
+    if _noise_filter is None:
+        _noise_filter = build_noise_filter(
+            Config.NOISE_FILTER_RULES,
+            get_keyword_automaton()
+        )
+        logger.info(
+            f"Noise filter rules: {[rule.name for rule in _noise_filter.rules]}"
+        )
+    return _noise_filter
+
+
+def get_keyword_automaton() -> KeywordAutomaton:
+    """分類、評分和雜訊過濾共用的關鍵詞自動機 (第一次調用時編譯)
+
+    包含 KEYWORD_CLASSES 的內建關鍵詞，以及 Config.KEYWORDS_FILE
+    (JSON {類別: [關鍵詞, ...]}) 中的關鍵詞。
+
+    Returns:
+        編譯後的 KeywordAutomaton
+    """
+    global _keyword_automaton
+
+    if _keyword_automaton is None:
+        _keyword_automaton = KeywordAutomaton(
+            merge_keyword_classes(KEYWORD_CLASSES, Config.KEYWORDS_FILE)
+        )
+        logger.info(
+            f"Compiled keyword automaton: {len(_keyword_automaton)} states"
+        )
+    return _keyword_automaton
+
+
 def extract_keywords(
     messages: List[dict],
     top_n: int = 10
@@ -202,7 +359,7 @@ def extract_keywords(
     """提取關鍵詞
 
     步驟：
-    1. 使用 jieba 進行中文分詞
+    1. 使用 jieba 進行中文分詞 (逐則訊息，不合併為一個大字符串)
     2. 去除停用詞
     3. 統計詞頻
     4. 返回出現最多的前 N 個詞
@@ -218,24 +375,10 @@ def extract_keywords(
         f"Extracting keywords from {len(messages)} messages (top {top_n})"
     )
 
-    # 合併所有訊息內容
-    all_content = ' '.join(
-        msg.get('content', '') for msg in messages
-    )
-
-    # 分詞
-    words = jieba.cut(all_content)
-
-    # 過濾停用詞和短詞
-    words = [
-        w.strip() for w in words
-        if w.strip() and
-        w not in STOPWORDS and
-        len(w) >= 2
-    ]
-
     # 統計詞頻
-    word_freq = Counter(words)
+    word_freq = Counter()
+    for msg in messages:
+        word_freq.update(_keyword_tokens(msg.get('content', '')))
 
     # 獲取前 N 個
     top_keywords = [word for word, _ in word_freq.most_common(top_n)]
@@ -244,7 +387,75 @@ def extract_keywords(
     return {"keywords": top_keywords}
 
 
-def calculate_importance(message: dict) -> float:
+def extract_message_and_group_keywords(
+    messages: List[dict],
+    top_n: int = 3,
+    group_top_n: int = 10
+) -> Tuple[List[List[str]], Dict[str, List[str]]]:
+    """一次分詞同時提取每則訊息和整個群組的關鍵詞
+
+    每則訊息只以 jieba 分詞一次：該則的詞頻取前 top_n 個作為訊息關鍵詞，
+    同時累加到群組詞頻。結果與分別調用 extract_keywords([msg], top_n) 和
+    extract_keywords(messages, group_top_n) 相同，但分詞成本減半。
+
+    Args:
+        messages: 訊息列表
+        top_n: 每則訊息的關鍵詞數量
+        group_top_n: 群組的關鍵詞數量
+
+    Returns:
+        (每則訊息的關鍵詞列表 (與 messages 順序相同), {"keywords": 群組關鍵詞})
+    """
+    logger.info(
+        f"Extracting keywords from {len(messages)} messages "
+        f"(top {top_n} per message, top {group_top_n} per group)"
+    )
+
+    group_freq = Counter()
+    message_keywords = []
+
+    for msg in messages:
+        word_freq = Counter(_keyword_tokens(msg.get('content', '')))
+        message_keywords.append(
+            [word for word, _ in word_freq.most_common(top_n)]
+        )
+        group_freq.update(word_freq)
+
+    group_keywords = [word for word, _ in group_freq.most_common(group_top_n)]
+
+    logger.info(f"Extracted {len(group_keywords)} group keywords")
+    return message_keywords, {"keywords": group_keywords}
+
+
+def iter_message_keywords(
+    messages: Iterable[dict],
+    group_freq: Counter,
+    top_n: int = 3
+) -> Iterator[dict]:
+    """extract_message_and_group_keywords 的串流版本
+
+    每則訊息分詞一次，設定該則的 "keywords"，並將詞頻累加到 group_freq
+    (群組關鍵詞為處理完後的 group_freq.most_common)。
+
+    Args:
+        messages: 訊息迭代器
+        group_freq: 群組詞頻 (原地累加)
+        top_n: 每則訊息的關鍵詞數量
+
+    Yields:
+        增加 "keywords" 字段的訊息
+    """
+    for msg in messages:
+        word_freq = Counter(_keyword_tokens(msg.get('content', '')))
+        msg['keywords'] = [word for word, _ in word_freq.most_common(top_n)]
+        group_freq.update(word_freq)
+        yield msg
+
+
+def calculate_importance(
+    message: dict,
+    matches: Optional[FrozenSet[str]] = None
+) -> float:
     """計算訊息重要性分數 (0-1)
 
     計算公式：
@@ -252,6 +463,7 @@ def calculate_importance(message: dict) -> float:
 
     Args:
         message: 訊息字典
+        matches: 訊息內容的關鍵詞類別 (預設以關鍵詞自動機比對)
 
     Returns:
         重要性分數 (0.0-1.0)
@@ -272,11 +484,10 @@ def calculate_importance(message: dict) -> float:
     length_weight = min(0.3, content_length / 100)
 
     # 詞頻權重 (基於是否包含重要關鍵詞)
-    content = message.get('content', '').lower()
+    if matches is None:
+        matches = get_keyword_automaton().match(message.get('content', ''))
     word_weight = 0.2
-    if any(kw in content for kw in ACTION_KEYWORDS):
-        word_weight = 0.3
-    if any(kw in content for kw in QUESTION_KEYWORDS):
+    if 'action' in matches or 'question' in matches:
         word_weight = 0.3
 
     # 合併計算
@@ -289,60 +500,32 @@ def calculate_importance(message: dict) -> float:
 
 # ============ Helper Functions ============
 
-def _is_emoji_only(text: str) -> bool:
-    """判斷文本是否僅包含表情符號
-
-    Args:
-        text: 文本字符串
-
-    Returns:
-        是否為純表情
-    """
-    # 移除常見的表情和特殊字符
-    text = text.strip()
-    if not text:
-        return True
-
-    # 移除常見表情符號範圍
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F300-\U0001F9FF"  # emoji
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F400-\U0001F5FF"  # symbols
-        "\U0001F680-\U0001F6FF"  # transport
-        "\U0001F1E0-\U0001F1FF"  # flags
-        "\U0001F900-\U0001F9FF"  # supplemental
-        "]+",
-        flags=re.UNICODE
-    )
-
-    text_without_emoji = emoji_pattern.sub('', text)
-    text_without_emoji = text_without_emoji.strip()
-
-    return len(text_without_emoji) == 0
-
-
-def _classify_single_message(content: str) -> str:
+def _classify_single_message(
+    content: str,
+    matches: Optional[FrozenSet[str]] = None
+) -> str:
     """分類單個訊息
 
     Args:
         content: 訊息內容
+        matches: 內容的關鍵詞類別 (預設以關鍵詞自動機比對)
 
     Returns:
         分類結果 (question, action, announcement, discussion, other)
     """
-    content_lower = content.lower()
+    if matches is None:
+        matches = get_keyword_automaton().match(content)
 
     # 檢查是否為公告
-    if any(marker in content for marker in ANNOUNCEMENT_MARKERS):
+    if 'announcement' in matches:
         return 'announcement'
 
     # 檢查是否為問題
-    if any(q_kw in content for q_kw in QUESTION_KEYWORDS):
+    if 'question' in matches:
         return 'question'
 
     # 檢查是否為行動
-    if any(a_kw in content for a_kw in ACTION_KEYWORDS):
+    if 'action' in matches:
         return 'action'
 
     # 檢查是否為討論（長訊息）
@@ -350,3 +533,13 @@ def _classify_single_message(content: str) -> str:
         return 'discussion'
 
     return 'other'
+
+
+def _keyword_tokens(content: str) -> List[str]:
+    """分詞並去除停用詞和短詞 (內部函數)"""
+    return [
+        w.strip() for w in tokenizer.cut(content)
+        if w.strip() and
+        w not in STOPWORDS and
+        len(w) >= 2
+    ]
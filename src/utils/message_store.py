@@ -0,0 +1,252 @@
+"""Append-only per-group, per-day message store fed by the webhook server"""
+
+import logging
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.utils.time_utils import get_timezone
+
+logger = logging.getLogger(__name__)
+
+
+class MessageStore:
+    """Webhook 訊息儲存 (JSON Lines，每群組每日一個檔案)
+
+    檔案位置: {base_dir}/{YYYY-MM-DD}/{group_id}.jsonl
+
+    寫入採用批次群組提交 (group commit)：所有請求先進入佇列，由單一寫入
+    任務一次取出佇列中累積的所有訊息，按檔案分組後每個檔案只寫入一次，
+    完成後才通知所有等待中的請求。突發流量時批次會自然變大。
+
+    讀取時略過沒有換行結尾的最後一行 (寫入中或寫入中斷) 和無法解析的行；
+    寫入前若檔案不是以換行結尾，先補上換行，中斷留下的半行不會與新訊息
+    黏在同一行。
+
+    檔案中訊息的順序是到達順序 (不是事件時間順序，例如重送的事件)，增量
+    讀取以檔案位置 (bytes) 為高水位，而不是訊息時間戳。
+    """
+
+    def __init__(
+        self,
+        base_dir: str,
+        timezone: str = "Asia/Taipei",
+        max_batch_size: int = 5000,
+        fsync: bool = False
+    ) -> None:
+        """初始化訊息儲存
+
+        Args:
+            base_dir: 儲存根目錄
+            timezone: 用於切分日期的時區
+            max_batch_size: 單次提交的最大訊息數
+            fsync: 每次提交後是否 fsync (較慢但較安全)
+        """
+        self.base_dir = Path(base_dir)
+        self.tz = get_timezone(timezone)
+        self.max_batch_size = max_batch_size
+        self.fsync = fsync
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+
+        # 提交統計
+        self.commits = 0
+        self.messages_written = 0
+
+    async def start(self) -> None:
+        """啟動背景寫入任務"""
+        if self._writer_task is None:
+            self._queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._writer_loop())
+            logger.info(f"MessageStore writer started: {self.base_dir}")
+
+    async def stop(self) -> None:
+        """寫完佇列中剩餘的訊息後停止寫入任務"""
+        if self._writer_task is not None:
+            await self._queue.put(None)
+            await self._writer_task
+            self._writer_task = None
+            self._queue = None
+            logger.info(
+                f"MessageStore writer stopped "
+                f"({self.commits} commits, {self.messages_written} messages)"
+            )
+
+    async def append_many(self, items: List[Tuple[str, dict]]) -> None:
+        """寫入多則訊息，等待提交完成後返回
+
+        Args:
+            items: [(group_id, message), ...]，message 需包含 timestamp_ms
+
+        Raises:
+            RuntimeError: 寫入任務尚未啟動時
+            Exception: 寫入失敗時
+        """
+        if not items:
+            return
+        if self._writer_task is None:
+            raise RuntimeError("MessageStore writer is not started")
+
+        records = [
+            (
+                self._path(group_id, self._date_of(message["timestamp_ms"])),
+                json.dumps(message, ensure_ascii=False)
+            )
+            for group_id, message in items
+        ]
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, done))
+        await done
+
+    def read_messages(
+        self,
+        group_id: str,
+        start_time_ms: int,
+        end_time_ms: int,
+        offsets: Optional[Dict[str, int]] = None
+    ) -> List[dict]:
+        """讀取時間範圍內的訊息 (依時間排序，以 message_id 去除重送)
+
+        寫入中或寫入中斷留下的不完整行和無法解析的行會略過並記錄，
+        不影響已提交的訊息。
+
+        Args:
+            group_id: 群組 ID
+            start_time_ms: 開始時間 (毫秒，包含)
+            end_time_ms: 結束時間 (毫秒，包含)
+            offsets: 若提供，{日期 (YYYY-MM-DD): 檔案位置}，只讀取各日檔案
+                在該位置之後到達的訊息，全部讀取成功後就地更新為讀到的
+                位置 (最後一個完整行之後)；檔案比記錄的位置短時從頭讀取
+
+        Returns:
+            訊息列表 (原始訊息格式，包含 timestamp_ms)
+        """
+        messages: Dict[str, tuple] = {}
+        read_to: Dict[str, int] = {}
+        day = self._date_of(start_time_ms)
+        last_day = self._date_of(end_time_ms)
+
+        while day <= last_day:
+            path = self._path(group_id, day)
+            if path.exists():
+                key = day.isoformat()
+                records, read_to[key] = _read_committed(
+                    path,
+                    (offsets or {}).get(key, 0)
+                )
+                for record in records:
+                    if start_time_ms <= record["timestamp_ms"] <= end_time_ms:
+                        messages[record["message_id"]] = record
+            day += timedelta(days=1)
+
+        if offsets is not None:
+            offsets.update(read_to)
+        return sorted(messages.values(), key=lambda m: m["timestamp_ms"])
+
+    async def _writer_loop(self) -> None:
+        """背景寫入任務：取出累積的請求並批次提交 (內部函數)"""
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            size = len(item[0])
+            while size < self.max_batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            try:
+                await asyncio.to_thread(self._commit, batch)
+                self.commits += 1
+                self.messages_written += size
+                for _, done in batch:
+                    if not done.done():
+                        done.set_result(None)
+            except Exception as e:
+                logger.error(f"MessageStore commit failed: {e}")
+                for _, done in batch:
+                    if not done.done():
+                        done.set_exception(e)
+
+    def _commit(self, batch: List[Tuple[list, asyncio.Future]]) -> None:
+        """將一批訊息按檔案分組寫入 (在執行緒中執行，內部函數)"""
+        by_path: Dict[Path, List[str]] = {}
+        for records, _ in batch:
+            for path, line in records:
+                by_path.setdefault(path, []).append(line)
+
+        for path, lines in by_path.items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                if not _ends_with_newline(path):
+                    lines.insert(0, "")
+                f.write("\n".join(lines) + "\n")
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def _date_of(self, timestamp_ms: int):
+        """毫秒時間戳在本地時區的日期 (內部函數)"""
+        return datetime.fromtimestamp(timestamp_ms / 1000, tz=self.tz).date()
+
+    def _path(self, group_id: str, day) -> Path:
+        """訊息檔案路徑 (內部函數)"""
+        return self.base_dir / day.isoformat() / f"{group_id}.jsonl"
+
+
+def _read_committed(path: Path, offset: int = 0) -> Tuple[List[dict], int]:
+    """讀取訊息檔案中從 offset 開始的完整記錄 (內部函數)
+
+    沒有換行結尾的最後一行 (寫入中或寫入中斷) 不讀取，下次從該行開頭繼續；
+    無法解析的行略過並記錄。
+
+    Args:
+        path: 訊息檔案路徑
+        offset: 開始讀取的位置 (bytes，需為行首)，超過檔案大小時從頭讀取
+
+    Returns:
+        (訊息記錄列表, 最後一個完整行之後的位置)
+    """
+    records = []
+    with open(path, "rb") as f:
+        if offset > f.seek(0, os.SEEK_END):
+            logger.warning(f"{path} is shorter than offset {offset}, rereading")
+            offset = 0
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                logger.info(
+                    f"Skipping unterminated last line at byte {offset} of "
+                    f"{path} (append in progress or interrupted)"
+                )
+                break
+            line_start, offset = offset, offset + len(line)
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                logger.warning(
+                    f"Skipping undecodable line at byte {line_start} of "
+                    f"{path}: {e}"
+                )
+    return records, offset
+
+
+def _ends_with_newline(path: Path) -> bool:
+    """檔案是否為空或以換行結尾 (內部函數)"""
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
@@ -0,0 +1,274 @@
+"""Near-duplicate detection for Agent 2 - MinHash LSH over character shingles"""
+
+import logging
+import random
+import re
+import zlib
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from src.utils.time_utils import MS_PER_MINUTE, message_timestamp_ms
+
+logger = logging.getLogger(__name__)
+
+# MinHash 簽名長度 (= LSH bands × rows)
+NUM_PERM = 32
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 固定種子，簽名在不同程序/不同次執行之間一致
+_rng = random.Random(20260216)
+_PERMUTATIONS = tuple(
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+)
+
+# 比對前移除空白、標點和符號 ("收到！" 與 "收到 " 視為相同)
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def shingles(text: str, size: int = 2) -> FrozenSet[str]:
+    """正規化後的字元 n-gram 集合
+
+    中文短訊息以 jieba 分詞後往往只剩一兩個詞，字元 bigram 對插入/刪除
+    幾個字的改寫較穩定，也不需要分詞的成本。
+
+    Args:
+        text: 訊息內容
+        size: n-gram 長度
+
+    Returns:
+        shingle 集合 (正規化後比 size 短時為整段文字，空文字為空集合)
+    """
+    normalized = _NON_WORD_RE.sub("", text.lower())
+    if len(normalized) <= size:
+        return frozenset((normalized,)) if normalized else frozenset()
+    return frozenset(
+        normalized[i:i + size] for i in range(len(normalized) - size + 1)
+    )
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """兩個 shingle 集合的 Jaccard 相似度"""
+    if not a or not b:
+        return 0.0
+    intersection = len(a & b)
+    return intersection / (len(a) + len(b) - intersection)
+
+
+def minhash_signature(shingle_set: FrozenSet[str]) -> Tuple[int, ...]:
+    """MinHash 簽名 (NUM_PERM 個值)
+
+    Args:
+        shingle_set: shingles() 的結果 (不可為空)
+
+    Returns:
+        每個置換下的最小雜湊值
+    """
+    return tuple(map(min, zip(*map(_permuted_hashes, shingle_set))))
+
+
+@lru_cache(maxsize=65536)
+def _permuted_hashes(shingle: str) -> Tuple[int, ...]:
+    """單一 shingle 在所有置換下的雜湊值 (聊天內容的 bigram 大量重複，快取)"""
+    h = zlib.crc32(shingle.encode("utf-8"))
+    return tuple(
+        ((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for a, b in _PERMUTATIONS
+    )
+
+
+def lsh_bands(threshold: float) -> int:
+    """依相似度門檻選擇 LSH band 數
+
+    每個 band 有 NUM_PERM / bands 個值；兩則訊息至少一個 band 完全相同
+    才成為候選。選擇讓 S 曲線的轉折點 (1/b)^(1/r) 明顯低於門檻的最少
+    band 數 (候選較少)，之後仍以精確的 Jaccard 驗證。
+
+    Args:
+        threshold: Jaccard 相似度門檻
+
+    Returns:
+        band 數 (NUM_PERM 的因數)
+    """
+    for bands in (4, 8, 16, 32):
+        rows = NUM_PERM // bands
+        if (1 / bands) ** (1 / rows) <= threshold - 0.15:
+            return bands
+    return NUM_PERM
+
+
+def collapse_near_duplicates(
+    messages: List[dict],
+    threshold: float = 0.8,
+    window_minutes: int = 60
+) -> Tuple[List[dict], int]:
+    """將近似重複的文字訊息合併為一則代表訊息
+
+    轉傳時加上前綴的公告、稍作修改的重貼、「收到」「+1 收到！」之類的
+    回覆會各自送進摘要 prompt。這裡依時間順序處理文字訊息：與某個群集
+    的代表訊息 (群集中最早的一則) Jaccard 相似度 >= threshold，且距離該
+    群集最近一次出現不超過 window_minutes 的訊息併入該群集。
+
+    候選群集以 MinHash LSH 索引查找 (每則訊息只比對少數候選，而不是與
+    窗口內所有訊息比較)，再以精確的 Jaccard 相似度確認。
+
+    Args:
+        messages: 訊息列表 (依時間排序，例如 remove_duplicates 的結果)
+        threshold: Jaccard 相似度門檻 (0-1)
+        window_minutes: 同一群集兩次出現之間的最大間隔 (分鐘)
+
+    Returns:
+        (訊息列表, 併入其他訊息的數量)
+        代表訊息保留在原位置，出現超過一次的加上 "repeat_count" (含自己)
+    """
+    logger.info(
+        f"Collapsing near-duplicates in {len(messages)} messages "
+        f"(threshold {threshold}, window {window_minutes} min)"
+    )
+
+    counts = Counter()
+    result = list(iter_collapse_near_duplicates(
+        messages, counts, threshold, window_minutes
+    ))
+    collapsed = counts['near_duplicates']
+
+    logger.info(
+        f"Near-duplicate collapsing complete: collapsed {collapsed}, "
+        f"{len(result)} remaining"
+    )
+    return result, collapsed
+
+
+def iter_collapse_near_duplicates(
+    messages: Iterable[dict],
+    counts: Counter,
+    threshold: float = 0.8,
+    window_minutes: int = 60,
+    max_pending: Optional[int] = None
+) -> Iterator[dict]:
+    """collapse_near_duplicates 的串流版本
+
+    代表訊息的 repeat_count 在群集過期 (超過 window_minutes 沒有再出現)
+    之前都可能增加，因此代表訊息及其後的訊息會暫留到群集過期才輸出
+    (保持原順序)。過期的群集從索引中移除，記憶體只與時間窗口內的訊息
+    有關，與總訊息數無關。
+
+    Args:
+        messages: 依時間排序的訊息迭代器
+        counts: 累加 counts['near_duplicates'] (併入其他訊息的數量)
+        threshold: Jaccard 相似度門檻 (0-1)
+        window_minutes: 同一群集兩次出現之間的最大間隔 (分鐘)
+        max_pending: 最多暫留的訊息數和索引中的群集數 (None = 不限制)；
+            超過時提前輸出最早的訊息 (其 repeat_count 為當時的次數)，並
+            從索引移除最久沒有出現的群集
+
+    Yields:
+        保留的訊息 (代表訊息出現超過一次時加上 "repeat_count")
+    """
+    bands = lsh_bands(threshold)
+    rows = NUM_PERM // bands
+    window_ms = window_minutes * MS_PER_MINUTE
+
+    # LSH 索引：(band, band 值) → 群集編號
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    # 群集編號 → [代表訊息, shingle 集合, 最近出現時間, 出現次數, LSH 鍵]
+    clusters: Dict[int, list] = {}
+    # (出現時間, 群集編號)，依時間順序，用於移除過期群集
+    expiry: deque = deque()
+    # 尚未輸出的訊息：(訊息, 群集編號 或 None)
+    pending: deque = deque()
+    next_cluster_id = 0
+
+    for msg in messages:
+        content = msg.get('content', '')
+        shingle_set = (
+            shingles(content)
+            if msg.get('message_type', 'text') == 'text' else frozenset()
+        )
+        if not shingle_set:
+            pending.append((msg, None))
+        else:
+            timestamp = message_timestamp_ms(msg)
+            _expire_clusters(
+                expiry, clusters, buckets, timestamp - window_ms, max_pending
+            )
+
+            signature = minhash_signature(shingle_set)
+            keys = [
+                (band, signature[band * rows:(band + 1) * rows])
+                for band in range(bands)
+            ]
+
+            match = None
+            seen = set()
+            for key in keys:
+                for cluster_id in buckets.get(key, ()):
+                    if cluster_id in seen:
+                        continue
+                    seen.add(cluster_id)
+                    if (
+                        jaccard(shingle_set, clusters[cluster_id][1]) >= threshold
+                        and (match is None or cluster_id < match)
+                    ):
+                        match = cluster_id
+
+            if match is not None:
+                cluster = clusters[match]
+                cluster[2] = timestamp
+                cluster[3] += 1
+                cluster[0]['repeat_count'] = cluster[3]
+                expiry.append((timestamp, match))
+                counts['near_duplicates'] += 1
+                logger.debug(
+                    f"Near-duplicate: {msg.get('message_id')} "
+                    f"(of {cluster[0].get('message_id')})"
+                )
+            else:
+                cluster_id = next_cluster_id
+                next_cluster_id += 1
+                clusters[cluster_id] = [msg, shingle_set, timestamp, 1, keys]
+                expiry.append((timestamp, cluster_id))
+                for key in keys:
+                    buckets.setdefault(key, []).append(cluster_id)
+                pending.append((msg, cluster_id))
+
+        # 輸出群集已過期 (或不屬於群集) 的訊息
+        while pending and (
+            pending[0][1] not in clusters
+            or (max_pending is not None and len(pending) > max_pending)
+        ):
+            yield pending.popleft()[0]
+
+    for msg, _ in pending:
+        yield msg
+
+
+def _expire_clusters(
+    expiry: deque,
+    clusters: Dict[int, list],
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]],
+    cutoff: int,
+    max_clusters: Optional[int] = None
+) -> None:
+    """移除最近出現時間早於 cutoff 的群集及其索引 (內部函數)
+
+    max_clusters 不為 None 時，另外移除最久沒有出現的群集，直到群集數
+    不超過 max_clusters。
+    """
+    while expiry and (
+        expiry[0][0] < cutoff
+        or (max_clusters is not None and len(clusters) > max_clusters)
+    ):
+        timestamp, cluster_id = expiry.popleft()
+        cluster = clusters.get(cluster_id)
+        # 之後又出現過的群集，在較新的 expiry 記錄處理
+        if cluster is None or cluster[2] != timestamp:
+            continue
+        del clusters[cluster_id]
+        for key in cluster[4]:
+            bucket = buckets[key]
+            bucket.remove(cluster_id)
+            if not bucket:
+                del buckets[key]
@@ -0,0 +1,241 @@
+"""Noise filter rule engine for Agent 2 - precompiled, cheapest-first rules with per-rule stats"""
+
+import logging
+import importlib
+import re
+import time
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from src.utils.keyword_matcher import KeywordAutomaton
+
+logger = logging.getLogger(__name__)
+
+# 規則函數：(訊息, 去除前後空白的內容) -> 是否為雜訊
+RuleCheck = Callable[[dict, str], bool]
+
+# 插件規則未指定 cost 時的成本 (排在內建規則之後)
+DEFAULT_PLUGIN_COST = 100
+
+# 常見表情符號範圍
+_EMOJI_RE = re.compile(
+    "["
+    "\U0001F300-\U0001F9FF"  # emoji
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F400-\U0001F5FF"  # symbols
+    "\U0001F680-\U0001F6FF"  # transport
+    "\U0001F1E0-\U0001F1FF"  # flags
+    "\U0001F900-\U0001F9FF"  # supplemental
+    "]+",
+    flags=re.UNICODE
+)
+
+
+class NoiseRule:
+    """一條雜訊規則
+
+    Attributes:
+        name: 規則名稱 (統計信息中的鍵)
+        check: (訊息, 去除前後空白的內容) -> 是否為雜訊
+        cost: 相對成本，成本低的規則先執行
+    """
+
+    __slots__ = ("name", "check", "cost")
+
+    def __init__(self, name: str, check: RuleCheck, cost: int = DEFAULT_PLUGIN_COST):
+        self.name = name
+        self.check = check
+        self.cost = cost
+
+    def __repr__(self) -> str:
+        return f"NoiseRule({self.name!r}, cost={self.cost})"
+
+
+class NoiseFilter:
+    """依成本由低到高執行雜訊規則，並統計每條規則的過濾數和耗時
+
+    規則逐條套用在整批訊息上：前面的規則過濾掉的訊息不再交給後面
+    (較貴) 的規則。一則訊息符合多條規則時只計入最先執行的規則。
+    """
+
+    __slots__ = ("rules",)
+
+    def __init__(self, rules: Iterable[NoiseRule]):
+        """
+        Args:
+            rules: 規則 (依 cost 穩定排序)
+        """
+        self.rules = sorted(rules, key=lambda rule: rule.cost)
+
+    def apply(self, messages: List[dict]) -> Tuple[List[dict], Dict[str, dict]]:
+        """過濾雜訊訊息
+
+        Args:
+            messages: 訊息列表
+
+        Returns:
+            (保留的訊息 (原順序), 規則統計)
+            規則統計: {規則名稱: {"dropped": 3, "seconds": 0.0004}}
+        """
+        candidates = [(msg, msg.get('content', '').strip()) for msg in messages]
+        rule_stats = {}
+
+        for rule in self.rules:
+            check = rule.check
+            started = time.perf_counter()
+            kept = [pair for pair in candidates if not check(*pair)]
+            elapsed = time.perf_counter() - started
+
+            dropped = len(candidates) - len(kept)
+            rule_stats[rule.name] = {
+                "dropped": dropped,
+                "seconds": round(elapsed, 6),
+            }
+            if dropped:
+                logger.debug(f"Rule {rule.name} filtered {dropped} messages")
+            candidates = kept
+
+        return [msg for msg, _ in candidates], rule_stats
+
+    def iter_apply(
+        self,
+        messages: Iterable[dict],
+        rule_stats: Dict[str, dict],
+        chunk_size: int = 1024
+    ) -> Iterator[dict]:
+        """串流版本的 apply：每次處理 chunk_size 則訊息
+
+        Args:
+            messages: 訊息迭代器
+            rule_stats: 累加每條規則的過濾數和耗時 (同 merge_rule_stats)
+            chunk_size: 每批訊息數
+
+        Yields:
+            保留的訊息 (原順序)
+        """
+        messages = iter(messages)
+        while True:
+            chunk = list(islice(messages, chunk_size))
+            if not chunk:
+                return
+            kept, chunk_stats = self.apply(chunk)
+            merge_rule_stats(rule_stats, chunk_stats)
+            yield from kept
+
+
+def merge_rule_stats(total: Dict[str, dict], rule_stats: Dict[str, dict]) -> None:
+    """將規則統計累加到 total
+
+    Args:
+        total: 累計的 {規則名稱: {"dropped": ..., "seconds": ...}} (原地更新)
+        rule_stats: 要加入的規則統計
+    """
+    for name, rule in rule_stats.items():
+        entry = total.setdefault(name, {"dropped": 0, "seconds": 0.0})
+        entry["dropped"] += rule["dropped"]
+        entry["seconds"] = round(entry["seconds"] + rule["seconds"], 6)
+
+
+def is_emoji_only(text: str) -> bool:
+    """判斷文本是否僅包含表情符號
+
+    Args:
+        text: 文本字符串
+
+    Returns:
+        是否為純表情 (空文本也視為純表情)
+    """
+    return not _EMOJI_RE.sub('', text).strip()
+
+
+def bot_sender_rule(automaton: KeywordAutomaton) -> NoiseRule:
+    """機器人訊息規則：sender_name 包含 "bot" 類別的關鍵詞
+
+    同一發送者的結果只比對一次 (依 sender_name 記憶)。
+
+    Args:
+        automaton: 含 "bot" 類別的關鍵詞自動機
+
+    Returns:
+        規則
+    """
+    memo: Dict[str, bool] = {}
+
+    def check(msg: dict, content: str) -> bool:
+        sender_name = msg.get('sender_name', '')
+        is_bot = memo.get(sender_name)
+        if is_bot is None:
+            is_bot = memo[sender_name] = 'bot' in automaton.match(sender_name)
+        return is_bot
+
+    return NoiseRule("bot", check, cost=2)
+
+
+def build_noise_filter(
+    rule_specs: Iterable[str],
+    automaton: KeywordAutomaton
+) -> NoiseFilter:
+    """依設定建立雜訊過濾器
+
+    內建規則：
+    - "empty": 空訊息
+    - "command": 斜線命令 (content 以 "/" 開頭)
+    - "bot": 機器人訊息 (sender_name 包含 Bot, System 等)
+    - "emoji_only": 僅包含表情符號的訊息
+
+    其他規則以 "package.module:name" 指定，name 為 NoiseRule 或函數
+    (msg, content) -> bool；函數可設定 cost 屬性 (預設 DEFAULT_PLUGIN_COST)。
+
+    Args:
+        rule_specs: 規則名稱或插件路徑
+        automaton: 關鍵詞自動機 (bot 規則使用)
+
+    Returns:
+        NoiseFilter
+
+    Raises:
+        ValueError: 未知的規則名稱或無法載入的插件
+    """
+    builtin = {
+        "empty": lambda: NoiseRule("empty", lambda msg, content: not content, cost=0),
+        "command": lambda: NoiseRule(
+            "command", lambda msg, content: content.startswith('/'), cost=1
+        ),
+        "bot": lambda: bot_sender_rule(automaton),
+        "emoji_only": lambda: NoiseRule(
+            "emoji_only", lambda msg, content: is_emoji_only(content), cost=3
+        ),
+    }
+
+    rules = []
+    for spec in rule_specs:
+        spec = spec.strip()
+        if not spec:
+            continue
+        if spec in builtin:
+            rules.append(builtin[spec]())
+        elif ":" in spec:
+            rules.append(_load_plugin_rule(spec))
+        else:
+            raise ValueError(f"Unknown noise filter rule: {spec}")
+
+    return NoiseFilter(rules)
+
+
+def _load_plugin_rule(spec: str) -> NoiseRule:
+    """載入 "package.module:name" 指定的規則 (內部函數)"""
+    module_name, _, attr = spec.partition(":")
+    try:
+        target = getattr(importlib.import_module(module_name), attr)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"Cannot load noise filter rule {spec}: {e}") from e
+
+    if isinstance(target, NoiseRule):
+        return target
+    if not callable(target):
+        raise ValueError(f"Noise filter rule {spec} is not callable")
+    return NoiseRule(
+        attr,
+        target,
+        cost=getattr(target, "cost", DEFAULT_PLUGIN_COST)
+    )
@@ -0,0 +1,213 @@
+"""Date-partitioned data layout - YYYY/MM/DD directories with a per-partition manifest"""
+
+import logging
+import hashlib
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 每個日期分區中記錄檔案大小和內容雜湊的清單
+MANIFEST_NAME = "manifest.json"
+
+# 計算雜湊時每次讀取的 bytes 數
+_HASH_CHUNK_SIZE = 1 << 20
+
+# 舊的平坦目錄中帶日期的檔名：{group_id}_{date}.json、stats_{date}.json、
+# index_{date}.html 等
+_DATED_NAME_RE = re.compile(r"_(\d{4}-\d{2}-\d{2})\.[A-Za-z]+$")
+
+
+def partition_path(base_dir: str, date: str) -> Path:
+    """日期在資料目錄中的分區目錄
+
+    Args:
+        base_dir: 資料目錄 (例如 data/raw_messages)
+        date: 日期字符串 (YYYY-MM-DD)
+
+    Returns:
+        base_dir/YYYY/MM/DD
+
+    Raises:
+        ValueError: 日期格式錯誤
+    """
+    parsed = datetime.strptime(date, "%Y-%m-%d")
+    return Path(base_dir) / f"{parsed:%Y}" / f"{parsed:%m}" / f"{parsed:%d}"
+
+
+def file_sha256(path: Path) -> str:
+    """計算檔案內容的 SHA-256 (分段讀取)
+
+    Args:
+        path: 檔案路徑
+
+    Returns:
+        十六進位雜湊字符串
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(partition: Path) -> Dict:
+    """讀取分區的 manifest
+
+    Args:
+        partition: 分區目錄
+
+    Returns:
+        {"files": {檔名: {"size", "mtime_ns", "sha256", ...}}}
+        不存在或損壞時 files 為空
+    """
+    manifest_file = Path(partition) / MANIFEST_NAME
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            files = json.load(f).get("files", {})
+    except FileNotFoundError:
+        return {"files": {}}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable manifest {manifest_file}: {e}")
+        return {"files": {}}
+    return {"files": files if isinstance(files, dict) else {}}
+
+
+def refresh_manifest(
+    partition: Path,
+    annotations: Optional[Dict[str, dict]] = None
+) -> Dict:
+    """掃描分區並更新 manifest
+
+    大小和修改時間 (ns) 與記錄相同的檔案沿用記錄 (包含附加欄位)，不重新
+    計算雜湊；其他檔案重新計算雜湊，內容改變時捨棄舊的附加欄位 (只是
+    重新寫入相同內容時保留)，已刪除的檔案從記錄中移除。暫存檔 (*.tmp)
+    和隱藏檔不列入。內容有變更時才寫回 (先寫暫存檔再改名)。
+
+    Args:
+        partition: 分區目錄 (不存在時返回空的 manifest)
+        annotations: {檔名: 附加欄位}，合併到該檔案的記錄，例如
+            {"C1_2026-02-17.json": {"source": "...", "source_sha256": "..."}}
+
+    Returns:
+        更新後的 manifest (格式同 load_manifest)
+    """
+    partition = Path(partition)
+    if not partition.is_dir():
+        return {"files": {}}
+
+    previous = load_manifest(partition)["files"]
+    files = {}
+    for path in sorted(partition.iterdir()):
+        name = path.name
+        if (
+            name == MANIFEST_NAME
+            or name.startswith(".")
+            or name.endswith(".tmp")
+            or not path.is_file()
+        ):
+            continue
+
+        stat = path.stat()
+        entry = previous.get(name)
+        if (
+            not entry
+            or entry.get("size") != stat.st_size
+            or entry.get("mtime_ns") != stat.st_mtime_ns
+        ):
+            sha256 = file_sha256(path)
+            entry = {
+                **(entry if entry and entry.get("sha256") == sha256 else {}),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": sha256,
+            }
+        files[name] = entry
+
+    for name, extra in (annotations or {}).items():
+        if name in files:
+            files[name] = {**files[name], **extra}
+
+    manifest = {"files": files}
+    if files != previous:
+        _write_manifest(partition, manifest)
+    return manifest
+
+
+def outputs_by_source(manifest: Dict) -> Dict[str, Tuple[str, dict]]:
+    """依來源檔名索引 manifest 中記錄了 source 的輸出檔案
+
+    Args:
+        manifest: 輸出分區的 manifest
+
+    Returns:
+        {來源檔名: (輸出檔名, 輸出檔案的記錄)}
+    """
+    return {
+        entry["source"]: (name, entry)
+        for name, entry in manifest["files"].items()
+        if "source" in entry
+    }
+
+
+def migrate_flat_layout(base_dirs: Iterable[str]) -> int:
+    """將舊的平坦目錄中帶日期的檔案移入日期分區
+
+    例如 data/raw_messages/C1_2026-02-17.json 移到
+    data/raw_messages/2026/02/17/C1_2026-02-17.json；分區中已有同名檔案時
+    保留分區中的檔案。移動後更新各分區的 manifest。
+
+    Args:
+        base_dirs: 資料目錄
+
+    Returns:
+        移動的檔案數
+    """
+    moved = 0
+    for base_dir in base_dirs:
+        base_path = Path(base_dir)
+        if not base_path.is_dir():
+            continue
+
+        partitions = set()
+        for path in sorted(base_path.iterdir()):
+            match = _DATED_NAME_RE.search(path.name)
+            if not match or not path.is_file():
+                continue
+            try:
+                partition = partition_path(base_dir, match.group(1))
+            except ValueError:
+                continue
+
+            target = partition / path.name
+            if target.exists():
+                logger.warning(f"Keeping {target}, not moving {path}")
+                continue
+            partition.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(path), str(target))
+            partitions.add(partition)
+            moved += 1
+
+        for partition in sorted(partitions):
+            refresh_manifest(partition)
+
+    logger.info(f"Moved {moved} files into date partitions")
+    return moved
+
+
+def _write_manifest(partition: Path, manifest: Dict) -> None:
+    """先寫入暫存檔再替換 manifest (內部函數)"""
+    manifest_file = partition / MANIFEST_NAME
+    temp_file = partition / f".{MANIFEST_NAME}.{os.getpid()}"
+    try:
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(temp_file, manifest_file)
+    except BaseException:
+        temp_file.unlink(missing_ok=True)
+        raise
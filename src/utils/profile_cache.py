@@ -0,0 +1,330 @@
+"""Persistent member profile cache for the LINE crawler"""
+
+import functools
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# SQLite 單一語句的參數數量上限 (保守值)
+_SQLITE_MAX_PARAMS = 900
+
+
+def _locked(method):
+    """以快取的鎖串行化資料庫操作 (內部函數)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ProfileCache:
+    """成員顯示名稱的磁碟快取 (SQLite)
+
+    以 (group_id, user_id) 為鍵保存顯示名稱，支持：
+    - TTL 過期
+    - 超過 max_entries 時淘汰最舊的資料
+    - 群組成員數記錄，用於判斷群組成員是否變動
+    - 群組摘要 (名稱、圖片網址)，過期後仍保留供背景刷新前使用
+
+    資料庫操作會 commit (可能 fsync)，async 調用者應以 asyncio.to_thread
+    在執行緒中調用；同一連線可跨執行緒使用，操作以鎖串行化。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl_seconds: int = 86400,
+        max_entries: int = 200000
+    ) -> None:
+        """初始化快取
+
+        Args:
+            db_path: SQLite 檔案路徑 (":memory:" 代表記憶體資料庫)
+            ttl_seconds: 快取有效時間 (秒)
+            max_entries: 最多保存的 (group_id, user_id) 筆數
+
+        Raises:
+            ValueError: 參數不合法時
+        """
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        # 延遲到第一次使用時才開啟資料庫
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """開啟資料庫並建立資料表 (內部函數)"""
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+            self._conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS profiles (
+                    group_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    display_name TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (group_id, user_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_profiles_user
+                    ON profiles (user_id, fetched_at);
+                CREATE INDEX IF NOT EXISTS idx_profiles_fetched
+                    ON profiles (fetched_at);
+                CREATE TABLE IF NOT EXISTS groups (
+                    group_id TEXT PRIMARY KEY,
+                    member_count INTEGER NOT NULL,
+                    checked_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS group_summaries (
+                    group_id TEXT PRIMARY KEY,
+                    group_name TEXT NOT NULL,
+                    picture_url TEXT,
+                    member_count INTEGER,
+                    fetched_at REAL NOT NULL
+                );
+                """
+            )
+            logger.info(f"Profile cache opened: {self.db_path}")
+        return self._conn
+
+    @_locked
+    def close(self) -> None:
+        """關閉資料庫連線"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @_locked
+    def lookup(
+        self,
+        group_id: str,
+        user_ids: Iterable[str]
+    ) -> Dict[str, str]:
+        """批量查詢未過期的顯示名稱
+
+        優先使用同一群組的資料；若沒有，則沿用該使用者在其他群組中
+        未過期的顯示名稱 (同一使用者在多個群組只需抓取一次)，並以原本的
+        抓取時間記錄到本群組。
+
+        Args:
+            group_id: 群組 ID
+            user_ids: 要查詢的 user_id 列表
+
+        Returns:
+            {user_id: display_name}，只包含命中的使用者
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+
+        conn = self._connect()
+        cutoff = time.time() - self.ttl_seconds
+        best: Dict[str, tuple] = {}
+
+        for i in range(0, len(user_ids), _SQLITE_MAX_PARAMS):
+            chunk = user_ids[i:i + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            # 依 (是否同群組, 抓取時間) 排序，最後一筆即為最佳結果
+            rows = conn.execute(
+                f"""
+                SELECT user_id, group_id, display_name, fetched_at
+                FROM profiles
+                WHERE user_id IN ({placeholders}) AND fetched_at >= ?
+                ORDER BY (group_id = ?), fetched_at
+                """,
+                (*chunk, cutoff, group_id)
+            ).fetchall()
+            for user_id, row_group_id, display_name, fetched_at in rows:
+                best[user_id] = (row_group_id, display_name, fetched_at)
+
+        # 其他群組的命中也記錄到本群組 (保留原抓取時間，不延長 TTL)
+        borrowed = [
+            (group_id, user_id, display_name, fetched_at)
+            for user_id, (row_group_id, display_name, fetched_at)
+            in best.items()
+            if row_group_id != group_id
+        ]
+        if borrowed:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO profiles "
+                    "(group_id, user_id, display_name, fetched_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    borrowed
+                )
+
+        return {
+            user_id: display_name
+            for user_id, (_, display_name, _) in best.items()
+        }
+
+    @_locked
+    def get_group_members(self, group_id: str) -> Dict[str, str]:
+        """取得群組內所有未過期的快取成員
+
+        Args:
+            group_id: 群組 ID
+
+        Returns:
+            {user_id: display_name}
+        """
+        conn = self._connect()
+        cutoff = time.time() - self.ttl_seconds
+        rows = conn.execute(
+            "SELECT user_id, display_name FROM profiles "
+            "WHERE group_id = ? AND fetched_at >= ?",
+            (group_id, cutoff)
+        ).fetchall()
+        return dict(rows)
+
+    @_locked
+    def put_many(self, group_id: str, names: Dict[str, str]) -> None:
+        """寫入顯示名稱並淘汰超出上限的舊資料
+
+        Args:
+            group_id: 群組 ID
+            names: {user_id: display_name}
+        """
+        if not names:
+            return
+
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO profiles "
+                "(group_id, user_id, display_name, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (group_id, user_id, name, now)
+                    for user_id, name in names.items()
+                ]
+            )
+            self._evict(conn)
+
+    @_locked
+    def get_member_count(self, group_id: str) -> Optional[int]:
+        """取得上次記錄的群組成員數 (過期則視為未知)
+
+        Args:
+            group_id: 群組 ID
+
+        Returns:
+            成員數，未知時為 None
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT member_count, checked_at FROM groups WHERE group_id = ?",
+            (group_id,)
+        ).fetchone()
+        if row is None or row[1] < time.time() - self.ttl_seconds:
+            return None
+        return row[0]
+
+    @_locked
+    def set_member_count(self, group_id: str, member_count: int) -> None:
+        """記錄群組成員數
+
+        Args:
+            group_id: 群組 ID
+            member_count: 成員數
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO groups "
+                "(group_id, member_count, checked_at) VALUES (?, ?, ?)",
+                (group_id, member_count, time.time())
+            )
+
+    @_locked
+    def get_group_summary(self, group_id: str) -> Optional[Dict]:
+        """取得已保存的群組摘要 (不論是否過期)
+
+        Args:
+            group_id: 群組 ID
+
+        Returns:
+            {"group_name", "picture_url", "member_count", "fetched_at"}，
+            沒有記錄時為 None
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT group_name, picture_url, member_count, fetched_at "
+            "FROM group_summaries WHERE group_id = ?",
+            (group_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "group_name": row[0],
+            "picture_url": row[1],
+            "member_count": row[2],
+            "fetched_at": row[3],
+        }
+
+    @_locked
+    def put_group_summary(self, group_id: str, summary: Dict) -> None:
+        """保存群組摘要，有成員數時同時更新成員數記錄
+
+        Args:
+            group_id: 群組 ID
+            summary: {"group_name", "picture_url", "member_count"}
+        """
+        conn = self._connect()
+        now = time.time()
+        member_count = summary.get("member_count")
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO group_summaries "
+                "(group_id, group_name, picture_url, member_count, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    group_id,
+                    summary["group_name"],
+                    summary.get("picture_url"),
+                    member_count,
+                    now,
+                )
+            )
+            if member_count is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO groups "
+                    "(group_id, member_count, checked_at) VALUES (?, ?, ?)",
+                    (group_id, member_count, now)
+                )
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """刪除過期資料，並在超出上限時淘汰最舊的資料 (內部函數)"""
+        conn.execute(
+            "DELETE FROM profiles WHERE fetched_at < ?",
+            (time.time() - self.ttl_seconds,)
+        )
+        (count,) = conn.execute("SELECT COUNT(*) FROM profiles").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM profiles WHERE rowid IN ("
+                "SELECT rowid FROM profiles ORDER BY fetched_at LIMIT ?)",
+                (overflow,)
+            )
+            logger.debug(f"Evicted {overflow} cached profiles")
@@ -0,0 +1,252 @@
+"""Process-wide adaptive rate limiter for LINE Messaging API traffic"""
+
+import logging
+import asyncio
+import inspect
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from linebot.v3.messaging.exceptions import ApiException
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# 端點類別 → 每秒請求上限 (LINE Messaging API 公布的配額)
+DEFAULT_RATES: Dict[str, float] = {
+    "members": 2000.0,    # 群組成員 ID、成員數、群組資訊
+    "profile": 2000.0,    # 群組成員資料
+    "content": 2000.0,    # 訊息內容 (附件)
+    "push": 2000.0,       # 推送訊息
+    "multicast": 200.0,   # 群發訊息
+}
+
+# 429 回應沒有 Retry-After 時的預設等待秒數
+DEFAULT_RETRY_AFTER = 1.0
+
+# 每個端點類別保留的最近延遲樣本數 (用於 p50/p99)
+LATENCY_SAMPLES = 10000
+
+
+class TokenBucket:
+    """單一端點類別的令牌桶 (以 GCRA 虛擬排程實作，不需要鎖)
+
+    收到 429 時暫停至 Retry-After 並將速率減半；之後每次成功請求逐步
+    恢復，直到回到設定的上限 (AIMD)。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        min_rate: Optional[float] = None
+    ) -> None:
+        """初始化令牌桶
+
+        Args:
+            rate: 每秒請求上限
+            capacity: 允許的突發請求數 (預設等於 rate)
+            min_rate: 降速下限 (預設為 rate 的 5%)
+
+        Raises:
+            ValueError: rate 不是正數時
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(1.0, capacity if capacity is not None else rate)
+        self.min_rate = min_rate if min_rate is not None else rate * 0.05
+
+        self._tat = 0.0            # 理論到達時間 (theoretical arrival time)
+        self._blocked_until = 0.0  # Retry-After 到期時間
+        self._started: Optional[float] = None
+
+        # 計數器
+        self.requests = 0
+        self.throttled = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    async def acquire(self) -> float:
+        """取得一個令牌，必要時等待
+
+        Returns:
+            實際等待秒數
+        """
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+
+        interval = 1.0 / self.rate
+        tau = (self.capacity - 1) * interval
+        slot = max(now, self._tat - tau, self._blocked_until)
+        self._tat = max(self._tat, slot) + interval
+        self.requests += 1
+
+        wait = slot - now
+        if wait > 0:
+            self.waits += 1
+            self.wait_seconds += wait
+            await asyncio.sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        """請求成功：逐步恢復速率"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.01)
+
+    def record_latency(self, seconds: float) -> None:
+        """記錄一次成功請求的延遲 (含排隊等待與 429 重試)"""
+        self.latencies.append(seconds)
+
+    def on_throttled(self, retry_after: float) -> None:
+        """收到 429：暫停 retry_after 秒並將速率減半
+
+        Args:
+            retry_after: 伺服器要求的等待秒數
+        """
+        now = time.monotonic()
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._blocked_until = max(self._blocked_until, now + retry_after)
+        self._tat = max(self._tat, self._blocked_until)
+
+    def stats(self) -> Dict[str, float]:
+        """目前的速率、吞吐量和等待統計"""
+        elapsed = (
+            time.monotonic() - self._started if self._started else 0.0
+        )
+        latencies = sorted(self.latencies)
+        return {
+            "rate_limit": round(self.rate, 2),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "throughput": (
+                round(self.requests / elapsed, 2) if elapsed > 0 else 0.0
+            ),
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        }
+
+
+class RateLimiter:
+    """LINE API 速率限制器 (每個端點類別一個令牌桶)
+
+    LineHandler 和 LineSender 共用同一個實例 (見 get_rate_limiter)。
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None) -> None:
+        """初始化速率限制器
+
+        Args:
+            rates: 端點類別 → 每秒請求上限 (未列出的類別使用 DEFAULT_RATES)
+        """
+        self.rates = {**DEFAULT_RATES, **(rates or {})}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, endpoint_class: str) -> TokenBucket:
+        """取得端點類別的令牌桶 (不存在時建立)"""
+        if endpoint_class not in self._buckets:
+            rate = self.rates.get(endpoint_class, self.rates["members"])
+            self._buckets[endpoint_class] = TokenBucket(rate)
+        return self._buckets[endpoint_class]
+
+    async def call(
+        self,
+        endpoint_class: str,
+        func: Callable,
+        *args,
+        max_retries: int = 3,
+        **kwargs
+    ) -> Any:
+        """在速率限制下調用 API，遇到 429 依 Retry-After 等待後重試
+
+        Args:
+            endpoint_class: 端點類別 (members, profile, push, ...)
+            func: API 函數 (同步或非同步皆可)
+            max_retries: 429 時的最大重試次數
+
+        Returns:
+            API 回應
+
+        Raises:
+            ApiException: 非 429 錯誤，或重試次數用盡時
+        """
+        bucket = self.bucket(endpoint_class)
+        started = time.perf_counter()
+
+        for attempt in range(max_retries + 1):
+            await bucket.acquire()
+            try:
+                result = func(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+            except ApiException as e:
+                if e.status != 429 or attempt >= max_retries:
+                    raise
+
+                retry_after = _parse_retry_after(e)
+                bucket.on_throttled(retry_after)
+                logger.warning(
+                    f"Rate limited on {endpoint_class}, retrying after "
+                    f"{retry_after:.1f}s (limit now {bucket.rate:.0f}/s)"
+                )
+                continue
+
+            bucket.on_success()
+            bucket.record_latency(time.perf_counter() - started)
+            return result
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """所有端點類別的統計"""
+        return {
+            endpoint_class: bucket.stats()
+            for endpoint_class, bucket in self._buckets.items()
+        }
+
+
+def _parse_retry_after(error: ApiException) -> float:
+    """從 429 回應讀取 Retry-After 秒數 (內部函數)"""
+    headers = getattr(error, "headers", None) or {}
+    value = headers.get("Retry-After")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    """已排序樣本的百分位數 (nearest-rank，無樣本時為 0，內部函數)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """取得全域共用的速率限制器"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter({
+            "members": Config.LINE_API_RATE_LIMIT,
+            "profile": Config.LINE_API_RATE_LIMIT,
+            "content": Config.LINE_API_RATE_LIMIT,
+            "push": Config.LINE_API_RATE_LIMIT,
+            "multicast": Config.LINE_MULTICAST_RATE_LIMIT,
+        })
+    return _rate_limiter
+
+
+def reset_rate_limiter() -> None:
+    """丟棄全域速率限制器，下次取得時依 Config 重新建立 (benchmark 用)"""
+    global _rate_limiter
+    _rate_limiter = None
@@ -0,0 +1,187 @@
+"""Reading and writing raw message files (JSON and streaming JSON Lines)"""
+
+import logging
+import json
+import os
+from typing import Dict, Iterable, Iterator, Tuple
+from pathlib import Path
+
+from src.models import MessageBatch
+from src.utils.partitions import MANIFEST_NAME
+
+logger = logging.getLogger(__name__)
+
+# 支持的原始訊息檔案格式
+RAW_FILE_SUFFIXES = (".json", ".jsonl")
+
+# JSON Lines 檔案第一行 (header) 的類型標記
+HEADER_TYPE = "header"
+
+
+def list_raw_files(raw_dir: Path) -> list:
+    """列出目錄中所有原始訊息檔案 (.json 和 .jsonl，不含 manifest)
+
+    Args:
+        raw_dir: 原始訊息目錄 (通常為某一天的分區)
+
+    Returns:
+        檔案路徑列表 (依檔名排序)
+    """
+    return sorted(
+        f for f in raw_dir.iterdir()
+        if f.is_file()
+        and f.suffix in RAW_FILE_SUFFIXES
+        and f.name != MANIFEST_NAME
+    )
+
+
+def write_jsonl(
+    path: Path,
+    header: Dict,
+    messages: Iterable[dict]
+) -> int:
+    """以 JSON Lines 格式逐筆寫入訊息
+
+    第一行為群組 header ({"type": "header", "group_id": ..., ...})，之後
+    每行一則訊息。先寫入暫存檔再改名，中斷時不會留下不完整的檔案。
+
+    Args:
+        path: 輸出檔案路徑 (.jsonl)
+        header: 群組 metadata (group_id, group_name, date, ...)
+        messages: 訊息迭代器 (可為 generator，不需一次載入記憶體)
+
+    Returns:
+        寫入的訊息數
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    count = 0
+
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(
+                {"type": HEADER_TYPE, **header},
+                ensure_ascii=False
+            ) + "\n")
+            for msg in messages:
+                f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+                count += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return count
+
+
+def read_raw_header(path: Path) -> Dict:
+    """讀取原始訊息檔案的群組 metadata (不含 messages)
+
+    JSON Lines 只讀第一行；JSON 檔案需要完整解析。
+
+    Args:
+        path: 原始訊息檔案路徑
+
+    Returns:
+        metadata 字典
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            header = json.loads(f.readline() or "{}")
+            header.pop("type", None)
+            return header
+
+        data = json.load(f)
+    data.pop("messages", None)
+    return data
+
+
+def iter_raw_messages(path: Path) -> Iterator[dict]:
+    """逐筆讀取原始訊息檔案中的訊息
+
+    JSON Lines 檔案逐行解析，記憶體用量與檔案大小無關。
+
+    Args:
+        path: 原始訊息檔案路徑
+
+    Yields:
+        訊息字典
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix != ".jsonl":
+            yield from json.load(f).get("messages", [])
+            return
+
+        f.readline()  # 跳過 header
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def open_raw_stream(path: Path) -> Tuple[Dict, Iterator[dict]]:
+    """讀取 metadata，並返回逐筆讀取訊息的迭代器
+
+    JSON Lines 檔案只解析 header 行，訊息在迭代時才逐行讀取；JSON 檔案
+    只能完整解析一次 (不會像 read_raw_header + iter_raw_messages 解析兩次)。
+
+    Args:
+        path: 原始訊息檔案路徑
+
+    Returns:
+        (metadata (不含 messages、total_messages), 訊息迭代器)
+    """
+    if path.suffix == ".jsonl":
+        return read_raw_header(path), iter_raw_messages(path)
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    messages = data.pop("messages", [])
+    data.pop("total_messages", None)
+    return data, iter(messages)
+
+
+def load_raw_file(path: Path) -> Dict:
+    """讀取原始訊息檔案為 Agent 1 的 JSON 結構
+
+    Args:
+        path: 原始訊息檔案路徑 (.json 或 .jsonl)
+
+    Returns:
+        {"group_id", "group_name", "date", "total_messages", "messages", ...}
+    """
+    if path.suffix != ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    data = read_raw_header(path)
+    data["messages"] = list(iter_raw_messages(path))
+    data["total_messages"] = len(data["messages"])
+    return data
+
+
+def load_raw_batch(
+    path: Path,
+    timezone: str = "Asia/Taipei"
+) -> Tuple[Dict, MessageBatch]:
+    """讀取原始訊息檔案為 metadata 和欄位式訊息批次
+
+    JSON Lines 檔案逐行解析後直接寫入 MessageBatch，不會同時保留所有
+    訊息字典。
+
+    Args:
+        path: 原始訊息檔案路徑 (.json 或 .jsonl)
+        timezone: MessageBatch 產生時間字串使用的時區
+
+    Returns:
+        (metadata, MessageBatch)
+    """
+    if path.suffix != ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        messages = data.pop("messages", [])
+        data.pop("total_messages", None)
+        return data, MessageBatch.from_dicts(messages, timezone)
+
+    return (
+        read_raw_header(path),
+        MessageBatch.from_dicts(iter_raw_messages(path), timezone),
+    )
@@ -2,7 +2,7 @@
 
 import logging
 import asyncio
-from typing import Dict
+from typing import Dict, Optional
 from pathlib import Path
 from linebot.v3.messaging import (
     ApiClient, Configuration, MessagingApi,
@@ -10,6 +10,10 @@ from linebot.v3.messaging import (
 )
 from linebot.v3.messaging.exceptions import ApiException
 
+from src.config import Config
+from src.utils.partitions import refresh_manifest
+from src.utils.rate_limiter import RateLimiter, get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,11 +23,18 @@ class LineSender:
     負責將摘要發送到 LINE 私聊
     """
 
-    def __init__(self, channel_access_token: str) -> None:
+    def __init__(
+        self,
+        channel_access_token: str,
+        rate_limiter: Optional[RateLimiter] = None,
+        api_base_url: Optional[str] = None
+    ) -> None:
         """初始化 LINE 發送器
 
         Args:
             channel_access_token: LINE Channel Access Token
+            rate_limiter: 速率限制器 (預設使用全域共用實例)
+            api_base_url: LINE API 網址 (預設 Config.LINE_API_BASE_URL)
 
         Raises:
             ValueError: 如果 token 為空
@@ -31,9 +42,13 @@ class LineSender:
         if not channel_access_token:
             raise ValueError("Channel access token cannot be empty")
 
-        configuration = Configuration(access_token=channel_access_token)
+        configuration = Configuration(
+            host=api_base_url or Config.LINE_API_BASE_URL or None,
+            access_token=channel_access_token
+        )
         self.api_client = ApiClient(configuration)
         self.messaging_api = MessagingApi(self.api_client)
+        self.rate_limiter = rate_limiter or get_rate_limiter()
         logger.info("LineSender initialized")
 
     async def send_summary(
@@ -54,7 +69,8 @@ class LineSender:
 
         Note:
             - 檔案不存在時記錄警告
-            - API 失敗時重試（指數退避）
+            - 速率由共用的速率限制器控制，429 依 Retry-After 重試
+            - 伺服器錯誤 (5xx) 時重試（指數退避）
         """
         logger.info(f"Sending summary to {user_id}: {summary_file}")
 
@@ -84,7 +100,13 @@ class LineSender:
                     to=user_id,
                     messages=[text_message]
                 )
-                self.messaging_api.push_message(push_request)
+                await self.rate_limiter.call(
+                    "push",
+                    asyncio.to_thread,
+                    self.messaging_api.push_message,
+                    push_request,
+                    max_retries=max_retries
+                )
 
                 logger.info(
                     f"Summary sent successfully to {user_id}"
@@ -96,6 +118,10 @@ class LineSender:
                     f"API error on attempt {attempt + 1}/{max_retries}: {e}"
                 )
 
+                if e.status is not None and e.status < 500:
+                    logger.error(f"Failed to send summary: {e}")
+                    return False
+
                 if attempt < max_retries - 1:
                     wait_time = 2 ** attempt  # 指數退避: 1, 2, 4 秒
                     logger.info(f"Retrying after {wait_time} seconds...")
@@ -114,16 +140,24 @@ class LineSender:
     async def send_batch_summaries(
         self,
         user_id: str,
-        summary_dir: str
+        summary_dir: str,
+        date: Optional[str] = None,
+        force: bool = False
     ) -> Dict[str, bool]:
         """批量發送所有摘要到 LINE 私聊
 
+        發送成功的摘要在目錄的 manifest 記錄為 sent_sha256，內容未變更的
+        摘要不會重複發送 (重新執行同一天時只發送新生成或更新的摘要)。
+
         Args:
             user_id: LINE 使用者 ID
-            summary_dir: 摘要目錄路徑
+            summary_dir: 摘要目錄路徑 (output/summaries/YYYY/MM/DD)
+            date: 只發送該日期 (YYYY-MM-DD) 的摘要，預設發送目錄中所有摘要
+            force: 忽略 manifest，重新發送所有摘要
 
         Returns:
-            {"file.md": True/False, ...} - 每個檔案的發送結果
+            {"file.md": True/False, ...} - 每個嘗試發送的檔案的發送結果
+            (略過的檔案不列入)
         """
         logger.info(f"Batch sending summaries from {summary_dir}")
 
@@ -136,12 +170,28 @@ class LineSender:
         summary_files = [
             f for f in summary_path.glob('*.md')
             if not f.name.startswith('stats_')
+            and (not date or f.stem.endswith(f"_{date}"))
         ]
 
         if not summary_files:
             logger.warning(f"No summary files found in {summary_dir}")
             return {}
 
+        manifest = refresh_manifest(summary_path)
+        if not force:
+            unsent = [
+                f for f in summary_files
+                if f.name not in manifest["files"]
+                or manifest["files"][f.name].get("sent_sha256")
+                != manifest["files"][f.name]["sha256"]
+            ]
+            if len(unsent) < len(summary_files):
+                logger.info(
+                    f"Skipping {len(summary_files) - len(unsent)} "
+                    f"summaries already sent"
+                )
+            summary_files = unsent
+
         results = {}
 
         for summary_file in summary_files:
@@ -149,13 +199,17 @@ class LineSender:
                 success = await self.send_summary(user_id, str(summary_file))
                 results[summary_file.name] = success
 
-                # 添加短暫延遲避免速率限制
-                await asyncio.sleep(0.5)
-
             except Exception as e:
                 logger.error(f"Error sending {summary_file.name}: {e}")
                 results[summary_file.name] = False
 
+        # 記錄已發送的內容雜湊
+        refresh_manifest(summary_path, {
+            name: {"sent_sha256": manifest["files"][name]["sha256"]}
+            for name, success in results.items()
+            if success and name in manifest["files"]
+        })
+
         success_count = sum(1 for v in results.values() if v)
         total_count = len(results)
         logger.info(
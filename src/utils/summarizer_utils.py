@@ -2,6 +2,7 @@
 
 import logging
 import asyncio
+import html
 from typing import Dict, List
 import anthropic
 
@@ -117,13 +118,17 @@ def _format_messages_for_prompt(messages: List[dict]) -> str:
         content = msg.get('content', '')
         category = msg.get('category', 'other')
         importance = msg.get('importance', 0)
+        repeat_count = msg.get('repeat_count', 1)
 
         # 只顯示重要訊息
         if len(content) > 100:
             content = content[:100] + "..."
 
+        # 近似重複的訊息只列一次，標示出現次數
+        repeats = f" ×{repeat_count}" if repeat_count > 1 else ""
+
         formatted.append(
-            f"- [{category.upper()}] {sender}: {content} (重要度: {importance})"
+            f"- [{category.upper()}] {sender}: {content}{repeats} (重要度: {importance})"
         )
 
     return '\n'.join(formatted[:20])  # 最多 20 條訊息
@@ -158,7 +163,9 @@ async def call_claude_api(
         try:
             logger.debug(f"API call attempt {attempt + 1}/{max_retries}")
 
-            message = client.messages.create(
+            # 同步 SDK 在執行緒中調用，避免並發摘要互相阻塞事件循環
+            message = await asyncio.to_thread(
+                client.messages.create,
                 model=model,
                 max_tokens=1024,
                 messages=[
@@ -286,6 +293,7 @@ def generate_index_html(
             {
                 "group_id": {
                     "group_name": "...",
+                    "picture_url": "..." (可選),
                     "file_path": "...",
                     "message_count": ...
                 }
@@ -293,19 +301,30 @@ def generate_index_html(
 
     Returns:
         完整的 HTML 字符串
+
+    Note:
+        群組名稱由群組成員設定、圖片網址來自 API，輸出前皆經過 HTML 轉義；
+        圖片只接受 https:// 網址
     """
     cards = []
 
     for group_id, data in summaries.items():
-        group_name = data.get('group_name', 'Unknown')
+        group_name = html.escape(data.get('group_name', 'Unknown'))
         file_path = data.get('file_path', '')
         message_count = data.get('message_count', 0)
+        picture_url = data.get('picture_url') or ''
 
         # 生成文件路徑（相對路徑）
-        file_name = file_path.split('/')[-1]  # 只取檔案名
+        file_name = html.escape(file_path.split('/')[-1])  # 只取檔案名
+
+        picture = (
+            f'<img src="{html.escape(picture_url, quote=True)}" alt="" '
+            f'class="group-picture">'
+            if picture_url.startswith('https://') else ''
+        )
 
         card = f"""        <div class="summary-card">
-            <h2>{group_name}</h2>
+            {picture}<h2>{group_name}</h2>
             <p>{message_count} 條訊息</p>
             <a href="{file_name}" class="btn">查看摘要</a>
         </div>"""
@@ -314,7 +333,7 @@ def generate_index_html(
 
     cards_html = '\n'.join(cards)
 
-    html = f"""<!DOCTYPE html>
+    page = f"""<!DOCTYPE html>
 <html lang="zh-TW">
 <head>
     <meta charset="UTF-8">
@@ -380,6 +399,14 @@ def generate_index_html(
             font-size: 1.5em;
         }}
 
+        .group-picture {{
+            width: 48px;
+            height: 48px;
+            border-radius: 50%;
+            object-fit: cover;
+            margin-bottom: 10px;
+        }}
+
         .summary-card p {{
             color: #666;
             margin-bottom: 20px;
@@ -416,4 +443,4 @@ def generate_index_html(
 </body>
 </html>"""
 
-    return html
+    return page
@@ -0,0 +1,127 @@
+"""Epoch-millisecond timestamp helpers with cached timezone objects"""
+
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+from datetime import datetime, timedelta, tzinfo
+import pytz
+
+# 時間窗口常數 (毫秒)
+MS_PER_SECOND = 1000
+MS_PER_MINUTE = 60 * MS_PER_SECOND
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=None)
+def get_timezone(timezone: str) -> tzinfo:
+    """取得時區對象 (同一時區只建立一次)
+
+    Args:
+        timezone: 時區名稱 (例如 "Asia/Taipei")
+
+    Returns:
+        pytz 時區對象
+    """
+    return pytz.timezone(timezone)
+
+
+def ms_to_iso8601(timestamp_ms: int, timezone: str = "Asia/Taipei") -> str:
+    """將毫秒級 Unix 時間戳轉換為 ISO 8601 格式
+
+    Args:
+        timestamp_ms: 毫秒級 Unix 時間戳
+        timezone: 時區
+
+    Returns:
+        ISO 8601 格式的時間戳 (例如: "2026-02-17T09:15:30+08:00")
+    """
+    offset, suffix = _utc_offset(timezone, timestamp_ms // MS_PER_MINUTE)
+    local = _EPOCH + timedelta(milliseconds=timestamp_ms) + offset
+    return local.isoformat() + suffix
+
+
+def ms_to_iso8601_batch(
+    timestamps_ms: Iterable[int],
+    timezone: str = "Asia/Taipei"
+) -> List[str]:
+    """批量將毫秒級時間戳轉換為 ISO 8601 格式 (共用同一個時區對象)
+
+    Args:
+        timestamps_ms: 毫秒級 Unix 時間戳
+        timezone: 時區
+
+    Returns:
+        ISO 8601 字符串列表 (順序與輸入相同)
+    """
+    return [ms_to_iso8601(ts, timezone) for ts in timestamps_ms]
+
+
+def iso8601_to_ms(value: str) -> int:
+    """將 ISO 8601 時間戳轉換為毫秒級 Unix 時間戳
+
+    Args:
+        value: ISO 8601 字符串 (需包含時區偏移)
+
+    Returns:
+        毫秒級 Unix 時間戳
+
+    Raises:
+        ValueError: 格式錯誤時
+    """
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+
+def local_day_bounds_ms(day, timezone: str = "Asia/Taipei") -> tuple:
+    """某一天在指定時區的起訖時間 (毫秒，皆包含)
+
+    Args:
+        day: date 對象
+        timezone: 時區
+
+    Returns:
+        (start_ms, end_ms)，例如 00:00:00.000 ~ 23:59:59.999
+    """
+    tz = get_timezone(timezone)
+    start = tz.localize(datetime.combine(day, datetime.min.time()))
+    end = tz.localize(datetime.combine(day, datetime.max.time()))
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+
+def message_timestamp_ms(msg: dict) -> int:
+    """訊息的毫秒時間戳，舊格式訊息從 ISO 8601 字符串換算
+
+    Args:
+        msg: 訊息 (需包含 timestamp 或 timestamp_ms)
+
+    Returns:
+        毫秒級 Unix 時間戳
+    """
+    timestamp_ms = msg.get("timestamp_ms")
+    if timestamp_ms is None:
+        timestamp_ms = iso8601_to_ms(msg["timestamp"])
+    return timestamp_ms
+
+
+def ensure_timestamp_ms(messages: Iterable[dict]) -> None:
+    """為缺少 timestamp_ms 的訊息補上欄位 (就地更新，相容舊格式檔案)
+
+    Args:
+        messages: 訊息列表 (需包含 timestamp 或 timestamp_ms)
+    """
+    for msg in messages:
+        if msg.get("timestamp_ms") is None:
+            msg["timestamp_ms"] = iso8601_to_ms(msg["timestamp"])
+
+
+@lru_cache(maxsize=65536)
+def _utc_offset(timezone: str, minute: int) -> Tuple[timedelta, str]:
+    """某一分鐘在時區中的 UTC 偏移和 ISO 8601 偏移字串 (內部函數)
+
+    時區轉換 (pytz fromutc) 比格式化本身慢數倍，同一分鐘內的偏移相同，
+    快取後大量轉換只需做一次日期加法和格式化。
+
+    Returns:
+        (偏移量, 例如 "+08:00")
+    """
+    local = datetime.fromtimestamp(minute * 60, tz=get_timezone(timezone))
+    return local.utcoffset(), local.isoformat()[19:]
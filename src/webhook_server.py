@@ -0,0 +1,237 @@
+"""Webhook ingestion server - Receives LINE group messages as they arrive"""
+
+import logging
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+from typing import List, Optional, Tuple
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+from linebot.v3 import WebhookParser
+from linebot.v3.exceptions import InvalidSignatureError
+
+from src.config import Config
+from src.utils.line_handler import LineHandler
+from src.utils.message_store import MessageStore
+
+logger = logging.getLogger(__name__)
+
+STORE_KEY = web.AppKey("message_store", MessageStore)
+PARSER_KEY = web.AppKey("parser", WebhookParser)
+TIMEZONE_KEY = web.AppKey("timezone", str)
+
+
+def event_to_message(
+    event,
+    timezone: str = "Asia/Taipei"
+) -> Optional[Tuple[str, dict]]:
+    """將 LINE 群組訊息事件轉換為原始訊息格式
+
+    Args:
+        event: LINE webhook 事件對象
+        timezone: 時區
+
+    Returns:
+        (group_id, message)，非群組訊息事件時返回 None
+    """
+    if getattr(event, "type", None) != "message":
+        return None
+
+    source = getattr(event, "source", None)
+    if getattr(source, "type", None) != "group":
+        return None
+
+    message_event = event.message
+    content, attachments = LineHandler.extract_message_content(message_event)
+
+    message = {
+        "message_id": message_event.id,
+        "timestamp": LineHandler.convert_timestamp_to_iso8601(
+            event.timestamp,
+            timezone
+        ),
+        "timestamp_ms": event.timestamp,
+        "sender_id": getattr(source, "user_id", None) or "",
+        "sender_name": "",
+        "message_type": LineHandler.get_message_type(message_event),
+        "content": content,
+        "attachments": attachments,
+    }
+    return source.group_id, message
+
+
+async def handle_callback(request: web.Request) -> web.Response:
+    """處理 LINE webhook 請求
+
+    驗證簽名後將群組訊息寫入儲存，提交完成才回應 200。
+    """
+    signature = request.headers.get("X-Line-Signature", "")
+    body = await request.text()
+
+    try:
+        events = request.app[PARSER_KEY].parse(body, signature)
+    except InvalidSignatureError:
+        logger.warning("Rejected webhook request with invalid signature")
+        return web.Response(status=400, text="Invalid signature")
+    except (ValueError, KeyError) as e:
+        logger.warning(f"Rejected malformed webhook request: {e}")
+        return web.Response(status=400, text="Malformed body")
+
+    items = [
+        item for item in (
+            event_to_message(event, request.app[TIMEZONE_KEY])
+            for event in events
+        )
+        if item is not None
+    ]
+
+    await request.app[STORE_KEY].append_many(items)
+    return web.Response(text="OK")
+
+
+def create_app(
+    channel_secret: str,
+    store: MessageStore,
+    timezone: str = "Asia/Taipei"
+) -> web.Application:
+    """建立 webhook 應用
+
+    Args:
+        channel_secret: LINE Channel Secret (用於驗證簽名)
+        store: 訊息儲存
+        timezone: 時區
+
+    Returns:
+        aiohttp 應用
+
+    Raises:
+        ValueError: 如果 channel secret 為空
+    """
+    if not channel_secret:
+        raise ValueError("Channel secret cannot be empty")
+
+    app = web.Application()
+    app[PARSER_KEY] = WebhookParser(channel_secret)
+    app[TIMEZONE_KEY] = timezone
+    app[STORE_KEY] = store
+
+    async def _start_store(app: web.Application) -> None:
+        await app[STORE_KEY].start()
+
+    async def _stop_store(app: web.Application) -> None:
+        await app[STORE_KEY].stop()
+
+    app.on_startup.append(_start_store)
+    app.on_cleanup.append(_stop_store)
+    app.router.add_post("/callback", handle_callback)
+    return app
+
+
+def sign_body(channel_secret: str, body: str) -> str:
+    """計算 X-Line-Signature (HMAC-SHA256, Base64)
+
+    Args:
+        channel_secret: LINE Channel Secret
+        body: 請求內容
+
+    Returns:
+        簽名字符串
+    """
+    digest = hmac.new(
+        channel_secret.encode("utf-8"),
+        body.encode("utf-8"),
+        hashlib.sha256
+    ).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+async def replay_payloads(
+    url: str,
+    payloads: List[dict],
+    channel_secret: str,
+    concurrency: int = 50
+) -> List[int]:
+    """以本地 HTTP 請求重播 webhook payload (測試/壓測用)
+
+    Args:
+        url: webhook 網址 (例如 http://127.0.0.1:8000/callback)
+        payloads: webhook payload 列表 ({"destination": ..., "events": [...]})
+        channel_secret: 用於簽名的 Channel Secret
+        concurrency: 同時送出的請求數
+
+    Returns:
+        每個 payload 的 HTTP 狀態碼
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession() as session:
+        async def _post(payload: dict) -> int:
+            body = json.dumps(payload, ensure_ascii=False)
+            headers = {
+                "Content-Type": "application/json",
+                "X-Line-Signature": sign_body(channel_secret, body),
+            }
+            async with semaphore:
+                async with session.post(
+                    url,
+                    data=body.encode("utf-8"),
+                    headers=headers
+                ) as response:
+                    return response.status
+
+        return await asyncio.gather(*(_post(p) for p in payloads))
+
+
+def main() -> None:
+    """命令列入口
+
+    - python -m src.webhook_server                 啟動 webhook 伺服器
+    - python -m src.webhook_server --replay a.json 重播 payload 檔案
+    """
+    parser = argparse.ArgumentParser(description="LINE webhook ingestion")
+    parser.add_argument("--host", default=Config.WEBHOOK_HOST)
+    parser.add_argument("--port", type=int, default=Config.WEBHOOK_PORT)
+    parser.add_argument(
+        "--replay",
+        nargs="+",
+        metavar="PAYLOAD_JSON",
+        help="replay webhook payload files against a running server"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s'
+    )
+
+    if args.replay:
+        payloads = []
+        for path in args.replay:
+            with open(Path(path), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            payloads.extend(data if isinstance(data, list) else [data])
+
+        url = f"http://{args.host}:{args.port}/callback"
+        statuses = asyncio.run(
+            replay_payloads(url, payloads, Config.LINE_CHANNEL_SECRET)
+        )
+        ok = sum(1 for status in statuses if status == 200)
+        logger.info(f"Replayed {len(statuses)} payloads, {ok} accepted")
+        return
+
+    store = MessageStore(
+        Config.WEBHOOK_STORE_DIR,
+        timezone=Config.TIMEZONE,
+        max_batch_size=Config.WEBHOOK_BATCH_SIZE
+    )
+    app = create_app(Config.LINE_CHANNEL_SECRET, store, Config.TIMEZONE)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
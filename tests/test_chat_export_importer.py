@@ -0,0 +1,179 @@
+"""Unit tests for the LINE chat-history export importer"""
+
+import json
+from datetime import datetime
+
+import pytest
+import pytz
+
+from src.chat_export_importer import (
+    ExportStats,
+    import_export,
+    import_exports,
+    iter_export_days
+)
+from src.utils.partitions import partition_path
+
+EXPORT_TEXT = (
+    "\ufeff[LINE] 「專案群組」的聊天記錄\r\n"
+    "儲存日期：2026/02/16 10:00\r\n"
+    "\r\n"
+    "2026/02/14（六）\r\n"
+    "上午09:15\t王小明\t早安\r\n"
+    "上午09:16\t陳大華\t\"第一行\r\n"
+    "說了 \"\"好\"\"\r\n"
+    "第三行\"\r\n"
+    "下午12:05\t王小明\t[照片]\r\n"
+    "下午1:30\t林小美加入群組。\r\n"
+    "\r\n"
+    "2026/02/15（日）\r\n"
+    "上午12:01\t陳大華\t\"引號\"\r\n"
+    "下午11:59\t王小明\t晚安\r\n"
+)
+
+
+class TestChatExportImporter:
+    """Tests for the LINE chat-history export importer"""
+
+    @pytest.fixture
+    def export_file(self, tmp_path):
+        path = tmp_path / "chat.txt"
+        path.write_bytes(EXPORT_TEXT.encode("utf-8"))
+        return path
+
+    @pytest.mark.parametrize("chunk_size", [16, 64, 1024 * 1024])
+    def test_days_and_multiline_messages(self, export_file, chunk_size):
+        """Date headers split days; quoted multi-line messages survive chunking"""
+        stats = ExportStats()
+        days = list(iter_export_days(export_file, "Asia/Taipei", chunk_size, stats))
+
+        assert [str(day.date) for day in days] == ["2026-02-14", "2026-02-15"]
+        assert days[0].senders == ["王小明", "陳大華", "王小明"]
+        assert days[0].contents == ["早安", '第一行\n說了 "好"\n第三行', "[照片]"]
+        # 單行訊息的引號保留
+        assert days[1].contents == ['"引號"', "晚安"]
+        assert stats.messages == 5
+        assert stats.skipped == 1  # 系統訊息
+        assert stats.lines == 14
+
+    def test_twelve_hour_times(self, export_file):
+        """上午12 is midnight, 下午12 is noon, 下午1 is 13:00 (local time)"""
+        days = list(iter_export_days(export_file, "Asia/Taipei"))
+        tz = pytz.timezone("Asia/Taipei")
+
+        def local(ms):
+            return datetime.fromtimestamp(ms / 1000, tz).strftime("%Y-%m-%d %H:%M")
+
+        assert [local(ms) for ms in days[0].timestamps_ms] == [
+            "2026-02-14 09:15", "2026-02-14 09:16", "2026-02-14 12:05"
+        ]
+        assert [local(ms) for ms in days[1].timestamps_ms] == [
+            "2026-02-15 00:01", "2026-02-15 23:59"
+        ]
+
+    @pytest.mark.parametrize("chunk_size", [8, 1 << 20])
+    def test_quoted_lines_that_look_like_messages(self, tmp_path, chunk_size):
+        """Lines inside an open quote stay in the message even with a time prefix"""
+        path = tmp_path / "quoted.txt"
+        path.write_text(
+            "2026/02/14(Sat)\n"
+            '09:15\tA\t"first\n10:00\tfoo\tbar"\n'
+            '09:20\tB\t"one\n10:00\ttab\nend"\n'
+            '09:30\tC\t"unclosed\n09:40\tD\tok\n'
+            "2026/02/15(Sun)\n08:00\tE\tmorning\n",
+            encoding="utf-8"
+        )
+        days = list(iter_export_days(path, "Asia/Taipei", chunk_size))
+
+        assert list(zip(days[0].senders, days[0].contents)) == [
+            ("A", "first\n10:00\tfoo\tbar"),
+            ("B", "one\n10:00\ttab\nend"),
+            # 引號到日期標題仍未結束：視為一般訊息，吸收的行重新解析
+            ("C", '"unclosed'),
+            ("D", "ok"),
+        ]
+        assert days[1].contents == ["morning"]
+
+    def test_lines_with_many_tabs(self, tmp_path):
+        """Lines with more than 255 tabs or a closed quote keep fields aligned"""
+        wide = "\t".join(["x"] * 300)
+        path = tmp_path / "wide.txt"
+        path.write_text(
+            "2026/02/14(Sat)\n"
+            "09:00\tA\tbefore\n"
+            f'09:10\tB\t"{wide}\n{wide}"\n'
+            '09:20\tC\t"closed" and\tmore\n'
+            "09:30\tD\tafter\n",
+            encoding="utf-8"
+        )
+        day = next(iter_export_days(path, "Asia/Taipei"))
+
+        assert day.senders == ["A", "B", "C", "D"]
+        assert day.contents == [
+            "before", f"{wide}\n{wide}", '"closed" and\tmore', "after"
+        ]
+
+    def test_dst_day_uses_local_hours(self, tmp_path):
+        """Days with a DST shift still map wall-clock times correctly"""
+        path = tmp_path / "dst.txt"
+        path.write_text(
+            "2026/03/08(Sun)\n01:30\tA\tbefore\n03:30\tB\tafter\n",
+            encoding="utf-8"
+        )
+        day = next(iter_export_days(path, "America/New_York"))
+
+        assert day.timestamps_ms[1] - day.timestamps_ms[0] == 3600000
+
+    def test_import_writes_raw_files(self, export_file, tmp_path):
+        """Imported days are written as crawler raw files for the next date"""
+        output_dir = tmp_path / "raw"
+        result = import_export(
+            str(export_file), "C123", str(output_dir), "Asia/Taipei"
+        )
+
+        assert result["group_name"] == "專案群組"
+        assert result["days"] == 2
+        assert result["messages"] == 5
+
+        raw_file = (
+            partition_path(str(output_dir), "2026-02-15") / "C123_2026-02-15.json"
+        )
+        with open(raw_file, encoding="utf-8") as f:
+            data = json.load(f)
+        assert data["group_name"] == "專案群組"
+        assert data["total_messages"] == 3
+        first, _, photo = data["messages"]
+        assert first["timestamp"] == "2026-02-14T09:15:00+08:00"
+        assert first["message_id"].startswith("export_")
+        assert first["sender_id"].startswith("U")
+        assert photo["message_type"] == "image"
+        assert photo["content"] == "[Image]"
+
+        # 重新匯入同一份匯出檔不會產生重複訊息
+        import_export(str(export_file), "C123", str(output_dir), "Asia/Taipei")
+        with open(raw_file, encoding="utf-8") as f:
+            assert json.load(f)["total_messages"] == 3
+
+    def test_import_exports_in_parallel(self, export_file, tmp_path):
+        """Several exports are imported in worker processes"""
+        other = tmp_path / "other.txt"
+        other.write_text(
+            "[LINE] Chat history in Team\n\n2026/02/14(Sat)\n10:00\tA\thi\n",
+            encoding="utf-8"
+        )
+        output_dir = tmp_path / "raw"
+
+        results = import_exports(
+            [(str(export_file), "C1"), (str(other), "C2")],
+            output_dir=str(output_dir),
+            timezone="Asia/Taipei",
+            max_workers=2
+        )
+
+        assert [r["messages"] for r in results] == [5, 1]
+        assert results[1]["group_name"] == "Team"
+        assert (output_dir / "2026" / "02" / "15" / "C2_2026-02-15.json").exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -7,15 +7,33 @@ from pathlib import Path
 from unittest.mock import Mock, patch, AsyncMock, MagicMock
 import pytz
 import asyncio
+import threading
 
 from src.agent_crawler import (
     crawl_messages,
     _crawl_single_group,
     _save_messages_to_files
 )
+from aiohttp.test_utils import TestServer
+
+from src.fake_line_api import FakeLineApi, create_fake_app
+from src.utils.attachment_fetcher import AttachmentFetcher, parse_attachment
+from src.utils.group_metadata import GroupMetadataResolver
 from src.utils.line_handler import LineHandler
+from src.utils.message_store import MessageStore
+from src.utils.partitions import partition_path
+from src.utils.profile_cache import ProfileCache
+from src.utils.rate_limiter import RateLimiter, TokenBucket, get_rate_limiter
+from linebot.v3.messaging.exceptions import ApiException
+from src.utils.raw_io import iter_raw_messages, read_raw_header, write_jsonl
 from src.config import Config
 
+GROUP_SUMMARY = {
+    "group_name": "Test Group",
+    "picture_url": None,
+    "member_count": 2,
+}
+
 
 class TestLineHandler:
     """Tests for LineHandler class"""
@@ -101,6 +119,275 @@ class TestLineHandler:
         assert "[File]" in content
         assert len(attachments) > 0
 
+    @pytest.mark.asyncio
+    async def test_get_group_members_uses_async_api(self):
+        """Test member fetching awaits the async API across pages"""
+        handler = LineHandler("test_token")
+        handler.messaging_api = AsyncMock()
+        handler.messaging_api.get_group_members_ids.side_effect = [
+            Mock(member_ids=["U1", "U2"], next="token"),
+            Mock(member_ids=["U3"], next=None),
+        ]
+        handler.messaging_api.get_group_member_profile.side_effect = (
+            lambda group_id, user_id: Mock(display_name=f"name_{user_id}")
+        )
+
+        result = await handler.get_group_members("C123")
+
+        assert result == {"U1": "name_U1", "U2": "name_U2", "U3": "name_U3"}
+        assert handler.messaging_api.get_group_members_ids.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_fetch_member_profiles_bounded_concurrency(self):
+        """Test profile fetching respects the in-flight limit"""
+        handler = LineHandler("test_token", max_concurrent_profiles=3)
+        in_flight = 0
+        peak = 0
+
+        async def fake_profile(group_id, user_id):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return Mock(display_name=user_id.lower())
+
+        handler.messaging_api = AsyncMock()
+        handler.messaging_api.get_group_member_profile.side_effect = fake_profile
+
+        member_ids = [f"U{i}" for i in range(10)]
+        result = await handler.fetch_member_profiles("C123", member_ids)
+
+        assert len(result) == 10
+        assert peak == 3
+        assert handler.member_fetch_stats["C123"]["members"] == 10
+        assert "latency_seconds" in handler.member_fetch_stats["C123"]
+
+    @pytest.mark.asyncio
+    async def test_fetch_member_profiles_isolates_errors(self):
+        """Test a failing profile falls back to Unknown_ without aborting"""
+        handler = LineHandler("test_token")
+
+        async def fake_profile(group_id, user_id):
+            if user_id == "U1234567890bad":
+                raise Exception("boom")
+            return Mock(display_name="Alice")
+
+        handler.messaging_api = AsyncMock()
+        handler.messaging_api.get_group_member_profile.side_effect = fake_profile
+
+        result = await handler.fetch_member_profiles(
+            "C123", ["U1234567890bad", "U2"]
+        )
+
+        assert result["U1234567890bad"] == "Unknown_U1234567"
+        assert result["U2"] == "Alice"
+        assert handler.member_fetch_stats["C123"]["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_profile_cache_runs_off_event_loop(self, tmp_path):
+        """Test SQLite cache reads and writes run in worker threads"""
+        cache = ProfileCache(str(tmp_path / "profiles.db"))
+        threads = []
+        for name in ("lookup", "put_many"):
+            method = getattr(cache, name)
+
+            def record(*args, _method=method, **kwargs):
+                threads.append(threading.get_ident())
+                return _method(*args, **kwargs)
+
+            setattr(cache, name, record)
+
+        handler = LineHandler("test_token", profile_cache=cache)
+        handler.messaging_api = AsyncMock()
+        handler.messaging_api.get_group_member_profile.return_value = Mock(
+            display_name="Alice"
+        )
+
+        first = await handler.fetch_member_profiles("C1", ["U1"])
+        second = await handler.fetch_member_profiles("C2", ["U1"])
+        cache.close()
+
+        assert first == second == {"U1": "Alice"}
+        assert len(threads) == 4
+        assert threading.get_ident() not in threads
+
+    @pytest.mark.asyncio
+    async def test_fetch_member_profiles_coalesces_across_groups(self):
+        """Test concurrent lookups for the same user share one request"""
+        handler = LineHandler("test_token", profile_cache=ProfileCache(":memory:"))
+
+        async def fake_profile(group_id, user_id):
+            await asyncio.sleep(0.01)
+            return Mock(display_name="Alice")
+
+        handler.messaging_api = AsyncMock()
+        handler.messaging_api.get_group_member_profile.side_effect = fake_profile
+
+        results = await asyncio.gather(
+            handler.fetch_member_profiles("C1", ["U1"]),
+            handler.fetch_member_profiles("C2", ["U1"]),
+        )
+
+        assert results == [{"U1": "Alice"}, {"U1": "Alice"}]
+        assert handler.messaging_api.get_group_member_profile.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_get_group_members_skips_unchanged_group(self):
+        """Test an unchanged member count reuses the cached member map"""
+        handler = LineHandler("test_token", profile_cache=ProfileCache(":memory:"))
+        handler.messaging_api = AsyncMock()
+        handler.messaging_api.get_group_member_count.return_value = Mock(count=2)
+        handler.messaging_api.get_group_members_ids.return_value = Mock(
+            member_ids=["U1", "U2"], next=None
+        )
+        handler.messaging_api.get_group_member_profile.side_effect = (
+            lambda group_id, user_id: Mock(display_name=f"name_{user_id}")
+        )
+
+        first = await handler.get_group_members("C123")
+        second = await handler.get_group_members("C123")
+
+        assert first == second == {"U1": "name_U1", "U2": "name_U2"}
+        assert handler.messaging_api.get_group_members_ids.await_count == 1
+        assert handler.messaging_api.get_group_member_profile.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_resolve_sender_names_only_active_senders(self):
+        """Test only distinct senders that appear in messages are resolved"""
+        handler = LineHandler("test_token")
+        handler.messaging_api = AsyncMock()
+        handler.messaging_api.get_group_member_profile.side_effect = (
+            lambda group_id, user_id: Mock(display_name=f"name_{user_id}")
+        )
+        messages = [
+            {"message_id": "1", "sender_id": "U1", "sender_name": ""},
+            {"message_id": "2", "sender_id": "U2", "sender_name": ""},
+            {"message_id": "3", "sender_id": "U1", "sender_name": ""},
+        ]
+
+        await handler.resolve_sender_names("C123", messages)
+
+        assert [m["sender_name"] for m in messages] == [
+            "name_U1", "name_U2", "name_U1"
+        ]
+        assert handler.messaging_api.get_group_member_profile.await_count == 2
+        handler.messaging_api.get_group_members_ids.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_iter_group_member_ids_streams_pages(self):
+        """Test member ID pagination yields one page at a time"""
+        handler = LineHandler("test_token")
+        handler.messaging_api = AsyncMock()
+        handler.messaging_api.get_group_members_ids.side_effect = [
+            Mock(member_ids=["U1", "U2"], next="token"),
+            Mock(member_ids=["U3"], next=None),
+        ]
+
+        pages = [page async for page in handler.iter_group_member_ids("C123")]
+
+        assert pages == [["U1", "U2"], ["U3"]]
+
+    @pytest.mark.asyncio
+    async def test_close_releases_connection_pool(self):
+        """Test close() shuts down the shared connection pool"""
+        handler = LineHandler("test_token")
+        api = handler._get_messaging_api()
+        assert handler._get_messaging_api() is api
+
+        await handler.close()
+
+        assert handler.api_client is None
+        assert handler.messaging_api is None
+
+
+class TestProfileCache:
+    """Tests for ProfileCache"""
+
+    def test_lookup_and_cross_group_reuse(self):
+        """Test cached names are reused for the same user in another group"""
+        cache = ProfileCache(":memory:")
+        cache.put_many("C1", {"U1": "Alice"})
+
+        assert cache.lookup("C1", ["U1", "U2"]) == {"U1": "Alice"}
+        assert cache.lookup("C2", ["U1"]) == {"U1": "Alice"}
+        assert cache.get_group_members("C2") == {"U1": "Alice"}
+
+    def test_expired_entries_are_ignored(self):
+        """Test entries older than the TTL are not returned"""
+        cache = ProfileCache(":memory:", ttl_seconds=60)
+        with patch("src.utils.profile_cache.time.time", return_value=1000.0):
+            cache.put_many("C1", {"U1": "Alice"})
+            cache.set_member_count("C1", 5)
+
+        with patch("src.utils.profile_cache.time.time", return_value=1100.0):
+            assert cache.lookup("C1", ["U1"]) == {}
+            assert cache.get_member_count("C1") is None
+
+    def test_eviction_keeps_size_bounded(self):
+        """Test the oldest entries are evicted beyond max_entries"""
+        cache = ProfileCache(":memory:", max_entries=2)
+        for i, t in enumerate([1000.0, 1001.0, 1002.0]):
+            with patch("src.utils.profile_cache.time.time", return_value=t):
+                cache.put_many("C1", {f"U{i}": f"name{i}"})
+
+        with patch("src.utils.profile_cache.time.time", return_value=1003.0):
+            assert cache.get_group_members("C1") == {
+                "U1": "name1", "U2": "name2"
+            }
+
+
+class TestRateLimiter:
+    """Tests for the shared adaptive rate limiter"""
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_paces_beyond_burst(self):
+        """Test requests beyond the burst capacity wait for tokens"""
+        bucket = TokenBucket(rate=100, capacity=5)
+
+        waits = [await bucket.acquire() for _ in range(10)]
+
+        assert all(w == 0 for w in waits[:5])
+        assert bucket.waits >= 4
+        assert bucket.stats()["requests"] == 10
+
+    @pytest.mark.asyncio
+    async def test_call_honours_retry_after_and_slows_down(self):
+        """Test a 429 waits Retry-After, halves the rate and retries"""
+        limiter = RateLimiter({"profile": 1000})
+        error = ApiException(status=429, reason="Too Many Requests")
+        error.headers = {"Retry-After": "0.05"}
+        api = AsyncMock(side_effect=[error, "ok"])
+
+        started = asyncio.get_running_loop().time()
+        result = await limiter.call("profile", api, "C1", "U1")
+        elapsed = asyncio.get_running_loop().time() - started
+
+        assert result == "ok"
+        assert api.await_count == 2
+        assert elapsed >= 0.04
+        stats = limiter.stats()["profile"]
+        assert stats["throttled"] == 1
+        assert stats["rate_limit"] < 1000
+
+    @pytest.mark.asyncio
+    async def test_call_raises_non_429_errors(self):
+        """Test other API errors are not retried"""
+        limiter = RateLimiter()
+        api = AsyncMock(side_effect=ApiException(status=500, reason="boom"))
+
+        with pytest.raises(ApiException):
+            await limiter.call("members", api)
+        assert api.await_count == 1
+
+    def test_handlers_share_process_wide_limiter(self):
+        """Test LineHandler and LineSender use the same limiter"""
+        from src.utils.sender import LineSender
+
+        handler = LineHandler("test_token")
+        sender = LineSender("test_token")
+        assert handler.rate_limiter is sender.rate_limiter is get_rate_limiter()
+
 
 class TestCrawler:
     """Tests for crawler functions"""
@@ -128,6 +415,7 @@ class TestCrawler:
             "src.agent_crawler.LineHandler"
         ) as MockLineHandler:
             mock_handler = AsyncMock()
+            mock_handler.get_group_summary.return_value = GROUP_SUMMARY
             MockLineHandler.return_value = mock_handler
 
             # Mock get_group_messages to return sample messages
@@ -166,6 +454,7 @@ class TestCrawler:
             "src.agent_crawler.LineHandler"
         ) as MockLineHandler:
             mock_handler = AsyncMock()
+            mock_handler.get_group_summary.return_value = GROUP_SUMMARY
             MockLineHandler.return_value = mock_handler
 
             # Mock return different messages for each group
@@ -192,6 +481,7 @@ class TestCrawler:
             "src.agent_crawler.LineHandler"
         ) as MockLineHandler:
             mock_handler = AsyncMock()
+            mock_handler.get_group_summary.return_value = GROUP_SUMMARY
             MockLineHandler.return_value = mock_handler
 
             # Mock messages with Chinese content
@@ -254,7 +544,8 @@ class TestCrawler:
 
             # Verify file was created
             output_file = (
-                tmp_path / "raw_messages" / f"{group_id}_{date}.json"
+                tmp_path / "raw_messages" / "2026" / "02" / "17"
+                / f"{group_id}_{date}.json"
             )
             assert output_file.exists()
 
@@ -268,6 +559,270 @@ class TestCrawler:
             assert "你好" in saved_data["messages"][0]["content"]
 
 
+class TestAttachmentFetcher:
+    """Tests for streaming attachment downloads"""
+
+    @staticmethod
+    async def _fetch_all(api, storage_dir, message_ids, chunk_size=65536):
+        server = TestServer(create_fake_app(api))
+        await server.start_server()
+        try:
+            fetcher = AttachmentFetcher(
+                "test_token",
+                str(storage_dir),
+                max_concurrency=2,
+                chunk_size=chunk_size,
+                api_base_url=str(server.make_url("")).rstrip("/"),
+                rate_limiter=RateLimiter()
+            )
+            scheduled = fetcher.schedule([
+                {"attachments": [f"image_{message_id}"]}
+                for message_id in message_ids
+            ])
+            await fetcher.close()
+        finally:
+            await server.close()
+        return fetcher, scheduled
+
+    def test_parse_attachment(self):
+        """Test only downloadable placeholders yield a message id"""
+        assert parse_attachment("image_100001") == "100001"
+        assert parse_attachment("file_42") == "42"
+        assert parse_attachment("sticker_1") is None
+        assert parse_attachment("https://example.com/a.png") is None
+
+    @pytest.mark.asyncio
+    async def test_identical_content_is_stored_once(self, tmp_path):
+        """Test forwarded attachments with the same bytes share one object"""
+        api = FakeLineApi(latency_ms=0, content_size=10000, content_variants=1)
+
+        fetcher, scheduled = await self._fetch_all(
+            api, tmp_path, ["1", "2", "3"], chunk_size=1024
+        )
+
+        assert scheduled == 3
+        assert fetcher.stats()["downloaded"] == 1
+        assert fetcher.stats()["deduplicated"] == 2
+        objects = [p for p in (tmp_path / "objects").rglob("*") if p.is_file()]
+        assert len(objects) == 1
+        assert objects[0].read_bytes() == api.message_content("1")
+        assert fetcher.resolve("image_3") == objects[0]
+        assert list((tmp_path / "tmp").iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_downloaded_messages_are_skipped(self, tmp_path):
+        """Test messages already in the index are not downloaded again"""
+        api = FakeLineApi(latency_ms=0, content_size=100)
+        await self._fetch_all(api, tmp_path, ["1"])
+
+        _, scheduled = await self._fetch_all(api, tmp_path, ["1", "2"])
+
+        assert scheduled == 1
+        assert api.requests["content"] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_downloads_are_counted(self, tmp_path):
+        """Test server errors are counted without leaving partial files"""
+        api = FakeLineApi(latency_ms=0, error_rate=1.0)
+
+        fetcher, _ = await self._fetch_all(api, tmp_path, ["1", "2"])
+
+        assert fetcher.stats()["failed"] == 2
+        assert fetcher.resolve("image_1") is None
+        assert not (tmp_path / "objects").exists()
+
+
+class TestIncrementalCrawl:
+    """Tests for checkpointed incremental crawling"""
+
+    @staticmethod
+    def _msg(message_id, timestamp, content="msg"):
+        return {
+            "message_id": message_id,
+            "timestamp": timestamp,
+            "sender_id": "U1",
+            "sender_name": "Alice",
+            "message_type": "text",
+            "content": content,
+            "attachments": []
+        }
+
+    @pytest.mark.asyncio
+    async def test_save_upserts_by_message_id(self, tmp_path):
+        """Test a rerun appends new messages and updates existing ones"""
+        with patch.object(Config, "RAW_MESSAGES_DIR", str(tmp_path)):
+            group_id = "C1234567890abcdef"
+            date = "2026-02-17"
+
+            await _save_messages_to_files({group_id: [
+                self._msg("1", "2026-02-16T08:00:00+08:00"),
+                self._msg("2", "2026-02-16T08:30:00+08:00"),
+            ]}, date)
+            await _save_messages_to_files({group_id: [
+                self._msg("2", "2026-02-16T08:30:00+08:00", "edited"),
+                self._msg("3", "2026-02-16T09:00:00+08:00"),
+            ]}, date)
+
+            with open(
+                partition_path(str(tmp_path), date) / f"{group_id}_{date}.json",
+                encoding="utf-8"
+            ) as f:
+                saved = json.load(f)
+
+            assert [m["message_id"] for m in saved["messages"]] == ["1", "2", "3"]
+            assert saved["messages"][1]["content"] == "edited"
+            assert saved["total_messages"] == 3
+            assert saved["checkpoint"]["last_message_id"] == "3"
+
+    @pytest.mark.asyncio
+    async def test_crawl_resumes_from_store_offsets(self, tmp_path):
+        """Test a rerun picks up late events older than the last crawled message"""
+        group_id = "C1234567890abcdef"
+        date = "2026-02-17"
+        # 2026-02-16T10:00:00+08:00
+        base_ts = 1771207200000
+
+        def stored(message_id, timestamp_ms):
+            return {
+                "message_id": message_id,
+                "timestamp": "",
+                "timestamp_ms": timestamp_ms,
+                "sender_id": "U1",
+                "sender_name": "Alice",
+                "message_type": "text",
+                "content": "msg",
+                "attachments": []
+            }
+
+        store = MessageStore(str(tmp_path / "store"))
+        store_handler = LineHandler("test_token", message_store=store)
+        await store.start()
+        await store.append_many([
+            (group_id, stored("1", base_ts)),
+            (group_id, stored("2", base_ts + 7200000)),
+        ])
+
+        with patch.object(Config, "RAW_MESSAGES_DIR", str(tmp_path / "raw")), \
+                patch("src.agent_crawler.LineHandler") as MockLineHandler:
+            mock_handler = AsyncMock()
+            mock_handler.get_group_summary.return_value = GROUP_SUMMARY
+            mock_handler.get_group_messages.side_effect = (
+                store_handler.get_group_messages
+            )
+            MockLineHandler.return_value = mock_handler
+
+            await crawl_messages([group_id], date)
+            # 爬取後才到達：時間戳早於上次的最後一則，以及一則重送
+            await store.append_many([
+                (group_id, stored("3", base_ts - 1800000)),
+                (group_id, stored("2", base_ts + 7200000)),
+            ])
+            await store.stop()
+            result = await crawl_messages([group_id], date)
+
+        assert [m["message_id"] for m in result[group_id]] == ["3", "2"]
+        path = (
+            partition_path(str(tmp_path / "raw"), date)
+            / f"{group_id}_{date}.json"
+        )
+        assert [m["message_id"] for m in iter_raw_messages(path)] == [
+            "3", "1", "2"
+        ]
+        store_file = store._path(group_id, store._date_of(base_ts))
+        assert read_raw_header(path)["checkpoint"]["store_offsets"] == {
+            "2026-02-16": store_file.stat().st_size
+        }
+
+
+class TestJsonlOutput:
+    """Tests for streaming JSON Lines raw output"""
+
+    @pytest.mark.asyncio
+    async def test_save_jsonl_header_and_upsert(self, tmp_path):
+        """Test JSONL output has a header line and upserts by message_id"""
+        msg = TestIncrementalCrawl._msg
+        group_id = "C1234567890abcdef"
+        date = "2026-02-17"
+
+        with patch.object(Config, "RAW_MESSAGES_DIR", str(tmp_path)), \
+                patch.object(Config, "RAW_OUTPUT_FORMAT", "jsonl"):
+            await _save_messages_to_files({group_id: [
+                msg("1", "2026-02-16T08:00:00+08:00"),
+                msg("2", "2026-02-16T08:30:00+08:00"),
+            ]}, date)
+            await _save_messages_to_files({group_id: [
+                msg("2", "2026-02-16T08:30:00+08:00", "edited"),
+                msg("3", "2026-02-16T09:00:00+08:00"),
+            ]}, date)
+
+        output_file = (
+            partition_path(str(tmp_path), date) / f"{group_id}_{date}.jsonl"
+        )
+        lines = output_file.read_text(encoding="utf-8").splitlines()
+        header = json.loads(lines[0])
+        records = [json.loads(line) for line in lines[1:]]
+
+        assert header["type"] == "header"
+        assert header["group_id"] == group_id
+        assert header["checkpoint"]["last_message_id"] == "3"
+        assert [r["message_id"] for r in records] == ["1", "2", "3"]
+        assert records[1]["content"] == "edited"
+        assert not list(output_file.parent.glob("*.tmp"))
+
+    @pytest.mark.asyncio
+    async def test_save_jsonl_keeps_time_order(self, tmp_path):
+        """Test late and upserted messages are merged in time order like JSON"""
+        msg = TestIncrementalCrawl._msg
+        group_id = "C1234567890abcdef"
+        date = "2026-02-17"
+        first = [
+            msg("1", "2026-02-16T10:00:00+08:00"),
+            msg("2", "2026-02-16T12:00:00+08:00"),
+        ]
+        second = [
+            msg("3", "2026-02-16T10:03:00+08:00"),
+            msg("1", "2026-02-16T12:30:00+08:00", "edited"),
+        ]
+
+        saved = {}
+        for output_format in ("json", "jsonl"):
+            base = tmp_path / output_format
+            with patch.object(Config, "RAW_MESSAGES_DIR", str(base)), \
+                    patch.object(Config, "RAW_OUTPUT_FORMAT", output_format):
+                await _save_messages_to_files({group_id: first}, date)
+                await _save_messages_to_files({group_id: second}, date)
+            path = (
+                partition_path(str(base), date)
+                / f"{group_id}_{date}.{output_format}"
+            )
+            saved[output_format] = (
+                read_raw_header(path), list(iter_raw_messages(path))
+            )
+
+        json_header, json_messages = saved["json"]
+        jsonl_header, jsonl_messages = saved["jsonl"]
+        assert [m["message_id"] for m in jsonl_messages] == ["3", "2", "1"]
+        assert jsonl_messages == json_messages
+        assert jsonl_header["checkpoint"] == json_header["checkpoint"] == {
+            "last_timestamp_ms": jsonl_messages[-1]["timestamp_ms"],
+            "last_message_id": "1",
+        }
+
+    def test_iter_raw_messages_reads_incrementally(self, tmp_path):
+        """Test JSONL messages are yielded one at a time"""
+        path = tmp_path / "C1_2026-02-17.jsonl"
+        write_jsonl(
+            path,
+            {"group_id": "C1", "date": "2026-02-17"},
+            ({"message_id": str(i)} for i in range(3))
+        )
+
+        iterator = iter_raw_messages(path)
+        assert next(iterator) == {"message_id": "0"}
+        assert [m["message_id"] for m in iterator] == ["1", "2"]
+        assert read_raw_header(path) == {"group_id": "C1", "date": "2026-02-17"}
+
+
 class TestTimezoneHandling:
     """Tests for timezone handling"""
 
@@ -290,3 +845,102 @@ class TestTimezoneHandling:
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+class TestGroupMetadata:
+    """Tests for cached group metadata resolution"""
+
+    @staticmethod
+    def _handler(name="Team"):
+        handler = AsyncMock()
+        handler.get_group_summary.return_value = {
+            "group_name": name,
+            "picture_url": "https://example.com/g.png",
+            "member_count": 12,
+        }
+        return handler
+
+    @pytest.mark.asyncio
+    async def test_unknown_group_fetched_once_and_cached(self):
+        """Test concurrent lookups of a new group share one request"""
+        cache = ProfileCache(":memory:")
+        handler = self._handler()
+        resolver = GroupMetadataResolver(handler, cache)
+
+        first, second = await asyncio.gather(
+            resolver.get("C1"), resolver.get("C1")
+        )
+
+        assert first["group_name"] == second["group_name"] == "Team"
+        assert handler.get_group_summary.await_count == 1
+        assert cache.get_group_summary("C1")["picture_url"] == (
+            "https://example.com/g.png"
+        )
+        assert cache.get_member_count("C1") == 12
+
+    @pytest.mark.asyncio
+    async def test_stale_group_served_from_cache_and_refreshed(self):
+        """Test a known but stale group returns immediately then refreshes"""
+        cache = ProfileCache(":memory:")
+        cache.put_group_summary("C1", {"group_name": "Old", "member_count": 3})
+        handler = self._handler("New")
+        resolver = GroupMetadataResolver(handler, cache, refresh_seconds=1)
+
+        with patch("src.utils.group_metadata.time.time",
+                   return_value=cache.get_group_summary("C1")["fetched_at"] + 5):
+            result = await resolver.get("C1")
+        await resolver.close()
+
+        assert result["group_name"] == "Old"
+        assert handler.get_group_summary.await_count == 1
+        assert cache.get_group_summary("C1")["group_name"] == "New"
+
+    @pytest.mark.asyncio
+    async def test_failure_falls_back_to_placeholder(self):
+        """Test an API failure yields the placeholder name"""
+        handler = AsyncMock()
+        handler.get_group_summary.side_effect = ApiException(status=404)
+        resolver = GroupMetadataResolver(handler, ProfileCache(":memory:"))
+
+        result = await resolver.get("C1234567890abcdef")
+
+        assert result["group_name"] == "Group_C1234567"
+
+    @pytest.mark.asyncio
+    async def test_saved_file_uses_group_name(self, tmp_path):
+        """Test raw files carry the resolved group name and picture"""
+        with patch.object(Config, "RAW_MESSAGES_DIR", str(tmp_path)):
+            await _save_messages_to_files(
+                {"C1": [TestIncrementalCrawl._msg(
+                    "1", "2026-02-16T08:00:00+08:00"
+                )]},
+                "2026-02-17",
+                {"C1": {"group_name": "Team", "picture_url": "p.png"}}
+            )
+
+        saved = json.loads(
+            (tmp_path / "2026" / "02" / "17" / "C1_2026-02-17.json")
+            .read_text("utf-8")
+        )
+        assert saved["group_name"] == "Team"
+        assert saved["picture_url"] == "p.png"
+
+    @pytest.mark.asyncio
+    async def test_line_handler_group_summary(self):
+        """Test LineHandler reads name, picture and member count"""
+        api = FakeLineApi(members_per_group=7, latency_ms=0)
+        server = TestServer(create_fake_app(api))
+        await server.start_server()
+        try:
+            handler = LineHandler(
+                "test_token",
+                rate_limiter=RateLimiter(),
+                api_base_url=str(server.make_url("")).rstrip("/")
+            )
+            summary = await handler.get_group_summary("C123")
+            await handler.close()
+        finally:
+            await server.close()
+
+        assert summary["group_name"] == api.group_name("C123")
+        assert summary["member_count"] == 7
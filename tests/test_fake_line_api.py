@@ -0,0 +1,160 @@
+"""Unit tests for the local LINE API stand-in and crawler benchmark"""
+
+import pytest
+import aiohttp
+from aiohttp.test_utils import TestServer
+
+from src.benchmark_crawler import run_benchmark
+from src.fake_line_api import FakeLineApi, create_fake_app
+from src.utils.line_handler import LineHandler
+from src.utils.rate_limiter import RateLimiter
+from src.utils.sender import LineSender
+
+AUTH = {"Authorization": "Bearer test_token"}
+
+
+async def _start(api):
+    server = TestServer(create_fake_app(api))
+    await server.start_server()
+    return server
+
+
+class TestFakeLineApi:
+    """Tests for FakeLineApi"""
+
+    def test_invalid_distribution(self):
+        """Test an unknown latency distribution raises"""
+        with pytest.raises(ValueError):
+            FakeLineApi(latency_distribution="pareto")
+
+    def test_group_members_are_deterministic(self):
+        """Test the same seed produces the same members"""
+        first = FakeLineApi(members_per_group=50, seed=7)
+        second = FakeLineApi(members_per_group=50, seed=7)
+
+        assert first.group_members("C1") == second.group_members("C1")
+        assert len(set(first.group_members("C1"))) == 50
+
+    @pytest.mark.asyncio
+    async def test_line_handler_paginates_members(self):
+        """Test LineHandler reads every page of member IDs and profiles"""
+        api = FakeLineApi(members_per_group=250, page_size=100, latency_ms=0)
+        server = await _start(api)
+        try:
+            handler = LineHandler(
+                "test_token",
+                rate_limiter=RateLimiter(),
+                api_base_url=str(server.make_url("")).rstrip("/")
+            )
+            members = await handler.get_group_members("C123")
+            await handler.close()
+        finally:
+            await server.close()
+
+        assert set(members) == set(api.group_members("C123"))
+        assert members[api.group_members("C123")[0]].startswith("User_")
+        assert api.requests["members_ids"] == 3
+
+    @pytest.mark.asyncio
+    async def test_throttle_injection_sets_retry_after(self):
+        """Test injected 429 responses carry Retry-After"""
+        api = FakeLineApi(latency_ms=0, throttle_rate=1.0, retry_after=3)
+        server = await _start(api)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    server.make_url("/v2/bot/group/C1/members/count"),
+                    headers=AUTH
+                ) as response:
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+        finally:
+            await server.close()
+
+        assert status == 429
+        assert retry_after == "3"
+
+    @pytest.mark.asyncio
+    async def test_record_then_replay(self, tmp_path):
+        """Test recorded responses are replayed in order"""
+        cassette = tmp_path / "cassette.jsonl"
+        path = "/v2/bot/group/C1/members/ids"
+
+        recorder = FakeLineApi(
+            latency_ms=0,
+            cassette_path=str(cassette),
+            cassette_mode="record"
+        )
+        server = await _start(recorder)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(server.make_url(path), headers=AUTH) as r:
+                    recorded = await r.json()
+        finally:
+            await server.close()
+
+        player = FakeLineApi(
+            members_per_group=1,
+            cassette_path=str(cassette),
+            cassette_mode="replay"
+        )
+        server = await _start(player)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(server.make_url(path)) as r:
+                    replayed = await r.json()
+                async with session.get(
+                    server.make_url("/v2/bot/group/C2/members/ids")
+                ) as r:
+                    missing_status = r.status
+        finally:
+            await server.close()
+
+        assert replayed == recorded
+        assert len(replayed["memberIds"]) == 100
+        assert missing_status == 404
+
+    @pytest.mark.asyncio
+    async def test_line_sender_push(self, tmp_path):
+        """Test LineSender pushes summaries to the fake API"""
+        api = FakeLineApi(latency_ms=0)
+        server = await _start(api)
+        summary = tmp_path / "C1_2026-02-16.md"
+        summary.write_text("# 摘要\n\n內容", encoding="utf-8")
+        try:
+            sender = LineSender(
+                "test_token",
+                rate_limiter=RateLimiter(),
+                api_base_url=str(server.make_url("")).rstrip("/")
+            )
+            result = await sender.send_summary("U123", str(summary))
+        finally:
+            await server.close()
+
+        assert result is True
+        assert api.requests["push"] == 1
+
+
+class TestBenchmark:
+    """Tests for the crawler benchmark"""
+
+    @pytest.mark.asyncio
+    async def test_run_benchmark_reports_latency(self):
+        """Test a small benchmark run reports throughput and percentiles"""
+        api = FakeLineApi(members_per_group=20, latency_ms=1)
+
+        report = await run_benchmark(
+            api,
+            groups=5,
+            messages_per_group=10,
+            senders_per_group=3
+        )
+
+        assert report["messages"] == 50
+        assert report["groups_per_second"] > 0
+        assert report["endpoints"]["profile"]["p99_ms"] >= (
+            report["endpoints"]["profile"]["p50_ms"]
+        )
+        assert report["server"]["statuses"] == {
+            "200": report["server"]["total_requests"]
+        }
@@ -1,19 +1,49 @@
 """Unit tests for message processor (Agent 2)"""
 
 import pytest
+import hashlib
 import json
+import random
 from pathlib import Path
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 
 from src.utils.message_parser import (
     remove_duplicates,
+    remove_duplicates_with_count,
     filter_noise,
     classify_messages,
     extract_keywords,
+    extract_message_and_group_keywords,
     calculate_importance,
+    classify_and_score_messages,
 )
+from src.agent_crawler import write_group_messages
 from src.agent_processor import process_messages, _calculate_statistics
+from src.config import Config
+from src.models import Message, MessageBatch
+from src.utils.near_duplicates import (
+    collapse_near_duplicates,
+    minhash_signature,
+    shingles,
+)
+from src.utils.partitions import (
+    file_sha256,
+    load_manifest,
+    migrate_flat_layout,
+    partition_path,
+    refresh_manifest,
+)
+from src.utils.raw_io import write_jsonl
+from src.utils.noise_filter import NoiseRule, build_noise_filter, is_emoji_only
+from src.utils.keyword_matcher import KeywordAutomaton, merge_keyword_classes
+from src.utils.tokenizer import CACHE_FILE_NAME, _prepare_tokenizer
+from src.utils.time_utils import (
+    iso8601_to_ms,
+    local_day_bounds_ms,
+    ms_to_iso8601,
+    ms_to_iso8601_batch,
+)
 
 
 class TestRemoveDuplicates:
@@ -105,6 +135,154 @@ class TestRemoveDuplicates:
         result = remove_duplicates(messages)
         assert len(result) == 2  # Both should be kept (>10 min)
 
+    def test_window_boundaries_in_milliseconds(self):
+        """Test integer timestamp_ms windows match the minute thresholds"""
+        base = 1771290000000
+        messages = [
+            {"message_id": "1", "content": "x", "sender_id": "U1", "timestamp_ms": base},
+            {"message_id": "2", "content": "x", "sender_id": "U1", "timestamp_ms": base + 300000},
+            {"message_id": "3", "content": "y", "sender_id": "U1", "timestamp_ms": base},
+            {"message_id": "4", "content": "y", "sender_id": "U2", "timestamp_ms": base + 600000},
+        ]
+
+        result = remove_duplicates(messages)
+
+        # 同一人剛好 5 分鐘仍算重複；不同人剛好 10 分鐘不算重複
+        assert [m["message_id"] for m in result] == ["1", "3", "4"]
+
+    def test_matches_pairwise_implementation(self):
+        """Test the indexed version matches the original pairwise comparison"""
+        rng = random.Random(17)
+        base = 1771290000000
+
+        for _ in range(200):
+            messages = [
+                {
+                    "message_id": str(i),
+                    "content": rng.choice(["a", "b", " a ", "", "c"]),
+                    "sender_id": rng.choice(["U1", "U2", "U3"]),
+                    # 集中在少數時間點，製造同時間和剛好在邊界的情況
+                    "timestamp_ms": base + rng.choice([0, 60, 150, 300, 420, 600, 900])
+                    * 1000 + rng.choice([0, 0, 1]),
+                }
+                for i in range(rng.randint(0, 40))
+            ]
+
+            result, removed = remove_duplicates_with_count(messages)
+            expected = _pairwise_remove_duplicates(messages)
+
+            assert [m["message_id"] for m in result] == [
+                m["message_id"] for m in expected
+            ]
+            assert removed == len(messages) - len(expected)
+
+
+def _pairwise_remove_duplicates(messages):
+    """原本的 O(n²) 去重實作，作為等價性測試的參照"""
+    ordered = sorted(messages, key=lambda m: m["timestamp_ms"])
+    duplicates = set()
+    result = []
+    for i, msg in enumerate(ordered):
+        if i in duplicates:
+            continue
+        content = msg.get("content", "").strip()
+        sender = msg.get("sender_id", "")
+        for j in range(i + 1, len(ordered)):
+            if j in duplicates:
+                continue
+            other = ordered[j]
+            time_diff = other["timestamp_ms"] - msg["timestamp_ms"]
+            if time_diff > 600000:
+                break
+            same_content = content == other.get("content", "").strip()
+            if sender == other.get("sender_id", ""):
+                if time_diff <= 300000 and same_content:
+                    duplicates.add(j)
+            elif time_diff < 600000 and same_content and content:
+                duplicates.add(j)
+        result.append(msg)
+    return result
+
+
+class TestNearDuplicates:
+    """Tests for MinHash LSH near-duplicate collapsing"""
+
+    BASE = 1771290000000
+
+    def _message(self, message_id, content, minutes=0, message_type="text"):
+        return {
+            "message_id": message_id,
+            "content": content,
+            "sender_id": f"U{message_id}",
+            "message_type": message_type,
+            "timestamp_ms": self.BASE + minutes * 60000,
+        }
+
+    def test_reposts_and_variants_collapse(self):
+        """Test prefixed reposts and punctuation variants join one cluster"""
+        notice = "【公告】明天下午三點在三樓會議室開季度檢討會，請準時出席"
+        messages = [
+            self._message("1", notice),
+            self._message("2", "收到"),
+            self._message("3", "收到！", minutes=1),
+            self._message("4", "轉傳：" + notice, minutes=5),
+            self._message("5", "我覺得明天的會議可以延後", minutes=6),
+        ]
+
+        result, collapsed = collapse_near_duplicates(messages, threshold=0.8)
+
+        assert collapsed == 2
+        assert [m["message_id"] for m in result] == ["1", "2", "5"]
+        assert result[0]["repeat_count"] == 2
+        assert result[1]["repeat_count"] == 2
+        assert "repeat_count" not in result[2]
+
+    def test_window_and_non_text_messages(self):
+        """Test repeats outside the window and media placeholders are kept"""
+        messages = [
+            self._message("1", "收到"),
+            self._message("2", "收到", minutes=90),
+            self._message("3", "[Image]", message_type="image"),
+            self._message("4", "[Image]", message_type="image"),
+        ]
+
+        result, collapsed = collapse_near_duplicates(
+            messages, threshold=0.8, window_minutes=60
+        )
+
+        assert collapsed == 0
+        assert len(result) == 4
+
+    def test_signature_is_deterministic(self):
+        """Test signatures do not depend on the per-process str hash seed"""
+        signature = minhash_signature(shingles("明天開會"))
+
+        assert len(signature) == 32
+        assert signature == minhash_signature(shingles("明天 開會！"))
+
+
+class TestTimeUtils:
+    """Tests for epoch-millisecond timestamp helpers"""
+
+    def test_batch_conversion_matches_single(self):
+        """Test batch ISO conversion equals per-item conversion"""
+        timestamps = [1771199730000, 1771199730123, 1771286130000]
+
+        batch = ms_to_iso8601_batch(timestamps, "Asia/Taipei")
+
+        assert batch == [ms_to_iso8601(ts, "Asia/Taipei") for ts in timestamps]
+        assert batch[0] == "2026-02-16T07:55:30+08:00"
+        assert [iso8601_to_ms(value) for value in batch] == timestamps
+
+    def test_local_day_bounds_use_standard_offset(self):
+        """Test day bounds use +08:00 rather than pytz's LMT offset"""
+        start_ms, end_ms = local_day_bounds_ms(
+            datetime(2026, 2, 16).date(), "Asia/Taipei"
+        )
+
+        assert start_ms == iso8601_to_ms("2026-02-16T00:00:00+08:00")
+        assert end_ms == start_ms + 86400000 - 1
+
 
 class TestFilterNoise:
     """Tests for filter_noise function"""
@@ -186,6 +364,79 @@ class TestFilterNoise:
         assert len(result) == 1
 
 
+class TestNoiseFilterRules:
+    """Tests for the noise filter rule engine"""
+
+    def _messages(self):
+        return [
+            {"message_id": "1", "sender_name": "Alice", "content": "正常訊息"},
+            {"message_id": "2", "sender_name": "Notify Bot", "content": "/start"},
+            {"message_id": "3", "sender_name": "Alice", "content": "  "},
+            {"message_id": "4", "sender_name": "Bob", "content": "😀😀"},
+            {"message_id": "5", "sender_name": "Notify Bot", "content": "日報"},
+            {"message_id": "6", "sender_name": "Bob", "content": "廣告：優惠"},
+        ]
+
+    def test_rules_run_cheapest_first_with_counts(self):
+        """Test per-rule drop counts follow the cost order"""
+        automaton = KeywordAutomaton({"bot": ["bot"]})
+        noise_filter = build_noise_filter(
+            ["emoji_only", "bot", "command", "empty"], automaton
+        )
+
+        kept, rule_stats = noise_filter.apply(self._messages())
+
+        assert [rule.name for rule in noise_filter.rules] == [
+            "empty", "command", "bot", "emoji_only"
+        ]
+        assert [m["message_id"] for m in kept] == ["1", "6"]
+        assert {name: s["dropped"] for name, s in rule_stats.items()} == {
+            "empty": 1, "command": 1, "bot": 1, "emoji_only": 1
+        }
+        assert all(s["seconds"] >= 0 for s in rule_stats.values())
+
+    def test_bot_check_is_memoised_per_sender(self):
+        """Test the bot keyword scan runs once per sender name"""
+        automaton = KeywordAutomaton({"bot": ["bot"]})
+        noise_filter = build_noise_filter(["bot"], automaton)
+
+        with patch.object(
+            KeywordAutomaton, "match", autospec=True,
+            side_effect=KeywordAutomaton.match
+        ) as match:
+            noise_filter.apply(self._messages())
+
+        assert match.call_count == 3
+
+    def test_plugin_rule_from_config(self):
+        """Test plugin rules load from module paths and run after built-ins"""
+        automaton = KeywordAutomaton({"bot": ["bot"]})
+        noise_filter = build_noise_filter(
+            ["tests.test_processor:advert_rule", "empty"], automaton
+        )
+
+        kept, rule_stats = noise_filter.apply(self._messages())
+
+        assert [rule.name for rule in noise_filter.rules] == ["empty", "advert"]
+        assert rule_stats["advert"]["dropped"] == 1
+        assert "6" not in [m["message_id"] for m in kept]
+
+        with pytest.raises(ValueError):
+            build_noise_filter(["no_such_rule"], automaton)
+        with pytest.raises(ValueError):
+            build_noise_filter(["tests.test_processor:missing"], automaton)
+
+    def test_emoji_only(self):
+        """Test emoji-only detection"""
+        assert is_emoji_only("😀 🎉")
+        assert not is_emoji_only("好😀")
+
+
+advert_rule = NoiseRule(
+    "advert", lambda msg, content: content.startswith("廣告："), cost=50
+)
+
+
 class TestClassifyMessages:
     """Tests for classify_messages function"""
 
@@ -313,6 +564,102 @@ class TestExtractKeywords:
             for kw in result["keywords"]
         )
 
+    def test_single_pass_matches_separate_extraction(self):
+        """Test one tokenization pass gives the same per-message and group keywords"""
+        messages = [
+            {"content": "今天的會議很重要，需要討論專案進度"},
+            {"content": "會議報告會議 report report"},
+            {"content": ""},
+            {"content": "專案進度更新：客戶需求確認完成"},
+        ]
+
+        per_message, group = extract_message_and_group_keywords(
+            messages, top_n=3, group_top_n=10
+        )
+
+        assert per_message == [
+            extract_keywords([msg], top_n=3)["keywords"] for msg in messages
+        ]
+        assert group == extract_keywords(messages, top_n=10)
+        assert per_message[2] == []
+
+
+class TestTokenizer:
+    """Tests for tokenizer initialisation"""
+
+    def test_dictionary_cache_and_user_dict(self, tmp_path):
+        """Test the prefix dictionary is cached in the data dir and user words stay whole"""
+        import jieba
+
+        user_dict = tmp_path / "user_dict.txt"
+        user_dict.write_text("星塵計畫 100 nz\n", encoding="utf-8")
+        cache_dir = tmp_path / "cache"
+
+        built = jieba.Tokenizer()
+        _prepare_tokenizer(built, str(cache_dir), str(user_dict))
+        assert (cache_dir / CACHE_FILE_NAME).exists()
+        assert "星塵計畫" in built.lcut("星塵計畫明天上線")
+
+        cached = jieba.Tokenizer()
+        _prepare_tokenizer(cached, str(cache_dir), "")
+        assert cached.total == built.total - 100
+        assert "星塵計畫" not in cached.lcut("星塵計畫明天上線")
+
+
+class TestKeywordAutomaton:
+    """Tests for the keyword automaton"""
+
+    def test_matches_substring_scans(self):
+        """Test overlapping keywords match exactly like per-keyword `in` scans"""
+        rng = random.Random(3)
+        alphabet = "abh是否需要?Ｂ"
+        keyword_classes = {
+            "a": ["he", "she", "hers", "是否"],
+            "b": ["his", "否需", "?"],
+            "c": ["".join(rng.choice(alphabet) for _ in range(rng.randrange(1, 5)))
+                  for _ in range(40)],
+        }
+        automaton = KeywordAutomaton(keyword_classes)
+
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet + "sBE") for _ in range(rng.randrange(0, 20)))
+            expected = {
+                name for name, keywords in keyword_classes.items()
+                if any(kw.lower() in text.lower() for kw in keywords)
+            }
+            assert automaton.match(text) == expected
+
+    def test_keyword_file_extends_builtin_classes(self, tmp_path):
+        """Test keywords from the file are added to the built-in classes"""
+        keyword_file = tmp_path / "keywords.json"
+        keyword_file.write_text(
+            json.dumps({"action": ["部署"], "bot": ["Notify"]}),
+            encoding="utf-8"
+        )
+
+        merged = merge_keyword_classes(
+            {"action": {"需要"}, "bot": {"bot"}}, str(keyword_file)
+        )
+        automaton = KeywordAutomaton(merged)
+
+        assert merged["action"] == {"需要", "部署"}
+        assert automaton.match("今晚部署") == {"action"}
+        assert automaton.match("LINE notify") == {"bot"}
+        assert merge_keyword_classes({"bot": {"bot"}}, "") == {"bot": {"bot"}}
+
+    def test_classify_and_score_matches_separate_steps(self):
+        """Test the single-scan path gives the same category and importance"""
+        contents = [
+            "【公告】明天需要開會嗎？", "如何完成報告", "需要更新進度",
+            "好的", "x" * 120, "Is this OK?"
+        ]
+        messages = [{"content": c} for c in contents]
+        separate = classify_messages([dict(m) for m in messages])
+        for msg in separate:
+            msg["importance"] = calculate_importance(msg)
+
+        assert classify_and_score_messages(messages) == separate
+
 
 class TestCalculateImportance:
     """Tests for calculate_importance function"""
@@ -431,6 +778,274 @@ class TestProcessMessages:
         assert (output_dir / "C1234567890abcdef_2026-02-17.json").exists()
         assert (output_dir / "stats_2026-02-17.json").exists()
 
+    def test_process_messages_reads_jsonl(self, tmp_path):
+        """Test processing a streaming JSON Lines raw file"""
+        raw_dir = tmp_path / "raw_messages"
+        raw_dir.mkdir()
+        output_dir = tmp_path / "processed_messages"
+
+        write_jsonl(
+            raw_dir / "C1234567890abcdef_2026-02-17.jsonl",
+            {
+                "group_id": "C1234567890abcdef",
+                "group_name": "Test Group",
+                "date": "2026-02-17",
+            },
+            [
+                {
+                    "message_id": "1",
+                    "timestamp": "2026-02-17T09:00:00+08:00",
+                    "sender_id": "U1",
+                    "sender_name": "Alice",
+                    "message_type": "text",
+                    "content": "需要完成報告",
+                    "attachments": []
+                }
+            ]
+        )
+
+        result = process_messages(str(raw_dir), str(output_dir))
+
+        assert len(result["C1234567890abcdef"]["messages"]) == 1
+        assert (output_dir / "C1234567890abcdef_2026-02-17.json").exists()
+
+    def test_process_messages_filters_by_date(self, tmp_path):
+        """Test only files of the requested date are processed"""
+        raw_dir = tmp_path / "raw_messages"
+        raw_dir.mkdir()
+        output_dir = tmp_path / "processed_messages"
+
+        for date in ("2026-02-16", "2026-02-17"):
+            write_jsonl(
+                raw_dir / f"C1_{date}.jsonl",
+                {"group_id": "C1", "group_name": "G", "date": date},
+                [{
+                    "message_id": date,
+                    "timestamp": f"{date}T09:00:00+08:00",
+                    "sender_id": "U1",
+                    "sender_name": "Alice",
+                    "message_type": "text",
+                    "content": "需要完成報告",
+                    "attachments": []
+                }]
+            )
+
+        result = process_messages(str(raw_dir), str(output_dir), date="2026-02-16")
+
+        assert [m["message_id"] for m in result["C1"]["messages"]] == ["2026-02-16"]
+        assert result["C1"]["messages"][0]["timestamp_ms"] == iso8601_to_ms(
+            "2026-02-16T09:00:00+08:00"
+        )
+        assert (output_dir / "stats_2026-02-16.json").exists()
+        assert not (output_dir / "stats_2026-02-17.json").exists()
+
+    def test_process_messages_worker_pool_matches_sequential(self, tmp_path):
+        """Test process-pool mode writes the same outputs in the same order"""
+        raw_dir = tmp_path / "raw_messages"
+        raw_dir.mkdir()
+
+        rng = random.Random(7)
+        contents = ["需要完成報告", "明天開會嗎？", "公告：系統維護", "好的", "收到"]
+        for g in range(4):
+            write_jsonl(
+                raw_dir / f"C{g}_2026-02-17.jsonl",
+                {"group_id": f"C{g}", "group_name": f"G{g}", "date": "2026-02-17"},
+                [{
+                    "message_id": f"{g}-{i}",
+                    "timestamp": f"2026-02-16T{9 + i // 60:02d}:{i % 60:02d}:00+08:00",
+                    "sender_id": f"U{rng.randrange(3)}",
+                    "sender_name": "Alice",
+                    "message_type": "text",
+                    "content": rng.choice(contents) + str(rng.randrange(5)),
+                    "attachments": []
+                } for i in range(30)]
+            )
+
+        sequential = process_messages(
+            str(raw_dir), str(tmp_path / "sequential"), workers=1
+        )
+        pooled = process_messages(
+            str(raw_dir), str(tmp_path / "pooled"), workers=2
+        )
+
+        def without_timings(stats):
+            for rule in stats.get("noise_filter", {}).values():
+                rule.pop("seconds")
+            return stats
+
+        assert list(pooled) == list(sequential) == ["C0", "C1", "C2", "C3"]
+        for group_id in sequential:
+            assert (
+                without_timings(pooled[group_id]["stats"])
+                == without_timings(sequential[group_id]["stats"])
+            )
+            assert (
+                [m.to_dict() for m in pooled[group_id]["messages"]]
+                == [m.to_dict() for m in sequential[group_id]["messages"]]
+            )
+        assert (
+            (tmp_path / "pooled" / "C0_2026-02-17.json").read_text(encoding="utf-8")
+            == (tmp_path / "sequential" / "C0_2026-02-17.json").read_text(encoding="utf-8")
+        )
+        pooled_stats, sequential_stats = (
+            json.loads((tmp_path / d / "stats_2026-02-17.json").read_text(encoding="utf-8"))
+            for d in ("pooled", "sequential")
+        )
+        for stats_data in (pooled_stats, sequential_stats):
+            without_timings(stats_data)
+            for stats in stats_data["stats_by_group"].values():
+                without_timings(stats)
+        assert pooled_stats == sequential_stats
+
+    def test_streaming_mode_matches_batch_output(self, tmp_path):
+        """Test streaming mode writes the same processed file and stats"""
+        raw_dir = tmp_path / "raw_messages"
+        raw_dir.mkdir()
+
+        rng = random.Random(11)
+        contents = ["需要完成報告", "明天開會嗎？", "收到", "+1 收到！", "/help", "😀", "公告：系統維護"]
+        write_jsonl(
+            raw_dir / "C1_2026-02-17.jsonl",
+            {"group_id": "C1", "group_name": "G1", "date": "2026-02-17"},
+            [{
+                "message_id": str(i),
+                "timestamp": ms_to_iso8601(1771200000000 + i * 20000),
+                "sender_id": f"U{rng.randrange(4)}",
+                "sender_name": rng.choice(["Alice", "Bob", "Notify Bot"]),
+                "message_type": rng.choice(["text"] * 5 + ["image"]),
+                "content": rng.choice(contents),
+                "attachments": []
+            } for i in range(500)]
+        )
+
+        batch = process_messages(str(raw_dir), str(tmp_path / "batch"))
+        streamed = process_messages(
+            str(raw_dir), str(tmp_path / "stream"), streaming=True
+        )
+
+        def load(directory, name):
+            return json.loads(
+                (tmp_path / directory / name).read_text(encoding="utf-8")
+            )
+
+        def without_timings(stats):
+            for rule in stats["noise_filter"].values():
+                rule.pop("seconds")
+            return stats
+
+        assert "messages" not in streamed["C1"]
+        assert streamed["C1"]["output_file"] == str(
+            tmp_path / "stream" / "C1_2026-02-17.json"
+        )
+        assert load("stream", "C1_2026-02-17.json") == load("batch", "C1_2026-02-17.json")
+        assert without_timings(streamed["C1"]["stats"]) == without_timings(
+            batch["C1"]["stats"]
+        )
+        assert not list((tmp_path / "stream").glob("*.tmp"))
+
+    def test_streaming_matches_batch_after_incremental_writes(self, tmp_path):
+        """Test a raw file written in two crawls streams like batch mode"""
+        date = "2026-02-17"
+
+        def msg(message_id, time, sender, content):
+            return {
+                "message_id": message_id,
+                "timestamp": f"2026-02-16T{time}:00+08:00",
+                "sender_id": sender,
+                "sender_name": sender,
+                "message_type": "text",
+                "content": content,
+                "attachments": []
+            }
+
+        with patch.object(Config, "RAW_OUTPUT_FORMAT", "jsonl"):
+            write_group_messages("C1", date, [
+                msg("1", "10:00", "Alice", "明天下午三點開會"),
+                msg("2", "12:00", "Alice", "需要完成報告"),
+            ], output_dir=str(tmp_path / "raw"))
+            # 之後的爬取補上較早的重複訊息，並更新 10:00 的訊息
+            write_group_messages("C1", date, [
+                msg("3", "10:03", "Bob", "明天下午三點開會"),
+                msg("1", "10:00", "Alice Chen", "明天下午三點開會"),
+            ], output_dir=str(tmp_path / "raw"))
+
+        raw_dir = partition_path(str(tmp_path / "raw"), date)
+        batch = process_messages(str(raw_dir), str(tmp_path / "batch"))
+        streamed = process_messages(
+            str(raw_dir), str(tmp_path / "stream"), streaming=True
+        )
+
+        def load(directory):
+            return json.loads(
+                (tmp_path / directory / f"C1_{date}.json").read_text(encoding="utf-8")
+            )
+
+        def without_timings(stats):
+            for rule in stats["noise_filter"].values():
+                rule.pop("seconds")
+            return stats
+
+        assert batch["C1"]["stats"]["removed_duplicates"] == 1
+        assert batch["C1"]["stats"]["total_messages"] == 2
+        assert load("stream") == load("batch")
+        assert without_timings(streamed["C1"]["stats"]) == without_timings(
+            batch["C1"]["stats"]
+        )
+
+    def test_process_messages_skips_unchanged_files(self, tmp_path):
+        """Test a rerun reuses outputs whose raw file hash is unchanged"""
+        date = "2026-02-17"
+        raw_dir = partition_path(str(tmp_path / "raw_messages"), date)
+        raw_dir.mkdir(parents=True)
+        output_dir = partition_path(str(tmp_path / "processed_messages"), date)
+
+        def write_raw(group_id, contents):
+            write_jsonl(
+                raw_dir / f"{group_id}_{date}.jsonl",
+                {"group_id": group_id, "group_name": "G", "date": date},
+                [{
+                    "message_id": str(i),
+                    "timestamp": f"2026-02-16T09:0{i}:00+08:00",
+                    "sender_id": "U1",
+                    "sender_name": "Alice",
+                    "message_type": "text",
+                    "content": content,
+                    "attachments": []
+                } for i, content in enumerate(contents)]
+            )
+
+        write_raw("C1", ["需要完成報告"])
+        write_raw("C2", ["明天開會嗎？"])
+        first = process_messages(str(raw_dir), str(output_dir), date=date)
+        assert not any(result.get("skipped") for result in first.values())
+
+        # C1 有新訊息；C2 重新寫入相同內容
+        write_raw("C1", ["需要完成報告", "明天開會嗎？"])
+        write_raw("C2", ["明天開會嗎？"])
+        second = process_messages(str(raw_dir), str(output_dir), date=date)
+
+        assert "skipped" not in second["C1"]
+        assert second["C1"]["stats"]["total_messages"] == 2
+        assert second["C2"]["skipped"] is True
+        assert "messages" not in second["C2"]
+        assert second["C2"]["stats"]["total_messages"] == 1
+
+        manifest = load_manifest(output_dir)["files"]
+        entry = manifest[f"C1_{date}.json"]
+        assert entry["source"] == f"C1_{date}.jsonl"
+        assert entry["source_sha256"] == file_sha256(raw_dir / f"C1_{date}.jsonl")
+        assert entry["sha256"] == file_sha256(output_dir / f"C1_{date}.json")
+        stats = json.loads((output_dir / f"stats_{date}.json").read_text("utf-8"))
+        assert sorted(stats["stats_by_group"]) == ["C1", "C2"]
+
+        # 輸出檔案被修改或指定 force 時重新處理
+        (output_dir / f"C2_{date}.json").write_text("{}", encoding="utf-8")
+        third = process_messages(str(raw_dir), str(output_dir), date=date)
+        assert "skipped" not in third["C2"]
+        assert third["C1"]["skipped"] is True
+        forced = process_messages(str(raw_dir), str(output_dir), force=True)
+        assert not any(result.get("skipped") for result in forced.values())
+
     def test_process_messages_empty_directory(self, tmp_path):
         """Test with empty raw messages directory"""
         raw_dir = tmp_path / "raw_messages"
@@ -449,6 +1064,50 @@ class TestProcessMessages:
             process_messages(str(raw_dir), str(output_dir))
 
 
+class TestDatePartitions:
+    """Tests for the YYYY/MM/DD data layout and its manifest"""
+
+    def test_manifest_tracks_sizes_and_hashes(self, tmp_path):
+        """Test the manifest follows file changes and keeps annotations"""
+        partition = partition_path(str(tmp_path), "2026-02-17")
+        assert partition == tmp_path / "2026" / "02" / "17"
+        partition.mkdir(parents=True)
+        data_file = partition / "C1_2026-02-17.json"
+        data_file.write_text("one", encoding="utf-8")
+
+        manifest = refresh_manifest(partition, {data_file.name: {"source": "x"}})
+        entry = manifest["files"][data_file.name]
+        assert entry["size"] == 3
+        assert entry["sha256"] == hashlib.sha256(b"one").hexdigest()
+        assert entry["source"] == "x"
+        assert load_manifest(partition) == manifest
+
+        # 寫入相同內容時保留附加欄位，內容改變時捨棄
+        data_file.write_text("one", encoding="utf-8")
+        assert refresh_manifest(partition)["files"][data_file.name]["source"] == "x"
+        data_file.write_text("three", encoding="utf-8")
+        entry = refresh_manifest(partition)["files"][data_file.name]
+        assert "source" not in entry
+        assert entry["sha256"] == hashlib.sha256(b"three").hexdigest()
+
+        data_file.unlink()
+        assert refresh_manifest(partition)["files"] == {}
+
+    def test_migrate_flat_layout(self, tmp_path):
+        """Test dated files of the old flat layout move into partitions"""
+        for name in ("C1_2026-02-17.json", "stats_2026-02-17.json", "notes.txt"):
+            (tmp_path / name).write_text("{}", encoding="utf-8")
+
+        assert migrate_flat_layout([str(tmp_path)]) == 2
+
+        partition = tmp_path / "2026" / "02" / "17"
+        assert sorted(load_manifest(partition)["files"]) == [
+            "C1_2026-02-17.json", "stats_2026-02-17.json"
+        ]
+        assert (tmp_path / "notes.txt").exists()
+        assert not (tmp_path / "C1_2026-02-17.json").exists()
+
+
 class TestCalculateStatistics:
     """Tests for _calculate_statistics function"""
 
@@ -493,6 +1152,95 @@ class TestCalculateStatistics:
         assert stats["top_senders"][0]["name"] == "Alice"
         assert stats["top_senders"][0]["count"] == 2
 
+    def test_explicit_duplicate_and_noise_counts(self):
+        """Test counts passed by the processor are reported as-is"""
+        stats = _calculate_statistics(
+            [{}] * 5,
+            [{"sender_name": "Alice"}],
+            "Test Group",
+            {"keywords": []},
+            removed_duplicates=3,
+            filtered_noise=1,
+            near_duplicates=2
+        )
+
+        assert stats["removed_duplicates"] == 3
+        assert stats["filtered_noise"] == 1
+        assert stats["near_duplicates"] == 2
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+class TestMessageBatch:
+    """Tests for Message and MessageBatch"""
+
+    @staticmethod
+    def _messages(count):
+        base_ms = iso8601_to_ms("2026-02-16T08:00:00+08:00")
+        return [
+            {
+                "message_id": str(100000 + i),
+                "timestamp": ms_to_iso8601(base_ms + i * 1000),
+                "timestamp_ms": base_ms + i * 1000,
+                "sender_id": f"U{i % 20:032d}",
+                "sender_name": f"User {i % 20}",
+                "message_type": "image" if i % 10 == 0 else "text",
+                "content": f"message number {i}",
+                "attachments": [f"image_{100000 + i}"] if i % 10 == 0 else [],
+            }
+            for i in range(count)
+        ]
+
+    def test_round_trip(self):
+        """Test dicts survive conversion to a batch and back unchanged"""
+        messages = self._messages(50)
+        messages[3]["timestamp"] = "2026-02-16T00:00:03+00:00"
+        messages[4]["category"] = "question"
+        messages[4]["importance"] = 0.8
+        messages[4]["keywords"] = ["會議"]
+        messages[5]["reply_to"] = "100001"
+
+        batch = MessageBatch.from_dicts(messages)
+
+        assert len(batch) == 50
+        assert batch.to_dicts() == messages
+        assert batch[-1]["message_id"] == "100049"
+        assert batch.sender_name(21) == "User 1"
+        assert [m.message_id for m in batch[10:13]] == ["100010", "100011", "100012"]
+
+    def test_message_dict_access(self):
+        """Test Message rows behave like message dicts"""
+        msg = Message.from_dict(self._messages(1)[0])
+
+        assert msg.get("importance", 0) == 0
+        assert "category" not in msg
+        msg["category"] = "announcement"
+        msg["custom"] = 1
+        assert msg["category"] == "announcement"
+        assert msg.to_dict()["custom"] == 1
+        with pytest.raises(KeyError):
+            msg["missing"]
+
+    def test_batch_uses_less_memory_than_dicts(self):
+        """Test the columnar batch is several times smaller than dicts"""
+        import tracemalloc
+
+        # 與從 JSON 讀入時相同：每則訊息的字串都是獨立對象
+        payload = json.dumps(self._messages(20000))
+
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        as_dicts = json.loads(payload)
+        dict_bytes = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        batch = MessageBatch.from_dicts(json.loads(payload))
+        batch_bytes = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+
+        assert len(batch) == len(as_dicts)
+        assert dict_bytes > 3 * batch_bytes
@@ -1,14 +1,29 @@
 """Unit tests for scheduler (Agent 4)"""
 
 import pytest
+import asyncio
 import json
 from pathlib import Path
 from unittest.mock import Mock, patch, AsyncMock, MagicMock
 from datetime import datetime, timedelta
 import pytz
 
+from src.utils.partitions import partition_path
 from src.utils.sender import LineSender, _simplify_markdown
-from src.agent_scheduler import execute_pipeline
+from src.utils.rate_limiter import RateLimiter
+from linebot.v3.messaging.exceptions import ApiException
+from src.agent_scheduler import (
+    execute_pipeline,
+    execute_backfill,
+    _run_pipeline_for_date,
+)
+from src.utils.lpt_scheduler import (
+    load_group_volumes,
+    load_seconds_per_unit,
+    lpt_order,
+    predict_makespan,
+    run_lpt,
+)
 
 
 class TestLineSender:
@@ -85,6 +100,46 @@ class TestLineSender:
             assert "summary2.md" in result
 
 
+    @pytest.mark.asyncio
+    async def test_send_batch_summaries_skips_sent(self, tmp_path):
+        """Test summaries already sent with the same content are not resent"""
+        (tmp_path / "C1_2026-02-17.md").write_text("Summary 1", encoding='utf-8')
+        (tmp_path / "C2_2026-02-17.md").write_text("Summary 2", encoding='utf-8')
+
+        sender = LineSender("test_token")
+        with patch.object(
+            sender, "send_summary", new_callable=AsyncMock, return_value=True
+        ) as mock_send:
+            first = await sender.send_batch_summaries("U123", str(tmp_path))
+            (tmp_path / "C2_2026-02-17.md").write_text(
+                "Summary 2 updated", encoding='utf-8'
+            )
+            second = await sender.send_batch_summaries("U123", str(tmp_path))
+
+        assert sorted(first) == ["C1_2026-02-17.md", "C2_2026-02-17.md"]
+        assert second == {"C2_2026-02-17.md": True}
+        assert mock_send.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_send_summary_retries_after_rate_limit(self, tmp_path):
+        """Test a 429 on push is retried through the rate limiter"""
+        summary_file = tmp_path / "summary.md"
+        summary_file.write_text("Summary content", encoding='utf-8')
+
+        error = ApiException(status=429, reason="Too Many Requests")
+        error.headers = {"Retry-After": "0"}
+        sender = LineSender("test_token", rate_limiter=RateLimiter())
+
+        with patch.object(
+            sender.messaging_api, 'push_message', side_effect=[error, None]
+        ) as mock_push:
+            result = await sender.send_summary("U123", str(summary_file))
+
+        assert result is True
+        assert mock_push.call_count == 2
+        assert sender.rate_limiter.stats()["push"]["throttled"] == 1
+
+
 class TestSimplifyMarkdown:
     """Tests for markdown simplification"""
 
@@ -164,6 +219,9 @@ class TestExecutePipeline:
                             mock_config.USER_ID = "U123"
                             mock_config.RAW_MESSAGES_DIR = str(tmp_path / "data" / "raw_messages")
                             mock_config.LOGS_DIR = str(tmp_path / "logs")
+                            mock_config.EXECUTION_STATS_FILE = str(
+                                tmp_path / "data" / "execution_stats.json"
+                            )
 
                             result = await execute_pipeline()
 
@@ -184,6 +242,7 @@ class TestExecutePipeline:
                 mock_config.TIMEZONE = "Asia/Taipei"
                 mock_config.LINE_CHANNEL_ACCESS_TOKEN = "test_token"
                 mock_config.LOGS_DIR = "logs"
+                mock_config.EXECUTION_STATS_FILE = "data/execution_stats.json"
 
                 result = await execute_pipeline()
 
@@ -192,6 +251,177 @@ class TestExecutePipeline:
                 assert "error" in result
 
 
+    @pytest.mark.asyncio
+    async def test_attachment_downloads_do_not_block_crawl(self):
+        """Test Agent 2 starts before attachment downloads finish"""
+        downloads_done = asyncio.Event()
+        order = []
+
+        async def downloads():
+            await downloads_done.wait()
+            order.append("downloads")
+            return {"downloaded": 2, "failed": 0}
+
+        async def crawl(group_ids, date, schedule_report=None,
+                        attachment_downloads=None, max_concurrent_groups=None):
+            attachment_downloads.append(asyncio.ensure_future(downloads()))
+            return {"C123": [{"message_id": "1"}]}
+
+        def process(*args, **kwargs):
+            order.append("processor")
+            return {}
+
+        async def summarize(*args, **kwargs):
+            downloads_done.set()
+            return {}
+
+        with patch("src.agent_scheduler.crawl_messages", side_effect=crawl), \
+                patch("src.agent_scheduler.process_messages", side_effect=process), \
+                patch("src.agent_scheduler.generate_summaries", side_effect=summarize), \
+                patch("src.agent_scheduler.LineSender") as mock_sender_class:
+            mock_sender_class.return_value = AsyncMock()
+            mock_sender_class.return_value.send_batch_summaries.return_value = {}
+
+            result = await _run_pipeline_for_date("2026-02-17")
+
+        assert result["status"] == "success"
+        assert order == ["processor", "downloads"]
+        assert result["agents_results"]["attachments"] == {
+            "status": "success", "downloaded": 2, "failed": 0
+        }
+
+
+    @pytest.mark.asyncio
+    async def test_stages_without_jobs_keep_previous_schedule(self, tmp_path):
+        """Test an empty schedule report does not erase the prediction history"""
+        stats_file = tmp_path / "execution_stats.json"
+        stats_file.write_text(json.dumps({
+            "crawler_schedule": {"seconds_per_unit": 0.002},
+            "summarizer_schedule": {"seconds_per_unit": 0.5},
+        }), encoding="utf-8")
+
+        async def crawl(group_ids, date, schedule_report=None,
+                        attachment_downloads=None, max_concurrent_groups=None):
+            schedule_report.update({"seconds_per_unit": 0.003})
+            return {}
+
+        with patch("src.agent_scheduler.crawl_messages", side_effect=crawl), \
+                patch("src.agent_scheduler.process_messages", return_value={}), \
+                patch("src.agent_scheduler.generate_summaries", new_callable=AsyncMock) as mock_summarizer, \
+                patch("src.agent_scheduler.LineSender") as mock_sender_class, \
+                patch("src.agent_scheduler.Config.EXECUTION_STATS_FILE", str(stats_file)):
+            # 所有摘要沿用舊檔：排程報告為空
+            mock_summarizer.return_value = {}
+            mock_sender_class.return_value = AsyncMock()
+            mock_sender_class.return_value.send_batch_summaries.return_value = {}
+
+            await execute_pipeline("2026-02-17")
+
+        assert load_seconds_per_unit(str(stats_file), "crawler_schedule") == 0.003
+        assert load_seconds_per_unit(str(stats_file), "summarizer_schedule") == 0.5
+
+
+class TestBackfill:
+    """Tests for date-range backfill mode"""
+
+    @pytest.mark.asyncio
+    async def test_backfill_runs_each_day_with_own_date(self, tmp_path, monkeypatch):
+        """Test every day in the range runs its own date-scoped pipeline"""
+        monkeypatch.chdir(tmp_path)
+
+        with patch("src.agent_scheduler.crawl_messages", new_callable=AsyncMock) as mock_crawler, \
+                patch("src.agent_scheduler.process_messages") as mock_processor, \
+                patch("src.agent_scheduler.generate_summaries", new_callable=AsyncMock) as mock_summarizer, \
+                patch("src.agent_scheduler.LineSender") as mock_sender_class:
+            mock_crawler.return_value = {"C123": [{"message_id": "1"}]}
+            mock_processor.return_value = {"C123": {"messages": [{}], "stats": {}}}
+            mock_summarizer.return_value = {"C123": "summary.md"}
+            mock_sender = AsyncMock()
+            mock_sender.send_batch_summaries.return_value = {"summary.md": True}
+            mock_sender_class.return_value = mock_sender
+
+            result = await execute_backfill("2026-02-10", "2026-02-12", 2)
+
+        assert result["status"] == "success"
+        assert list(result["days"]) == ["2026-02-10", "2026-02-11", "2026-02-12"]
+        crawled_dates = sorted(call.args[1] for call in mock_crawler.call_args_list)
+        assert crawled_dates == ["2026-02-10", "2026-02-11", "2026-02-12"]
+        processed_dates = sorted(
+            call.kwargs["date"] for call in mock_processor.call_args_list
+        )
+        assert processed_dates == crawled_dates
+        assert (tmp_path / "data" / "backfill_stats.json").exists()
+
+    @pytest.mark.asyncio
+    async def test_backfill_respects_concurrency_budget(self, tmp_path, monkeypatch):
+        """Test no more than max_concurrent_days days run at once"""
+        monkeypatch.chdir(tmp_path)
+        running = 0
+        peak = 0
+
+        async def slow_crawl(
+            group_ids, date, schedule_report=None, attachment_downloads=None,
+            max_concurrent_groups=None
+        ):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            if date == "2026-02-11":
+                raise Exception("Crawler error")
+            return {}
+
+        with patch("src.agent_scheduler.crawl_messages", side_effect=slow_crawl), \
+                patch("src.agent_scheduler.process_messages", return_value={}), \
+                patch("src.agent_scheduler.generate_summaries", new_callable=AsyncMock) as mock_summarizer, \
+                patch("src.agent_scheduler.LineSender") as mock_sender_class:
+            mock_summarizer.return_value = {}
+            mock_sender_class.return_value = AsyncMock()
+            mock_sender_class.return_value.send_batch_summaries.return_value = {}
+
+            result = await execute_backfill("2026-02-08", "2026-02-13", 2)
+
+        assert peak == 2
+        assert result["status"] == "failure"
+        assert result["failed_days"] == ["2026-02-11"]
+
+    @pytest.mark.asyncio
+    async def test_backfill_splits_stage_limits_across_days(self, tmp_path, monkeypatch):
+        """Test concurrent days share the per-stage concurrency budget"""
+        monkeypatch.chdir(tmp_path)
+
+        with patch("src.agent_scheduler.crawl_messages", new_callable=AsyncMock) as mock_crawler, \
+                patch("src.agent_scheduler.process_messages", return_value={}) as mock_processor, \
+                patch("src.agent_scheduler.generate_summaries", new_callable=AsyncMock) as mock_summarizer, \
+                patch("src.agent_scheduler.LineSender") as mock_sender_class, \
+                patch("src.agent_scheduler.Config.CRAWL_MAX_CONCURRENT_GROUPS", 50), \
+                patch("src.agent_scheduler.Config.SUMMARY_MAX_CONCURRENT_GROUPS", 5), \
+                patch("src.agent_scheduler.Config.PROCESSOR_WORKERS", 8):
+            mock_crawler.return_value = {}
+            mock_summarizer.return_value = {}
+            mock_sender_class.return_value = AsyncMock()
+            mock_sender_class.return_value.send_batch_summaries.return_value = {}
+
+            await execute_backfill("2026-02-10", "2026-02-12", 3)
+            await execute_pipeline("2026-02-13")
+
+        crawl_limits = [c.kwargs["max_concurrent_groups"] for c in mock_crawler.call_args_list]
+        summary_limits = [c.kwargs["max_concurrent_groups"] for c in mock_summarizer.call_args_list]
+        workers = [c.kwargs["workers"] for c in mock_processor.call_args_list]
+        # 補跑 3 天同時執行時各分到 1/3，單日執行使用預設上限
+        assert crawl_limits == [16, 16, 16, None]
+        assert summary_limits == [1, 1, 1, None]
+        assert workers == [2, 2, 2, None]
+        assert (tmp_path / "data" / "backfill_stats.json").exists()
+
+    @pytest.mark.asyncio
+    async def test_backfill_invalid_range(self):
+        """Test an end date before the start date raises"""
+        with pytest.raises(ValueError):
+            await execute_backfill("2026-02-12", "2026-02-10")
+
+
 class TestScheduleTiming:
     """Tests for schedule timing"""
 
@@ -245,3 +475,102 @@ class TestExecutionStats:
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+class TestLptScheduling:
+    """Tests for longest-job-first group scheduling"""
+
+    def test_load_group_volumes_uses_history_before_date(self, tmp_path):
+        """Test volumes average raw counts from earlier stats files only"""
+        for date, count in [("2026-02-14", 100), ("2026-02-15", 300),
+                            ("2026-02-16", 9999)]:
+            (tmp_path / f"stats_{date}.json").write_text(json.dumps({
+                "date": date,
+                "stats_by_group": {
+                    "C1": {"total_messages": count, "removed_duplicates": 10}
+                }
+            }), encoding="utf-8")
+
+        volumes = load_group_volumes(str(tmp_path), before_date="2026-02-16")
+
+        assert volumes == {"C1": 210}
+
+    def test_load_group_volumes_reads_partitions(self, tmp_path):
+        """Test stats files are found in the date partitions"""
+        for date, count in [("2026-02-14", 100), ("2026-02-15", 300)]:
+            partition = partition_path(str(tmp_path), date)
+            partition.mkdir(parents=True)
+            (partition / f"stats_{date}.json").write_text(json.dumps({
+                "stats_by_group": {"C1": {"total_messages": count}}
+            }), encoding="utf-8")
+
+        assert load_group_volumes(str(tmp_path), before_date="2026-02-16") == {
+            "C1": 200
+        }
+        assert load_group_volumes(
+            str(tmp_path), before_date="2026-02-16", history_days=1
+        ) == {"C1": 300}
+        assert load_group_volumes(str(tmp_path)) == {"C1": 200}
+
+    def test_lpt_order_and_makespan(self):
+        """Test big jobs go first and unknown jobs get the average volume"""
+        volumes = {"small": 1, "big": 9, "mid": 4}
+
+        assert lpt_order(["small", "new", "big", "mid"], volumes) == [
+            "big", "new", "mid", "small"
+        ]
+        assert predict_makespan([9, 4, 4, 1], 2) == 9
+
+    @pytest.mark.asyncio
+    async def test_run_lpt_starts_largest_first(self):
+        """Test jobs start in volume order and failures are returned"""
+        started = []
+
+        def job(name):
+            async def _run():
+                started.append(name)
+                await asyncio.sleep(0)
+                if name == "bad":
+                    raise RuntimeError("boom")
+                return name
+            return _run
+
+        results, report = await run_lpt(
+            {name: job(name) for name in ["a", "bad", "c"]},
+            {"a": 1, "bad": 5, "c": 10},
+            max_concurrency=1
+        )
+
+        assert started == ["c", "bad", "a"]
+        assert results["a"] == "a"
+        assert isinstance(results["bad"], RuntimeError)
+        assert report["workers"] == 1
+        assert report["actual_makespan_seconds"] >= 0
+        assert "predicted_makespan_seconds" in report
+
+    @pytest.mark.asyncio
+    async def test_run_lpt_predicts_from_previous_runs(self, tmp_path):
+        """Test the prediction uses earlier timings, not the current run"""
+        async def noop():
+            return None
+
+        jobs = {"a": noop, "b": noop, "c": noop}
+        volumes = {"a": 1, "b": 3, "c": 2}
+
+        _, report = await run_lpt(jobs, volumes, max_concurrency=2)
+        assert report["predicted_makespan_seconds"] is None
+        assert report["seconds_per_unit"] >= 0
+
+        stats_file = tmp_path / "execution_stats.json"
+        stats_file.write_text(json.dumps({
+            "crawler_schedule": {"seconds_per_unit": 0.5}
+        }), encoding="utf-8")
+        seconds_per_unit = load_seconds_per_unit(str(stats_file), "crawler_schedule")
+        assert seconds_per_unit == 0.5
+        assert load_seconds_per_unit(str(stats_file), "summarizer_schedule") is None
+
+        _, report = await run_lpt(
+            jobs, volumes, max_concurrency=2, seconds_per_unit=seconds_per_unit
+        )
+        # b (1.5s) 一個 worker；c (1.0s) 和 a (0.5s) 另一個
+        assert report["predicted_makespan_seconds"] == 1.5
@@ -178,6 +178,20 @@ class TestFormatMessagesForPrompt:
         assert len(formatted) < len(long_content)
         assert "..." in formatted
 
+    def test_format_shows_repeat_count(self):
+        """Test collapsed near-duplicates are listed once with their count"""
+        messages = [
+            {"sender_name": "Alice", "content": "收到", "category": "other",
+             "importance": 0.5, "repeat_count": 12},
+            {"sender_name": "Bob", "content": "好", "category": "other",
+             "importance": 0.5},
+        ]
+
+        lines = _format_messages_for_prompt(messages).split("\n")
+
+        assert "收到 ×12" in lines[0]
+        assert "×" not in lines[1]
+
 
 class TestGenerateIndexHtml:
     """Tests for generate_index_html function"""
@@ -208,6 +222,28 @@ class TestGenerateIndexHtml:
         assert "C123_2026-02-17.md" in html
         assert "2026-02-17" in html
 
+    def test_group_name_and_picture_are_escaped(self):
+        """Test user-controlled group names cannot inject markup"""
+        html = generate_index_html("2026-02-17", {
+            "C1": {
+                "group_name": "<script>alert(1)</script>",
+                "picture_url": 'https://x/p.png" onerror="alert(1)',
+                "file_path": "output/summaries/C1_2026-02-17.md",
+                "message_count": 1
+            },
+            "C2": {
+                "group_name": "Team",
+                "picture_url": "javascript:alert(1)",
+                "file_path": "output/summaries/C2_2026-02-17.md",
+                "message_count": 1
+            }
+        })
+
+        assert "<script>alert(1)</script>" not in html
+        assert "&lt;script&gt;alert(1)&lt;/script&gt;" in html
+        assert 'src="https://x/p.png&quot; onerror=&quot;alert(1)"' in html
+        assert "javascript:" not in html
+
     def test_html_has_styling(self):
         """Test that HTML includes CSS styling"""
         html = generate_index_html("2026-02-17", {})
@@ -327,6 +363,53 @@ class TestGenerateSummaries:
             assert "2026-02-17" in markdown_content
             assert "統計" in markdown_content
 
+    @pytest.mark.asyncio
+    async def test_generate_summaries_skips_unchanged(self, tmp_path):
+        """Test a rerun only calls the API for changed processed files"""
+        processed_dir = tmp_path / "processed" / "2026" / "02" / "17"
+        processed_dir.mkdir(parents=True)
+        output_dir = tmp_path / "summaries" / "2026" / "02" / "17"
+
+        def write_processed(group_id, content):
+            (processed_dir / f"{group_id}_2026-02-17.json").write_text(
+                json.dumps({
+                    "group_id": group_id,
+                    "group_name": f"Group {group_id}",
+                    "date": "2026-02-17",
+                    "messages": [{
+                        "message_id": "1",
+                        "timestamp": "2026-02-16T09:00:00+08:00",
+                        "sender_name": "Alice",
+                        "content": content,
+                        "importance": 0.8
+                    }]
+                }, ensure_ascii=False),
+                encoding="utf-8"
+            )
+
+        write_processed("C1", "需要完成報告")
+        write_processed("C2", "明天開會嗎？")
+
+        with patch(
+            "src.agent_summarizer.call_claude_api",
+            new_callable=AsyncMock,
+            return_value="## 核心要點\n- 測試"
+        ) as mock_api:
+            first = await generate_summaries(
+                str(processed_dir), str(output_dir), date="2026-02-17"
+            )
+            assert mock_api.await_count == 2
+
+            write_processed("C2", "會議改到下午")
+            second = await generate_summaries(
+                str(processed_dir), str(output_dir), date="2026-02-17"
+            )
+            assert mock_api.await_count == 3
+
+        assert second == first
+        index_html = (output_dir / "index_2026-02-17.html").read_text("utf-8")
+        assert "Group C1" in index_html and "Group C2" in index_html
+
     @pytest.mark.asyncio
     async def test_generate_summaries_empty_directory(self, tmp_path):
         """Test with empty processed messages directory"""
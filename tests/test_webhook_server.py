@@ -0,0 +1,224 @@
+"""Unit tests for webhook ingestion server and message store"""
+
+import pytest
+import asyncio
+import json
+from unittest.mock import Mock, AsyncMock
+from aiohttp.test_utils import TestServer
+from linebot.v3 import SignatureValidator
+
+from src.utils.line_handler import LineHandler
+from src.utils.message_store import MessageStore
+from src.webhook_server import create_app, replay_payloads, sign_body
+
+SECRET = "test_channel_secret"
+
+# 2026-02-16T09:00:00+08:00
+BASE_TS = 1771203600000
+
+
+def _text_event(message_id, text, timestamp, group_id="C123", user_id="U1"):
+    return {
+        "type": "message",
+        "mode": "active",
+        "timestamp": timestamp,
+        "webhookEventId": f"evt{message_id}",
+        "deliveryContext": {"isRedelivery": False},
+        "replyToken": "token",
+        "source": {"type": "group", "groupId": group_id, "userId": user_id},
+        "message": {
+            "type": "text",
+            "id": message_id,
+            "quoteToken": "q",
+            "text": text,
+        },
+    }
+
+
+def _payload(*events):
+    return {"destination": "Ubot", "events": list(events)}
+
+
+def _stored(message_id, timestamp_ms, content="hi"):
+    return {
+        "message_id": message_id,
+        "timestamp": "",
+        "timestamp_ms": timestamp_ms,
+        "sender_id": "U1",
+        "sender_name": "",
+        "message_type": "text",
+        "content": content,
+        "attachments": [],
+    }
+
+
+class TestMessageStore:
+    """Tests for MessageStore"""
+
+    @pytest.mark.asyncio
+    async def test_append_and_read_window(self, tmp_path):
+        """Test messages are read back in order within the time window"""
+        store = MessageStore(str(tmp_path))
+        await store.start()
+        await store.append_many([
+            ("C123", _stored("2", BASE_TS + 1000)),
+            ("C123", _stored("1", BASE_TS)),
+            ("C123", _stored("3", BASE_TS + 86400000)),
+            ("C999", _stored("4", BASE_TS)),
+        ])
+        await store.stop()
+
+        messages = store.read_messages("C123", BASE_TS, BASE_TS + 5000)
+
+        assert [m["message_id"] for m in messages] == ["1", "2"]
+        assert messages[0]["timestamp_ms"] == BASE_TS
+
+    @pytest.mark.asyncio
+    async def test_redelivered_events_are_deduplicated(self, tmp_path):
+        """Test the same message_id stored twice is read once"""
+        store = MessageStore(str(tmp_path))
+        await store.start()
+        await store.append_many([("C123", _stored("1", BASE_TS))])
+        await store.append_many([("C123", _stored("1", BASE_TS))])
+        await store.stop()
+
+        assert len(store.read_messages("C123", BASE_TS, BASE_TS)) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_appends_are_group_committed(self, tmp_path):
+        """Test concurrent requests share commits"""
+        store = MessageStore(str(tmp_path))
+        await store.start()
+        await asyncio.gather(*(
+            store.append_many([("C123", _stored(str(i), BASE_TS + i))])
+            for i in range(200)
+        ))
+        await store.stop()
+
+        assert store.messages_written == 200
+        assert store.commits < 200
+        assert len(store.read_messages("C123", BASE_TS, BASE_TS + 200)) == 200
+
+    @pytest.mark.asyncio
+    async def test_append_requires_started_writer(self, tmp_path):
+        """Test appending before start() raises"""
+        store = MessageStore(str(tmp_path))
+        with pytest.raises(RuntimeError):
+            await store.append_many([("C123", _stored("1", BASE_TS))])
+
+
+class TestWebhookServer:
+    """Tests for the webhook HTTP endpoint"""
+
+    def test_create_app_empty_secret(self, tmp_path):
+        """Test creating the app without a channel secret raises"""
+        with pytest.raises(ValueError, match="Channel secret cannot be empty"):
+            create_app("", MessageStore(str(tmp_path)))
+
+    @pytest.mark.asyncio
+    async def test_replayed_payloads_are_stored(self, tmp_path):
+        """Test signed payloads replayed over HTTP land in the store"""
+        store = MessageStore(str(tmp_path))
+        server = TestServer(create_app(SECRET, store))
+        await server.start_server()
+        try:
+            url = str(server.make_url("/callback"))
+            statuses = await replay_payloads(url, [
+                _payload(_text_event("1", "早安", BASE_TS)),
+                _payload(
+                    _text_event("2", "會議改到下午", BASE_TS + 1000),
+                    _text_event("3", "other group", BASE_TS, group_id="C999"),
+                ),
+            ], SECRET)
+        finally:
+            await server.close()
+
+        assert statuses == [200, 200]
+        messages = store.read_messages("C123", BASE_TS, BASE_TS + 5000)
+        assert [m["content"] for m in messages] == ["早安", "會議改到下午"]
+        assert messages[0]["sender_id"] == "U1"
+        assert messages[0]["timestamp"].endswith("+08:00")
+
+    @pytest.mark.asyncio
+    async def test_invalid_signature_rejected(self, tmp_path):
+        """Test requests with a bad signature are rejected"""
+        store = MessageStore(str(tmp_path))
+        server = TestServer(create_app(SECRET, store))
+        await server.start_server()
+        try:
+            url = str(server.make_url("/callback"))
+            statuses = await replay_payloads(
+                url,
+                [_payload(_text_event("1", "hi", BASE_TS))],
+                "wrong_secret"
+            )
+        finally:
+            await server.close()
+
+        assert statuses == [400]
+        assert store.read_messages("C123", BASE_TS, BASE_TS) == []
+
+    def test_sign_body_matches_sdk_validator(self):
+        """Test signatures are accepted by the SDK's validator"""
+        body = json.dumps(_payload(_text_event("1", "hi", BASE_TS)))
+        validator = SignatureValidator(SECRET)
+        assert validator.validate(body, sign_body(SECRET, body))
+
+
+class TestCrawlFromStore:
+    """Tests for LineHandler reading messages from the store"""
+
+    @pytest.mark.asyncio
+    async def test_get_group_messages_reads_store(self, tmp_path):
+        """Test get_group_messages returns stored messages with names"""
+        store = MessageStore(str(tmp_path))
+        await store.start()
+        await store.append_many([("C123", _stored("1", BASE_TS))])
+        await store.stop()
+
+        handler = LineHandler("test_token", message_store=store)
+        handler.messaging_api = AsyncMock()
+        handler.messaging_api.get_group_member_profile.return_value = Mock(
+            display_name="Alice"
+        )
+
+        messages = await handler.get_group_messages(
+            "C123", BASE_TS - 1000, BASE_TS + 1000
+        )
+
+        assert len(messages) == 1
+        assert messages[0]["sender_name"] == "Alice"
+
+    @pytest.mark.asyncio
+    async def test_torn_last_line_keeps_committed_messages(self, tmp_path):
+        """Test a half-written record does not hide the group's messages"""
+        store = MessageStore(str(tmp_path))
+        await store.start()
+        await store.append_many([
+            ("C123", _stored("1", BASE_TS)),
+            ("C123", _stored("2", BASE_TS + 1000)),
+        ])
+        path = store._path("C123", store._date_of(BASE_TS))
+        record = json.dumps(_stored("3", BASE_TS + 2000))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(record[:len(record) // 2])
+
+        handler = LineHandler("test_token", message_store=store)
+        handler.messaging_api = AsyncMock()
+        handler.messaging_api.get_group_member_profile.return_value = Mock(
+            display_name="Alice"
+        )
+        messages = await handler.get_group_messages(
+            "C123", BASE_TS - 1000, BASE_TS + 5000
+        )
+        assert [m["message_id"] for m in messages] == ["1", "2"]
+
+        # 中斷後的下一次寫入從新的一行開始，半行之後的訊息可正常讀取
+        await store.append_many([("C123", _stored("4", BASE_TS + 3000))])
+        await store.stop()
+        messages = store.read_messages("C123", BASE_TS - 1000, BASE_TS + 5000)
+        assert [m["message_id"] for m in messages] == ["1", "2", "4"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])